@@ -1,6 +1,11 @@
 
+import html
 import streamlit as st
-from bot_agent import handle_agent_input
+import bot_agent
+from bot_agent import generate_opener, stream_agent_input
+from chat_view import CHAT_WINDOW, bubble_html, history_chunks, message_html, window_start
+from opener_pool import OpenerPool
+from session_manager import SessionManager
 
 # Set page config
 st.set_page_config(
@@ -75,31 +80,43 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-    
-if "state" not in st.session_state:
-    st.session_state.state = {
-        "messages": [],
-        "agent_name": None,
-        "member_id": None,
-        "correct_queue": None,
-        "authenticated": None,
-        "plan_status": None,
-        "conversation_state": "INTRODUCTION"
-    }
-    
-    # Trigger initial bot message
-    updated_state = handle_agent_input("Hello, this is customer support. How can I help you today?", st.session_state.state)
-    st.session_state.state = updated_state
-    
-    # Add messages to session state
-    for msg in updated_state["messages"]:
-        if msg["role"] == "agent":
-            st.session_state.messages.append({"role": "agent", "content": msg["content"]})
-        elif msg["role"] == "bot":
-            st.session_state.messages.append({"role": "bot", "content": msg["content"]})
+# Compile the graph and create the LLM client once per server process
+@st.cache_resource(show_spinner="Starting the customer bot...")
+def load_customer_bot():
+    """Shared graph and LLM client for every session"""
+    return bot_agent.warm_up()
+
+load_customer_bot()
+
+# One store of conversations shared by every browser session in this process
+@st.cache_resource
+def load_session_manager():
+    """Session store with idle and memory-budget eviction"""
+    return SessionManager.from_env()
+
+sessions = load_session_manager()
+
+# Bot openers generated ahead of time, so new sessions and resets don't wait for the LLM
+@st.cache_resource
+def load_opener_pool():
+    """Pool of conversation openers refilled in the background"""
+    return OpenerPool.from_env(generate_opener).start()
+
+openers = load_opener_pool()
+
+def start_conversation():
+    """Open a new conversation from a pooled bot opener"""
+    session = sessions.create()
+    sessions.commit(session, openers.take())
+    bot_agent.start_speculation(sessions.to_state(session))
+    st.session_state.conversation_id = session.conversation_id
+    st.session_state.chat_window = CHAT_WINDOW
+    return session
+
+# Initialize session state; a conversation evicted while idle starts over
+session = sessions.get(st.session_state.get("conversation_id"))
+if session is None:
+    session = start_conversation()
 
 # App title
 st.title("Customer Support Bot Simulator")
@@ -126,83 +143,59 @@ with st.container():
     """, unsafe_allow_html=True)
 
 # Display chat messages
+def show_older():
+    st.session_state.chat_window += CHAT_WINDOW
+
+# The chat history reruns on its own when older messages are loaded; each block of
+# messages is the same markup from run to run, so the browser only redraws the newest
+@st.fragment
+def chat_history(session):
+    start = window_start(len(session.log), st.session_state.setdefault("chat_window", CHAT_WINDOW))
+    if start:
+        st.button(f"Load older messages ({start} hidden)", on_click=show_older)
+    for chunk in history_chunks(session.log, start):
+        st.markdown(chunk, unsafe_allow_html=True)
+
 st.subheader("Chat")
-for msg in st.session_state.messages:
-    if msg["role"] == "agent":
-        st.markdown(f"""
-        <div class="chat-message agent">
-            <div class="avatar">A</div>
-            <div class="content">
-                <div class="sender">Support Agent</div>
-                <div class="message">{msg["content"]}</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
-        <div class="chat-message bot">
-            <div class="avatar">C</div>
-            <div class="content">
-                <div class="sender">Customer Bot</div>
-                <div class="message">{msg["content"]}</div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+chat_history(session)
 
 # Input for agent response
 agent_input = st.chat_input("Type your agent response...")
 
 if agent_input:
     # Add agent message to chat
-    st.session_state.messages.append({"role": "agent", "content": agent_input})
+    st.markdown(message_html("agent", agent_input), unsafe_allow_html=True)
     
-    # Process with bot
-    updated_state = handle_agent_input(agent_input, st.session_state.state)
-    st.session_state.state = updated_state
+    # Stream the bot's response into the chat as it is generated
+    reply = stream_agent_input(agent_input, sessions.to_state(session))
+    placeholder = st.empty()
+    bot_response = ""
+    for token in reply:
+        bot_response += token
+        placeholder.markdown(bubble_html("bot", bot_response + "▌"), unsafe_allow_html=True)
+    placeholder.markdown(message_html("bot", bot_response), unsafe_allow_html=True)
     
-    # Get bot's response and add to chat
-    if len(updated_state["messages"]) > 0 and updated_state["messages"][-1]["role"] == "bot":
-        bot_response = updated_state["messages"][-1]["content"]
-        st.session_state.messages.append({"role": "bot", "content": bot_response})
-    
-    # Force a rerun to update the UI
-    st.rerun()
+    # Commit the updated state once the reply is complete; the next run shows both
+    # messages in the history, so there is no need to rerun now
+    sessions.commit(session, reply.state)
 
 # Show current state (for debugging)
+state = sessions.to_state(session)
 with st.expander("Current Conversation State"):
     st.markdown(f"""
     <div class="state-info">
-        <p><b>Current state:</b> {st.session_state.state["conversation_state"]}</p>
-        <p><b>Agent name:</b> {st.session_state.state["agent_name"] or "Not identified yet"}</p>
-        <p><b>Correct queue:</b> {str(st.session_state.state["correct_queue"]) if st.session_state.state["correct_queue"] is not None else "Not confirmed yet"}</p>
-        <p><b>Member ID:</b> {st.session_state.state["member_id"] or "Not provided yet"}</p>
-        <p><b>Authentication status:</b> {str(st.session_state.state["authenticated"]) if st.session_state.state["authenticated"] is not None else "Not authenticated yet"}</p>
-        <p><b>Plan status:</b> {st.session_state.state["plan_status"] or "Not inquired yet"}</p>
+        <p><b>Current state:</b> {html.escape(state["conversation_state"])}</p>
+        <p><b>Agent name:</b> {html.escape(state["agent_name"] or "Not identified yet")}</p>
+        <p><b>Correct queue:</b> {str(state["correct_queue"]) if state["correct_queue"] is not None else "Not confirmed yet"}</p>
+        <p><b>Member ID:</b> {html.escape(state["member_id"] or "Not provided yet")}</p>
+        <p><b>Authentication status:</b> {str(state["authenticated"]) if state["authenticated"] is not None else "Not authenticated yet"}</p>
+        <p><b>Plan status:</b> {html.escape(state["plan_status"] or "Not inquired yet")}</p>
     </div>
     """, unsafe_allow_html=True)
 
 # Reset conversation button
 if st.button("Reset Conversation"):
-    st.session_state.messages = []
-    st.session_state.state = {
-        "messages": [],
-        "agent_name": None,
-        "member_id": None,
-        "correct_queue": None,
-        "authenticated": None,
-        "plan_status": None,
-        "conversation_state": "INTRODUCTION"
-    }
-    
-    # Trigger initial bot message
-    updated_state = handle_agent_input("Hello, this is customer support. How can I help you today?", st.session_state.state)
-    st.session_state.state = updated_state
-    
-    # Add messages to session state
-    for msg in updated_state["messages"]:
-        if msg["role"] == "agent":
-            st.session_state.messages.append({"role": "agent", "content": msg["content"]})
-        elif msg["role"] == "bot":
-            st.session_state.messages.append({"role": "bot", "content": msg["content"]})
-    
+    sessions.discard(session.conversation_id)
+    bot_agent.speculator.discard(session.conversation_id)
+    start_conversation()
     st.rerun()
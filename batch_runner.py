@@ -0,0 +1,172 @@
+"""Replay scripted agent transcripts through the customer bot in bulk.
+
+Generate a synthetic transcript file:
+    python batch_runner.py generate -n 1000 -o transcripts.jsonl
+
+Run it over a process pool against the stub backend:
+    python batch_runner.py run transcripts.jsonl -o results.jsonl --backend stub --processes 4 --async
+
+Each transcript line is {"id": ..., "turns": ["agent message", ...]}. Each
+result line holds the final State and per-turn timings in milliseconds.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from multiprocessing import Pool
+from typing import Dict, Iterator, List
+
+# Agent lines per stage, as in AGENT_RESPONSES in src/hooks/use-chatbot.ts
+AGENT_RESPONSES = {
+    "introduction": [
+        "Hello, thank you for calling customer support. My name is Alex. How can I help you today?",
+        "Good day, you've reached customer support. I'm Jamie. How may I assist you?",
+        "Welcome to customer support. This is Taylor speaking. What can I do for you today?",
+    ],
+    "queue_verification": [
+        "Yes, you're in the right queue for coverage inquiries. How can I help?",
+        "Actually, this is the general support queue. Let me transfer you to the coverage department. Their direct number is 555-123-4567.",
+        "You're in the right place. I can help you with your coverage questions.",
+    ],
+    "authentication": [
+        "I'll need to verify your identity. Can you please provide your member ID?",
+        "Thanks for the member ID. For security purposes, could you also confirm your date of birth?",
+        "Perfect, I've verified your identity in our system. How can I help with your coverage today?",
+    ],
+    "inquiry": [
+        "I've checked your plan, and yes, it is currently active.",
+        "Your plan is active and set to renew on the 15th of next month.",
+        "I see that your plan is currently active. Your coverage includes medical, dental, and vision.",
+    ],
+}
+
+GREETING = "Hello, this is customer support. How can I help you today?"
+
+def generate_transcripts(count: int, seed: int = 7) -> Iterator[Dict]:
+    """Build scripted transcripts by sampling one or two lines per stage"""
+    rng = random.Random(seed)
+    for index in range(count):
+        turns = [GREETING]
+        for responses in AGENT_RESPONSES.values():
+            turns.extend(rng.sample(responses, rng.randint(1, 2)))
+        yield {"id": f"transcript-{index}", "turns": turns}
+
+def _init_worker(backend: str) -> None:
+    """Select the LLM backend before the worker imports the bot"""
+    if backend:
+        os.environ["LLM_BACKEND"] = backend
+
+def _run_transcript(transcript: Dict) -> Dict:
+    from bot_agent import handle_agent_input
+
+    state = None
+    timings = []
+    for agent_input in transcript["turns"]:
+        start = time.perf_counter()
+        state = handle_agent_input(agent_input, state)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"id": transcript["id"], "state": state, "turn_ms": timings}
+
+async def _arun_transcript(transcript: Dict, limit: asyncio.Semaphore) -> Dict:
+    from bot_agent import ahandle_agent_input
+
+    async with limit:
+        state = None
+        timings = []
+        for agent_input in transcript["turns"]:
+            start = time.perf_counter()
+            state = await ahandle_agent_input(agent_input, state)
+            timings.append((time.perf_counter() - start) * 1000)
+        return {"id": transcript["id"], "state": state, "turn_ms": timings}
+
+def _run_chunk(job: tuple) -> List[Dict]:
+    """Run one chunk of transcripts in a worker, concurrently if asked and supported"""
+    transcripts, use_async, concurrency = job
+    import llm_backends
+
+    if use_async and llm_backends.supports_async(llm_backends.get_llm()):
+        async def run_all():
+            limit = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(_arun_transcript(transcript, limit) for transcript in transcripts))
+        from bot_agent import run_sync
+
+        return run_sync(run_all())
+    return [_run_transcript(transcript) for transcript in transcripts]
+
+def _chunks(transcripts: List[Dict], size: int) -> Iterator[List[Dict]]:
+    for start in range(0, len(transcripts), size):
+        yield transcripts[start:start + size]
+
+def run_batch(transcripts: List[Dict], output_path: str, processes: int = 1, backend: str = "",
+              use_async: bool = False, concurrency: int = 100, chunk_size: int = 50) -> Dict:
+    """Run every transcript, write one result line each and return summary stats"""
+    jobs = ((chunk, use_async, concurrency) for chunk in _chunks(transcripts, chunk_size))
+    final_states = Counter()
+    turns = 0
+
+    start = time.perf_counter()
+    with Pool(processes, initializer=_init_worker, initargs=(backend,)) as pool, open(output_path, "w") as output:
+        for results in pool.imap_unordered(_run_chunk, jobs):
+            for result in results:
+                final_states[result["state"]["conversation_state"]] += 1
+                turns += len(result["turn_ms"])
+                output.write(json.dumps(result) + "\n")
+    elapsed = time.perf_counter() - start
+
+    return {
+        "conversations": len(transcripts),
+        "turns": turns,
+        "seconds": elapsed,
+        "conversations_per_sec": len(transcripts) / elapsed,
+        "turns_per_sec": turns / elapsed,
+        "final_states": dict(final_states),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write synthetic transcripts to a JSONL file")
+    generate.add_argument("-n", "--count", type=int, default=1000)
+    generate.add_argument("-o", "--output", default="transcripts.jsonl")
+    generate.add_argument("--seed", type=int, default=7)
+
+    run = commands.add_parser("run", help="Replay transcripts and write outcomes")
+    run.add_argument("transcripts", help="JSONL file of transcripts")
+    run.add_argument("-o", "--output", default="results.jsonl")
+    run.add_argument("--processes", type=int, default=os.cpu_count())
+    run.add_argument("--backend", default="", help="LLM backend (default: LLM_BACKEND)")
+    run.add_argument("--async", dest="use_async", action="store_true", help="Run each worker's conversations concurrently")
+    run.add_argument("--concurrency", type=int, default=100, help="Concurrent conversations per worker in async mode")
+    run.add_argument("--chunk-size", type=int, default=50)
+
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        with open(args.output, "w") as f:
+            for transcript in generate_transcripts(args.count, args.seed):
+                f.write(json.dumps(transcript) + "\n")
+        print(f"Wrote {args.count} transcripts to {args.output}")
+        return
+
+    with open(args.transcripts) as f:
+        transcripts = [json.loads(line) for line in f if line.strip()]
+
+    summary = run_batch(transcripts, args.output, args.processes, args.backend,
+                        args.use_async, args.concurrency, args.chunk_size)
+
+    print(f"Conversations:      {summary['conversations']}")
+    print(f"Turns:              {summary['turns']}")
+    print(f"Wall time:          {summary['seconds']:.2f} s")
+    print(f"Conversations/sec:  {summary['conversations_per_sec']:.1f}")
+    print(f"Turns/sec:          {summary['turns_per_sec']:.1f}")
+    print("State reached:")
+    for state, count in sorted(summary["final_states"].items(), key=lambda item: -item[1]):
+        print(f"  {state:<20}{count:>8}  {'#' * max(1, round(40 * count / summary['conversations']))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Streamlit script-run time of app.py against conversation length.
+
+Runs the app headless with streamlit.testing (AppTest) on the instant stub
+backend, seeds its conversation with --messages messages, then times a plain
+rerun, an agent turn (chat input through to the committed reply) and, where
+the app has one, the "load older" click, which reruns only the chat history
+fragment. Also counts the elements each run sends to the browser.
+
+Point --app at another copy of the app (e.g. `git show <rev>:app.py >
+/tmp/app_before.py`, run from the repository root so its imports resolve) to
+compare it with the current one.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat_render --messages 100 500 1000 2000
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.update(LLM_BACKEND="stub", LLM_STUB_LATENCY="0", LLM_CACHE="off")
+
+from streamlit.testing.v1 import AppTest
+
+import session_manager
+from batch_runner import generate_transcripts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One manager for every AppTest, so the benchmark can seed the app's conversation
+manager = session_manager.SessionManager(memory_budget=1 << 40)
+session_manager.SessionManager.from_env = classmethod(lambda cls: manager)
+
+def seed(conversation_id: str, count: int) -> None:
+    """Grow a conversation to count messages: agent lines from synthetic transcripts, markup-heavy bot replies"""
+    log = manager.get(conversation_id).log
+    agent_lines = [turn for transcript in generate_transcripts(count) for turn in transcript["turns"]]
+    position = 0
+    while len(log) < count:
+        log.append({"role": "agent", "content": agent_lines[position % len(agent_lines)]})
+        log.append({"role": "bot", "content": f"Thanks! Member <ID> #{position} & plan status \"active\"?"})
+        position += 1
+
+def timed(action, repeat: int) -> float:
+    """Median milliseconds of action()"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+def elements(at: AppTest) -> int:
+    return len(at.markdown) + len(at.button)
+
+def measure(app: str, count: int, repeat: int) -> dict:
+    at = AppTest.from_file(os.path.abspath(app), default_timeout=120).run()
+    seed(at.session_state["conversation_id"], count)
+    at.run()
+    result = {"elements": elements(at), "rerun_ms": timed(at.run, repeat)}
+    result["turn_ms"] = timed(lambda: at.chat_input[0].set_value("Can you confirm the plan status?").run(), repeat)
+    older = [button for button in at.button if button.label.startswith("Load older")]
+    result["load_older_ms"] = timed(lambda: older[0].click().run(), 1) if older else None
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--messages", type=int, nargs="+", default=[100, 500, 1000, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"App: {os.path.relpath(args.app)}, instant stub LLM, median of {args.repeat} runs")
+    print(f"{'messages':>8}  {'elements':>8}  {'rerun':>10}  {'turn':>10}  {'load older':>10}")
+    for count in args.messages:
+        result = measure(args.app, count, args.repeat)
+        older = f"{result['load_older_ms']:8.1f} ms" if result["load_older_ms"] is not None else f"{'-':>10}"
+        print(f"{count:>8}  {result['elements']:>8}  {result['rerun_ms']:7.1f} ms  {result['turn_ms']:7.1f} ms  {older}")
+
+
+if __name__ == "__main__":
+    main()
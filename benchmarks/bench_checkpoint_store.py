@@ -0,0 +1,94 @@
+"""Checkpoint write/read latency with many active conversations.
+
+Opens --conversations conversations, then runs --turns rounds in which every
+conversation appends an agent and a bot message and is checkpointed, timing
+each save (buffered) and the batch flushes. Afterwards reopens the file and
+times loading random conversations, as a resume after restart would.
+tests/test_checkpoint_store.py checks that what is loaded matches what was saved.
+
+Run from the repository root:
+    python -m benchmarks.bench_checkpoint_store --conversations 10000 --turns 5
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from checkpoint_store import SQLiteCheckpointStore
+
+AGENT_LINE = "Yes, you're in the right queue for coverage inquiries. How can I help?"
+BOT_LINE = "Thanks. I'd like to check whether my plan is currently active."
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": samples[len(samples) // 2] * 1e6,
+        "p99": samples[int(len(samples) * 0.99)] * 1e6,
+        "mean": statistics.fmean(samples) * 1e6,
+    }
+
+def report(label, samples):
+    stats = percentiles(samples)
+    print(f"{label:<22} p50 {stats['p50']:8.1f} us  p99 {stats['p99']:8.1f} us  mean {stats['mean']:8.1f} us")
+
+def new_state():
+    return {
+        "messages": [], "agent_name": None, "member_id": None, "correct_queue": None,
+        "authenticated": None, "plan_status": None, "conversation_state": "INTRODUCTION", "llm_calls": 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite")
+        store = SQLiteCheckpointStore(path, batch_size=args.batch_size, flush_interval=None,
+                                      synchronous=args.synchronous)
+        states = {f"conv-{n}": new_state() for n in range(args.conversations)}
+
+        saves, flushes = [], []
+        start = time.perf_counter()
+        for turn in range(args.turns):
+            for conversation_id, state in states.items():
+                state["messages"].append({"role": "agent", "content": f"{AGENT_LINE} ({turn})"})
+                state["messages"].append({"role": "bot", "content": f"{BOT_LINE} ({turn})"})
+                state["agent_name"] = "Alex"
+                state["llm_calls"] = 1
+                pending = len(store._pending)
+                began = time.perf_counter()
+                store.save(conversation_id, state)
+                elapsed = time.perf_counter() - began
+                # A save that emptied the buffer paid for a whole batch
+                (flushes if pending + 1 >= args.batch_size else saves).append(elapsed)
+        store.close()
+        writes = time.perf_counter() - start
+        checkpoints = args.conversations * args.turns
+
+        print(f"Conversations x turns: {args.conversations} x {args.turns} ({args.synchronous}, batch {args.batch_size})")
+        print(f"Write throughput:      {checkpoints / writes:,.0f} checkpoints/s")
+        report("save (buffered)", saves)
+        if flushes:
+            report("save + batch flush", flushes)
+
+        store = SQLiteCheckpointStore(path, flush_interval=None)
+        rng = random.Random(0)
+        reads = []
+        for _ in range(args.reads):
+            conversation_id = f"conv-{rng.randrange(args.conversations)}"
+            began = time.perf_counter()
+            store.load(conversation_id)
+            reads.append(time.perf_counter() - began)
+        report("load after reopen", reads)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
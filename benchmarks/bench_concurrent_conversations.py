@@ -0,0 +1,67 @@
+"""Run N concurrent conversations on one event loop against a local stub model.
+
+Every conversation walks the full flow; reports how many concluded and the
+most LLM calls any turn made (tests/test_concurrent_conversations.py checks
+both).
+
+Run from the repository root:
+    python -m benchmarks.bench_concurrent_conversations --conversations 500
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import bot_agent
+from llm_backends import StubChatModel, set_llm
+
+AGENT_TURNS = [
+    "Hello, this is customer support. How can I help you today?",
+    "My name is Alex.",
+    "Yes, you're in the right queue for coverage inquiries.",
+    "Thanks, I've verified your identity.",
+    "I've checked your plan, and it is currently active.",
+]
+
+
+async def run_conversation() -> dict:
+    state = None
+    max_calls = 0
+    for agent_input in AGENT_TURNS:
+        state = await bot_agent.ahandle_agent_input(agent_input, state)
+        max_calls = max(max_calls, state["llm_calls"])
+    return dict(state, max_llm_calls=max_calls)
+
+
+async def run_all(conversations: int) -> List[dict]:
+    return await asyncio.gather(*(run_conversation() for _ in range(conversations)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.05, help="Simulated LLM latency in seconds")
+    args = parser.parse_args()
+
+    set_llm(StubChatModel(latency=args.delay))
+    # Every reply goes to the model so the run measures concurrent LLM calls
+    bot_agent.reply_mode = "llm"
+
+    start = time.perf_counter()
+    states = bot_agent.run_sync(run_all(args.conversations))
+    elapsed = time.perf_counter() - start
+
+    concluded = sum(state["conversation_state"] == "CONCLUSION" for state in states)
+
+    turns = args.conversations * len(AGENT_TURNS)
+    serial = turns * args.delay
+    print(f"Conversations:      {args.conversations}")
+    print(f"Turns:              {turns}")
+    print(f"Concluded:          {concluded}/{args.conversations}")
+    print(f"Max LLM calls/turn: {max(state['max_llm_calls'] for state in states)}")
+    print(f"Wall time:          {elapsed:8.2f} s (serial LLM time would be {serial:.2f} s)")
+    print(f"Turns/sec:          {turns / elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
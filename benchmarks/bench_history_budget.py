@@ -0,0 +1,81 @@
+"""Prompt history stays within its token budget over long conversations.
+
+Runs --conversations conversations of --turns agent messages each through
+handle_agent_input on the stub backend. The agent never gives a name, so
+every turn stays in INTRODUCTION and makes one LLM call. Reports the history
+and prompt tokens per call, how many calls went over the budget, and the
+history build time early and late in the conversation. tests/test_history_budget.py
+checks the budget and that each message is summarized once.
+
+Run from the repository root:
+    python -m benchmarks.bench_history_budget --turns 200 --budget 400
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("LLM_CACHE", "off")
+
+import bot_agent
+from conversation_history import HistoryBuilder
+
+AGENT_LINES = [
+    "Thanks for holding, let me pull up the account.",
+    "Could you repeat that? The line cut out for a second and I missed the last part of what you said.",
+    "Okay.",
+    "I see a few notes on this record from last week about a claim that was reprocessed after an appeal.",
+]
+
+class CheckedHistoryBuilder(HistoryBuilder):
+    """HistoryBuilder that records history sizes and counts folded messages"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.folded = 0
+        self.build_times = []
+        self.history_sizes = []
+
+    def _fold(self, summary, messages):
+        self.folded += len(messages)
+        return super()._fold(summary, messages)
+
+    def build(self, state):
+        start = time.perf_counter()
+        history = super().build(state)
+        self.build_times.append(time.perf_counter() - start)
+        self.history_sizes.append(self.history_tokens(history))
+        return history
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=400)
+    parser.add_argument("--summary-tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    builder = CheckedHistoryBuilder(token_budget=args.budget, summary_tokens=args.summary_tokens)
+    bot_agent.history_builder = builder
+    bot_agent.reply_mode = "llm"
+
+    for _ in range(args.conversations):
+        state = None
+        for turn in range(args.turns):
+            state = bot_agent.handle_agent_input(AGENT_LINES[turn % len(AGENT_LINES)], state)
+
+    stats = builder.stats()
+    early = statistics.fmean(builder.build_times[:20]) * 1e6
+    late = statistics.fmean(builder.build_times[-20:]) * 1e6
+    print(f"Conversations x turns:   {args.conversations} x {args.turns} (budget {args.budget} tokens)")
+    print(f"History tokens per call: mean {statistics.fmean(builder.history_sizes):.0f}, max {max(builder.history_sizes)}")
+    print(f"Calls over budget:       {sum(size > args.budget for size in builder.history_sizes)}")
+    print(f"Prompt tokens per call:  mean {stats['mean_prompt_tokens']:.0f}, max {stats['max_prompt_tokens']}")
+    print(f"History build time:      first 20 turns {early:.1f} us, last 20 turns {late:.1f} us")
+    print(f"Messages summarized:     {state['summarized_count']} of {len(state['messages'])} in the last conversation, "
+          f"{builder.folded} folded in all")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Cost of instrumentation per span and per turn, disabled and enabled.
+
+Times span(), count() and turn() in a tight loop with METRICS off and on,
+then replays synthetic transcripts (batch_runner.generate_transcripts)
+against an instant stub model both ways to show the per-turn overhead, and
+prints one turn's JSON log line.
+
+Run from the repository root:
+    python -m benchmarks.bench_instrumentation --iterations 200000 --conversations 100
+"""
+import argparse
+import json
+import time
+
+import bot_agent
+import instrumentation
+from batch_runner import generate_transcripts
+from llm_backends import StubChatModel, set_llm
+
+def per_call_ns(operation, iterations: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        operation()
+    return (time.perf_counter_ns() - start) / iterations
+
+def timed_span():
+    with instrumentation.span("bench"):
+        pass
+
+def counter():
+    instrumentation.count("bench_total", 1, kind="bench")
+
+def empty_turn():
+    with instrumentation.turn(conversation_id="bench"):
+        pass
+
+async def replay(transcripts):
+    for transcript in transcripts:
+        state = None
+        for agent_input in transcript["turns"]:
+            state = await bot_agent.ahandle_agent_input(agent_input, state)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--conversations", type=int, default=100)
+    args = parser.parse_args()
+
+    baseline = per_call_ns(lambda: None, args.iterations)
+    for enabled in (False, True):
+        instrumentation.configure(enable=enabled)
+        print(f"instrumentation {'on ' if enabled else 'off'}  span {per_call_ns(timed_span, args.iterations) - baseline:7.0f} ns  "
+              f"count {per_call_ns(counter, args.iterations) - baseline:7.0f} ns  "
+              f"turn {per_call_ns(empty_turn, args.iterations // 10) - baseline:7.0f} ns")
+
+    set_llm(StubChatModel())
+    bot_agent.reply_mode = "llm"
+    bot_agent.warm_up()
+    transcripts = list(generate_transcripts(args.conversations))
+    turns = sum(len(transcript["turns"]) for transcript in transcripts)
+    lines = []
+    instrumentation.turn_logger.addHandler(type("Capture", (instrumentation.logging.Handler,), {
+        "emit": lambda self, record: lines.append(record.getMessage())
+    })())
+    instrumentation.turn_logger.setLevel(instrumentation.logging.INFO)
+    print(f"Conversations: {args.conversations} ({turns} turns), instant stub LLM, reply mode llm")
+    for enabled in (False, True, False, True):
+        instrumentation.configure(enable=enabled)
+        start = time.perf_counter()
+        bot_agent.run_sync(replay(transcripts))
+        elapsed = time.perf_counter() - start
+        print(f"instrumentation {'on ' if enabled else 'off'}  {elapsed / turns * 1e6:8.1f} us per turn")
+    print("Sample turn log line:")
+    print(json.dumps(json.loads(lines[-1]), indent=2))
+
+
+if __name__ == "__main__":
+    main()
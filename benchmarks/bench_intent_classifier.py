@@ -0,0 +1,56 @@
+"""Accuracy and throughput of the intent classifier against the phrase matcher.
+
+Accuracy is measured on the held-out split of intent_training's synthetic
+corpus (phrasings never seen in training): the phrase matcher rules, the
+model alone, and the rules with the model's signals at --min-confidence or
+above filling in where the rules find none, which is what the flow's signals
+detectors use with INTENT_CLASSIFIER=on. Throughput runs over a large
+corpus of agent messages: the rules, classify_signals one message at a
+time, and the model scoring whole batches at once.
+
+Run from the repository root:
+    python -m benchmarks.bench_intent_classifier --messages 50000 --batch-sizes 1 32 1000
+"""
+import argparse
+import time
+
+import intent_training
+from benchmarks.bench_phrase_matcher import build_corpus
+from intent_classifier import (DEFAULT_MODEL_PATH, INTENT_CONFIDENCE_THRESHOLD, INTENT_TASKS, IntentModel,
+                               classify_signals, set_intent_model)
+from phrase_matcher import classify_message
+
+def throughput(label: str, run, messages: int) -> None:
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {messages / elapsed:>12,.0f} msg/s  {elapsed / messages * 1e6:8.1f} us/msg")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1000])
+    parser.add_argument("--min-confidence", type=float, default=INTENT_CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    model = IntentModel.load(args.model)
+    set_intent_model(model)
+    print(f"Held-out accuracy, model signals used from {args.min_confidence:g} confidence")
+    intent_training.print_evaluation(
+        intent_training.evaluate(model, list(intent_training.generate_examples("test")), args.min_confidence))
+
+    corpus = build_corpus(args.messages)
+    signals = INTENT_TASKS["queue"]
+    print(f"\nThroughput over {len(corpus):,} messages (queue task)")
+    throughput("rules (classify_message)", lambda: [classify_message(message) for message in corpus], len(corpus))
+    throughput("classify_signals, one at a time",
+               lambda: [classify_signals(message, signals, args.min_confidence) for message in corpus], len(corpus))
+    for size in args.batch_sizes:
+        batches = [corpus[start:start + size] for start in range(0, len(corpus), size)]
+        throughput(f"model.predict, batches of {size}",
+                   lambda: [model.predict("queue", batch) for batch in batches], len(corpus))
+
+
+if __name__ == "__main__":
+    main()
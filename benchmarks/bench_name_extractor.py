@@ -0,0 +1,84 @@
+"""Accuracy and throughput of the agent-name extractor.
+
+Scores the extractor and the old split-based loop from process_introduction
+against the labelled corpus in benchmarks/data/agent_introductions.jsonl,
+then measures throughput of the single and batch APIs on a synthetic
+transcript corpus.
+
+Run from the repository root:
+    python -m benchmarks.bench_name_extractor --messages 500000 --processes 4
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from bot_agent import NAME_CONFIDENCE_THRESHOLD
+from name_extractor import extract_name, extract_names
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "agent_introductions.jsonl")
+
+def legacy_extract(message: str):
+    """The name extraction process_introduction used before the extractor"""
+    agent_message = message.lower()
+    for indicator in ["name is", "this is", "speaking", "i am", "i'm"]:
+        if indicator in agent_message:
+            parts = agent_message.split(indicator, 1)
+            if len(parts) > 1 and parts[1].strip():
+                potential_name = parts[1].strip().split()[0].strip(',.!?')
+                if potential_name and len(potential_name) > 1:
+                    return potential_name.capitalize()
+    return None
+
+def extractor(message: str):
+    match = extract_name(message)
+    return match.name if match is not None and match.confidence >= NAME_CONFIDENCE_THRESHOLD else None
+
+def accuracy(extract, corpus) -> float:
+    return sum(extract(case["text"]) == case["name"] for case in corpus) / len(corpus)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as f:
+        corpus = [json.loads(line) for line in f]
+
+    print(f"Labelled messages:  {len(corpus)}")
+    print(f"Legacy accuracy:    {accuracy(legacy_extract, corpus):8.1%}")
+    print(f"Extractor accuracy: {accuracy(extractor, corpus):8.1%}")
+
+    # Half canned lines that repeat across transcripts, half unique lines
+    rng = random.Random(7)
+    texts = [case["text"] for case in corpus]
+    transcripts = [
+        rng.choice(texts) if index % 2 else f"{rng.choice(texts)} (ref {index})"
+        for index in range(args.messages)
+    ]
+
+    start = time.perf_counter()
+    for message in transcripts:
+        legacy_extract(message)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in extract_names(transcripts):
+        pass
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in extract_names(transcripts, processes=args.processes):
+        pass
+    batch = time.perf_counter() - start
+
+    print(f"Messages:           {args.messages}")
+    print(f"Legacy loop:        {args.messages / legacy:12,.0f} msg/s")
+    print(f"Extractor (batch):  {args.messages / single:12,.0f} msg/s")
+    print(f"Batch, {args.processes} procs:    {args.messages / batch:12,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
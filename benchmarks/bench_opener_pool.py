@@ -0,0 +1,66 @@
+"""Opener pool: time to open a conversation with and without pooled openers.
+
+Opens --sessions conversations the way app.py does (one every --interval
+seconds, like sessions and resets arriving) against a stub model with
+simulated latency, first generating each opener on the spot as before the
+pool, then drawing from an OpenerPool. Openers go to the model (reply mode
+"llm", the default) unless --reply-mode says otherwise; in template-first
+mode the flow's scripted opening line already skips the LLM.
+
+Run from the repository root:
+    python -m benchmarks.bench_opener_pool --sessions 40 --interval 0.5 --delay 0.3
+"""
+import argparse
+import statistics
+import time
+
+import bot_agent
+from llm_backends import StubChatModel, set_llm
+from opener_pool import OpenerPool
+from session_manager import SessionManager
+
+def open_sessions(take, sessions: int, interval: float):
+    manager = SessionManager()
+    latencies = []
+    for _ in range(sessions):
+        start = time.perf_counter()
+        session = manager.create()
+        manager.commit(session, take())
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+def report(label: str, latencies) -> None:
+    print(f"{label:<28} p50 {statistics.median(latencies) * 1000:8.2f} ms  "
+          f"p99 {sorted(latencies)[int(len(latencies) * 0.99)] * 1000:8.2f} ms  max {max(latencies) * 1000:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between new sessions")
+    parser.add_argument("--delay", type=float, default=0.3, help="Simulated LLM latency in seconds")
+    parser.add_argument("--size", type=int, default=8, help="Pool size")
+    parser.add_argument("--refill-per-minute", type=float, default=300)
+    parser.add_argument("--reply-mode", default="llm", choices=bot_agent.REPLY_MODES)
+    args = parser.parse_args()
+
+    set_llm(StubChatModel(latency=args.delay))
+    bot_agent.reply_mode = args.reply_mode
+    bot_agent.warm_up()
+    print(f"Sessions: {args.sessions}, one every {args.interval * 1000:.0f} ms, LLM {args.delay * 1000:.0f} ms, "
+          f"reply mode {args.reply_mode}")
+
+    report("no pool", open_sessions(bot_agent.generate_opener, args.sessions, args.interval))
+
+    pool = OpenerPool(bot_agent.generate_opener, size=args.size, refill_per_minute=args.refill_per_minute).start()
+    while pool.stats()["pooled"] < args.size:
+        time.sleep(0.05)
+    report(f"pool of {args.size}, warm", open_sessions(pool.take, args.sessions, args.interval))
+    pool.close()
+    stats = pool.stats()
+    print(f"  hit rate {stats['hit_rate']:.1%} ({stats['hits']} hits, {stats['misses']} misses), "
+          f"{stats['generated']} openers generated at up to {args.refill_per_minute:g}/min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Throughput of the compiled phrase matcher.
+
+Compares the single-pass matcher with the substring scans the state
+detectors used before, over a large synthetic corpus of agent messages.
+The old scans stop at the first substring per detector and ignore word
+boundaries and negation, so they are faster but wrong on many of the
+lines below; tests/test_phrase_matcher.py checks the matcher's answers.
+
+Run from the repository root:
+    python -m benchmarks.bench_phrase_matcher --messages 200000
+"""
+import argparse
+import random
+import time
+
+from phrase_matcher import classify_message
+
+# Agent lines the corpus is built from (tests/test_phrase_matcher.py has their expected signals)
+MESSAGES = [
+    "Your plan is inactive.",
+    "Your plan is not active at the moment.",
+    "Your plan isn't currently active.",
+    "The plan expired last month.",
+    "I've checked your plan, and yes, it is currently active.",
+    "Yes, you're in the right queue for coverage inquiries.",
+    "You're not in the right queue, sorry.",
+    "Let me transfer you to the coverage department.",
+    "That's a different department.",
+    "Perfect, I've verified your identity in our system.",
+    "I haven't verified you yet.",
+    "Thank you for the information.",
+    "There are no overage charges on this account.",
+    "My name is Alex, how can I help?",
+]
+
+FILLER = ["okay", "so", "let me see", "one moment", "thanks for waiting", "alright", "I see", "sure", "um"]
+FRAGMENTS = MESSAGES + [
+    "Could you spell that for me?",
+    "What's the date of birth on the account?",
+    "I can look into that for you.",
+    "Is there anything else I can help with?",
+]
+
+LEGACY_PHRASES = [
+    ["coverage", "right queue", "correct queue", "help with coverage", "assist with coverage"],
+    ["wrong queue", "incorrect queue", "transfer you", "different department"],
+    ["authenticated", "verified", "confirmed your identity", "thank you for the information"],
+    ["active", "inactive", "not active", "expired"],
+]
+
+def legacy_scan(message: str) -> int:
+    """The per-detector substring scans the detectors used to run"""
+    agent_message = message.lower()
+    found = 0
+    for phrases in LEGACY_PHRASES:
+        if any(phrase in agent_message for phrase in phrases):
+            found += 1
+    return found
+
+def build_corpus(size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        " ".join([rng.choice(FILLER), rng.choice(FRAGMENTS), rng.choice(FILLER), rng.choice(FRAGMENTS)])
+        for _ in range(size)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages)
+
+    start = time.perf_counter()
+    for message in corpus:
+        legacy_scan(message)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for message in corpus:
+        classify_message(message)
+    matcher = time.perf_counter() - start
+
+    print(f"Messages:           {args.messages}")
+    print(f"Legacy scans:       {args.messages / legacy:12,.0f} msg/s")
+    print(f"Compiled matcher:   {args.messages / matcher:12,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
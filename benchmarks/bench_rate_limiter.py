@@ -0,0 +1,75 @@
+"""Shared rate-limited LLM client against a rate-limiting HTTP stand-in.
+
+Starts benchmarks.fake_llm_server, then fires a burst of reply requests at
+it through the http backend, first bare and then through RateLimitedChatModel
+with a limiter configured to the same requests/min. Half the requests are
+new conversations (PRIORITY_NEW) and half are in progress (PRIORITY_ACTIVE).
+Reports failed requests, 429s the server sent and latency per priority.
+
+Run from the repository root:
+    python -m benchmarks.bench_rate_limiter --requests 100 --rpm 600
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from benchmarks.fake_llm_server import serve
+from llm_backends import HTTPChatModel, rate_limited
+from rate_limiter import PRIORITY_ACTIVE, PRIORITY_NEW, RateLimiter
+
+MESSAGES = [
+    SystemMessage(content="You are a customer calling about coverage. Politely ask for the agent's name."),
+    HumanMessage(content="Hello, this is customer support. How can I help you today?"),
+]
+
+async def send(model, priority: int):
+    start = time.perf_counter()
+    try:
+        await model.ainvoke(MESSAGES, config={"metadata": {"priority": priority}})
+        return priority, time.perf_counter() - start, True
+    except Exception:
+        return priority, time.perf_counter() - start, False
+
+async def burst(model, requests: int):
+    return await asyncio.gather(*(
+        send(model, PRIORITY_NEW if number % 2 else PRIORITY_ACTIVE) for number in range(requests)
+    ))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--rpm", type=float, default=600, help="Stand-in and limiter requests per minute")
+    parser.add_argument("--burst", type=float, default=10, help="Stand-in and limiter burst size")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in seconds per completion")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Share of stand-in requests that get 503")
+    parser.add_argument("--connections", type=int, default=8, help="Connection pool size and concurrency bound")
+    args = parser.parse_args()
+
+    server = serve(rpm=args.rpm, burst=args.burst, latency=args.latency, error_rate=args.error_rate)
+    model = HTTPChatModel(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", model="stand-in",
+                          max_connections=args.connections)
+    limiter = RateLimiter(requests_per_minute=args.rpm, request_burst=args.burst, max_concurrency=args.connections)
+    print(f"Requests: {args.requests} at once, stand-in {args.rpm:g}/min (burst {args.burst:g}), "
+          f"{args.latency * 1000:.0f} ms, {args.error_rate:.0%} 503s, {args.connections} connections")
+
+    for name, client in (("bare", model), ("rate-limited", rate_limited(model, limiter=limiter, max_retries=6))):
+        server.counts.clear()
+        start = time.perf_counter()
+        results = asyncio.run(burst(client, args.requests))
+        elapsed = time.perf_counter() - start
+        failed = sum(not ok for _, _, ok in results)
+        print(f"{name:<13} failed {failed:4d}/{args.requests}  server 429s {server.counts['rate_limited']:4d}  "
+              f"503s {server.counts['unavailable']:3d}  wall {elapsed:5.2f} s")
+        for priority, label in ((PRIORITY_ACTIVE, "in progress"), (PRIORITY_NEW, "new")):
+            latencies = sorted(latency for request_priority, latency, ok in results if ok and request_priority == priority)
+            if latencies:
+                print(f"  {label:<12} p50 {statistics.median(latencies):5.2f} s  "
+                      f"p99 {latencies[int(len(latencies) * 0.99)]:5.2f} s")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
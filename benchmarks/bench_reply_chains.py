@@ -0,0 +1,79 @@
+"""Per-turn Python overhead of building reply chains on every call.
+
+Compares, on an instant stub LLM so only Python overhead is measured:
+
+- rebuilt: format the system prompt, create the ChatPromptTemplate and
+  compose prompt | llm | parser for every reply (the old node code)
+- shared:  the prebuilt per-state chain from get_reply_chain, with
+  agent_name and history passed as inputs
+
+Run from the repository root:
+    python -m benchmarks.bench_reply_chains --turns 2000
+"""
+import argparse
+import statistics
+import time
+
+import bot_agent
+from llm_backends import StubChatModel, set_llm
+
+HISTORY = [
+    ("human", "Hello, this is customer support. How can I help you today?"),
+    ("ai", "Hi, I'm calling on behalf of a member about their insurance coverage. May I know your name, please?"),
+    ("human", "My name is Alex."),
+]
+
+def rebuilt_chain(conversation_state: str, agent_name: str):
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    system_prompt = bot_agent.get_flow().prompts[conversation_state].format(agent_name=agent_name)
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        MessagesPlaceholder("history"),
+        ("human", bot_agent.REPLY_INSTRUCTION),
+    ])
+    return prompt | bot_agent.get_llm() | StrOutputParser()
+
+async def time_turns(turns: int, shared: bool):
+    """Per-turn seconds spent getting the chain, and getting plus running it"""
+    states = list(bot_agent.get_flow().prompts)
+    build, total = [], []
+    for turn in range(turns):
+        conversation_state = states[turn % len(states)]
+        start = time.perf_counter()
+        if shared:
+            chain = bot_agent.get_reply_chain(conversation_state)
+        else:
+            chain = rebuilt_chain(conversation_state, "Alex")
+        built = time.perf_counter()
+        await chain.ainvoke({"agent_name": "Alex", "history": HISTORY})
+        build.append(built - start)
+        total.append(time.perf_counter() - start)
+    return build, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    set_llm(StubChatModel())
+    bot_agent.warm_up()
+
+    # Warm both paths so imports and first-call setup are excluded
+    bot_agent.run_sync(time_turns(20, shared=False))
+    bot_agent.run_sync(time_turns(20, shared=True))
+
+    print(f"Turns: {args.turns} (stub LLM, no latency)")
+    results = {}
+    for label, shared in (("rebuilt", False), ("shared", True)):
+        build, total = bot_agent.run_sync(time_turns(args.turns, shared))
+        results[label] = statistics.median(total)
+        print(f"{label:<8} chain setup p50 {statistics.median(build) * 1e6:8.1f} us   "
+              f"turn p50 {statistics.median(total) * 1e6:8.1f} us")
+    saved = results["rebuilt"] - results["shared"]
+    print(f"Overhead removed per turn: {saved * 1e6:.1f} us ({saved / results['rebuilt']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Turns served from reply templates instead of the LLM, per reply mode.
+
+Replays synthetic transcripts (batch_runner.generate_transcripts: one or two
+agent lines per stage) against a stub model with simulated latency, once per
+REPLY_MODE, and reports the share of replies served without a model call,
+turn latency and the latency saved against the llm mode's mean reply time.
+Concurrency is capped so turn latency isn't dominated by waiting on the loop.
+
+Run from the repository root:
+    python -m benchmarks.bench_reply_templates --conversations 100 --delay 0.1
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import bot_agent
+from batch_runner import generate_transcripts
+from llm_backends import StubChatModel, set_llm
+
+async def run_transcript(turns, limit: asyncio.Semaphore):
+    async with limit:
+        state, latencies = None, []
+        for agent_input in turns:
+            start = time.perf_counter()
+            state = await bot_agent.ahandle_agent_input(agent_input, state)
+            latencies.append(time.perf_counter() - start)
+        return state, latencies
+
+async def run_all(transcripts, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(run_transcript(transcript["turns"], limit) for transcript in transcripts))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=0.1, help="Simulated LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    set_llm(StubChatModel(latency=args.delay))
+    bot_agent.warm_up()
+    transcripts = list(generate_transcripts(args.conversations))
+
+    print(f"Conversations: {args.conversations} ({args.concurrency} at a time), "
+          f"stub LLM latency {args.delay * 1000:.0f} ms")
+    mean_llm_reply = None
+    for mode in bot_agent.REPLY_MODES:
+        bot_agent.reply_mode = mode
+        bot_agent.reply_stats = bot_agent.ReplyStats()
+        start = time.perf_counter()
+        results = bot_agent.run_sync(run_all(transcripts, args.concurrency))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency for _, turn_latencies in results for latency in turn_latencies]
+        concluded = sum(state["conversation_state"] == "CONCLUSION" for state, _ in results)
+        stats = bot_agent.reply_stats.stats()
+        # REPLY_MODES starts with "llm", whose mean reply time prices the replies the other modes skip
+        mean_llm_reply = mean_llm_reply or stats["mean_llm_seconds"]
+        saved = stats["template_replies"] * mean_llm_reply - bot_agent.reply_stats.template_seconds
+        print(f"{mode:<15} template replies {stats['template_fraction']:6.1%}  "
+              f"turn p50 {statistics.median(latencies) * 1000:7.1f} ms  mean {statistics.fmean(latencies) * 1000:7.1f} ms  "
+              f"LLM time saved {saved:6.1f} s  wall {elapsed:5.2f} s  concluded {concluded}")
+
+
+if __name__ == "__main__":
+    main()
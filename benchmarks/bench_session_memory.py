@@ -0,0 +1,81 @@
+"""Per-session memory footprint, measured with tracemalloc.
+
+Compares the old layout (st.session_state.messages plus a second list of
+message dicts inside the State) with SessionManager's single log of
+__slots__ records, then shows eviction under a memory budget
+(tests/test_session_manager.py checks both).
+
+Run from the repository root:
+    python -m benchmarks.bench_session_memory --sessions 2000 --turns 10
+"""
+import argparse
+import tracemalloc
+
+from session_manager import SessionManager
+
+AGENT_LINE = "Yes, you're in the right queue for coverage inquiries. How can I help?"
+BOT_LINE = "Thanks. I'd like to check whether my plan is currently active."
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return total
+
+def dict_sessions(sessions: int, turns: int):
+    """The old layout: every message stored twice as a dict"""
+    kept = []
+    for _ in range(sessions):
+        messages, state_messages = [], []
+        for turn in range(turns):
+            # Contents are fresh strings, as they would be from user input and the LLM
+            for role, line in (("agent", AGENT_LINE), ("bot", BOT_LINE)):
+                content = f"{line} ({turn})"
+                messages.append({"role": role, "content": content})
+                state_messages.append({"role": role, "content": content})
+        state = {
+            "messages": state_messages, "agent_name": "Alex", "member_id": "AD78902145",
+            "correct_queue": True, "authenticated": True, "plan_status": None,
+            "conversation_state": "PLAN_INQUIRY",
+        }
+        kept.append((messages, state))
+    return kept
+
+def managed_sessions(sessions: int, turns: int, manager: SessionManager = None):
+    manager = manager or SessionManager()
+    for _ in range(sessions):
+        session = manager.create()
+        state = manager.to_state(session)
+        for turn in range(turns):
+            for role, line in (("agent", AGENT_LINE), ("bot", BOT_LINE)):
+                state["messages"].append({"role": role, "content": f"{line} ({turn})"})
+        state.update(agent_name="Alex", member_id="AD78902145", correct_queue=True,
+                     authenticated=True, conversation_state="PLAN_INQUIRY")
+        manager.commit(session, state)
+    return manager
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    old = measure(lambda: dict_sessions(args.sessions, args.turns))
+    new = measure(lambda: managed_sessions(args.sessions, args.turns))
+    print(f"Sessions x turns:        {args.sessions} x {args.turns}")
+    print(f"Dict layout per session: {old / args.sessions:10,.0f} bytes")
+    print(f"Session manager:         {new / args.sessions:10,.0f} bytes")
+
+    budget = new // 4
+    manager = managed_sessions(args.sessions, args.turns, SessionManager(memory_budget=budget))
+    stats = manager.stats()
+    print(f"With a {budget:,} byte budget: {stats['live_sessions']} live, "
+          f"{stats['evicted_memory']} evicted, {stats['bytes_held']:,} bytes held")
+
+
+if __name__ == "__main__":
+    main()
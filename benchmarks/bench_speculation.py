@@ -0,0 +1,70 @@
+"""Speculative pre-generation: turn latency, hit rate and wasted tokens.
+
+Replays synthetic transcripts (batch_runner.generate_transcripts) with a
+simulated agent typing pause between turns, against a stub model with
+simulated latency, with speculation off and on. Replies all go to the model
+(reply_mode "llm") unless --reply-mode says otherwise.
+
+Run from the repository root:
+    python -m benchmarks.bench_speculation --conversations 50 --delay 0.2 --typing 0.5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import bot_agent
+from batch_runner import generate_transcripts
+from llm_backends import StubChatModel, set_llm
+from speculation import Speculator
+
+async def run_transcript(conversation_id: str, turns, typing: float):
+    state = bot_agent.new_state()
+    state["conversation_id"] = conversation_id
+    latencies = []
+    for agent_input in turns:
+        start = time.perf_counter()
+        state = await bot_agent.ahandle_agent_input(agent_input, state)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(typing)
+    return latencies
+
+async def run_all(transcripts, typing: float):
+    return await asyncio.gather(*(
+        run_transcript(transcript["id"], transcript["turns"], typing) for transcript in transcripts
+    ))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="Simulated LLM latency in seconds")
+    parser.add_argument("--typing", type=float, default=0.5, help="Agent pause between turns in seconds")
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--reply-mode", default="llm", choices=bot_agent.REPLY_MODES)
+    args = parser.parse_args()
+
+    set_llm(StubChatModel(latency=args.delay))
+    bot_agent.reply_mode = args.reply_mode
+    bot_agent.warm_up()
+    transcripts = list(generate_transcripts(args.conversations))
+
+    print(f"Conversations: {args.conversations}, LLM {args.delay * 1000:.0f} ms, typing {args.typing * 1000:.0f} ms, "
+          f"reply mode {args.reply_mode}")
+    for enabled in (False, True):
+        bot_agent.speculator = Speculator(enabled=enabled, workers=args.workers)
+        results = bot_agent.run_sync(run_all(transcripts, args.typing))
+        # Let the last turn's candidates finish so their cost is counted
+        bot_agent.speculator.close()
+        latencies = [latency for turn_latencies in results for latency in turn_latencies]
+        stats = bot_agent.speculator.stats()
+        print(f"speculation {'on ' if enabled else 'off'}  turn p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+              f"mean {statistics.fmean(latencies) * 1000:7.1f} ms  p99 "
+              f"{sorted(latencies)[int(len(latencies) * 0.99)] * 1000:7.1f} ms")
+        if enabled:
+            print(f"  candidates {stats['started']}, hit rate {stats['hit_rate']:.1%} "
+                  f"({stats['hits']} hits, {stats['ready_hits']} ready on arrival, {stats['misses']} misses), "
+                  f"wasted ~{stats['wasted_tokens']:,} tokens ({stats['wasted_tokens'] / len(latencies):.0f} per turn)")
+
+
+if __name__ == "__main__":
+    main()
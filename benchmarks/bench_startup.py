@@ -0,0 +1,74 @@
+"""Startup profile: import cost of bot_agent and time-to-first-render of the app.
+
+Each measurement runs in a fresh interpreter so module caches don't hide the
+cold-start cost. The app is rendered headlessly with Streamlit's AppTest
+against the stub backend:
+
+- cold render: the first session in a new process (imports, graph compile,
+  LLM client, greeting turn)
+- warm render: a second session in the same process, served from
+  st.cache_resource and the response cache
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RENDER_SCRIPT = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+AppTest.from_file({app!r}, default_timeout=60).run()
+cold = time.perf_counter()
+AppTest.from_file({app!r}, default_timeout=60).run()
+warm = time.perf_counter()
+print(imported - start, cold - imported, warm - cold)
+"""
+
+def import_profile(module: str, top: int):
+    """Run python -X importtime and return the slowest imports by cumulative time"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split("|")
+        rows.append((int(cumulative_us), int(self_us.split(":")[1]), name.strip()))
+    total = next(cumulative for cumulative, _, name in rows if name == module)
+    return total, sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    total, slowest = import_profile("bot_agent", args.top)
+    print(f"import bot_agent:     {total / 1000:8.1f} ms")
+    for cumulative, self_us, name in slowest:
+        print(f"  {cumulative / 1000:8.1f} ms cumulative {self_us / 1000:8.1f} ms self  {name}")
+
+    env = dict(os.environ, LLM_BACKEND="stub")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env["LLM_CACHE_PATH"] = os.path.join(cache_dir, "cache.sqlite")
+        result = subprocess.run(
+            [sys.executable, "-c", RENDER_SCRIPT.format(app=os.path.join(ROOT, "app.py"))],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        )
+    streamlit_import, cold, warm = map(float, result.stdout.split()[-3:])
+    print(f"streamlit import:     {streamlit_import * 1000:8.1f} ms")
+    print(f"cold first render:    {cold * 1000:8.1f} ms")
+    print(f"warm session render:  {warm * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Turns per second against the supervisor with 1, 2, 4... worker processes.
+
+For each worker count, starts supervisor.py against the stub backend (--delay
+seconds of LLM latency) and drives it with load_test's simulated operators
+over REST, then reports throughput, latency and scaling efficiency: turns/s
+divided by workers x the per-worker turns/s of the first count run. The bot
+itself is CPU-bound Python, so scaling is near-linear only while there are
+at least as many free cores as workers plus the router.
+
+With --kill, one worker is SIGKILLed once the load is under way: its turns in
+flight are shed (503) or refused, its conversations carry on from their
+checkpoints on the other workers, and it is restarted.
+
+Run from the repository root:
+    python -m benchmarks.bench_workers --workers 1 2 4 --operators 400
+    python -m benchmarks.bench_workers --workers 2 --kill
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.load_test import Results, free_port, run_load, start_server
+
+def health(url: str) -> dict:
+    with urllib.request.urlopen(f"{url}/healthz") as response:
+        return json.load(response)
+
+def run(workers: int, args) -> tuple:
+    with tempfile.TemporaryDirectory() as scratch:
+        port = free_port()
+        supervisor = start_server(port, args.delay, os.path.join(scratch, "checkpoints.sqlite"), args.llm_concurrency,
+                                  "supervisor.py", "--workers", str(workers), "--base-port", str(free_port()))
+        url = f"http://127.0.0.1:{port}"
+
+        async def kill_when_busy(results: Results) -> None:
+            while len(results.latencies) < args.operators:
+                await asyncio.sleep(0.05)
+            victim = health(url)["workers"]["worker-0"]["pid"]
+            print(f"  killing worker-0 (pid {victim}) after {len(results.latencies)} turns")
+            os.kill(victim, signal.SIGKILL)
+
+        start = time.perf_counter()
+        results = asyncio.run(run_load(url, args.operators, args.conversations, False,
+                                       kill_when_busy if args.kill else None))
+        elapsed = time.perf_counter() - start
+        restarts = sum(worker["restarts"] for worker in health(url)["workers"].values())
+        supervisor.send_signal(signal.SIGTERM)
+        supervisor.wait(timeout=120)
+    return results, elapsed, restarts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--operators", type=int, default=400)
+    parser.add_argument("--conversations", type=int, default=2, help="Conversations per operator, one after another")
+    parser.add_argument("--delay", type=float, default=0.05, help="Stub LLM latency in seconds")
+    parser.add_argument("--llm-concurrency", type=int, default=256, help="LLM_MAX_CONCURRENCY per worker")
+    parser.add_argument("--kill", action="store_true", help="SIGKILL one worker once the load is under way")
+    args = parser.parse_args()
+
+    print(f"Operators: {args.operators} x {args.conversations} conversations, stub LLM {args.delay * 1000:.0f} ms, "
+          f"{os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        results, elapsed, restarts = run(workers, args)
+        latencies = sorted(results.latencies)
+        throughput = len(latencies) / elapsed
+        baseline = baseline or throughput / workers
+        print(f"{workers:>2} workers  {throughput:8,.0f} turns/s  efficiency {throughput / (workers * baseline):6.1%}  "
+              f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms  "
+              f"shed {results.shed}  refused {results.refused}  failed {results.failed}  restarts {restarts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Local stand-in for an OpenAI-compatible chat completions API with rate limits.
+
+POST /v1/chat/completions answers like the real API after --latency seconds,
+with replies picked by StubChatModel from the system prompt. Requests beyond
+--rpm per minute (a token bucket holding --burst) get 429 with a Retry-After
+header, and --error-rate of the admitted ones fail with 503.
+
+Run from the repository root:
+    python -m benchmarks.fake_llm_server --port 8081 --rpm 120
+and point the http backend at it:
+    LLM_BACKEND=http LLM_HTTP_BASE_URL=http://127.0.0.1:8081/v1 streamlit run app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from langchain_core.messages import SystemMessage
+
+from conversation_history import estimate_tokens
+from llm_backends import StubChatModel
+from rate_limiter import TokenBucket
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    # Keep connections alive so clients can pool them
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: Dict, headers: Dict[str, str] = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        wait = server.admit()
+        if wait is not None:
+            server.count("rate_limited")
+            self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                       {"Retry-After": f"{wait:.2f}"})
+            return
+        time.sleep(server.latency)
+        if random.random() < server.error_rate:
+            server.count("unavailable")
+            self._send(503, {"error": {"message": "Service unavailable"}})
+            return
+        messages = request.get("messages", [])
+        system = next((message["content"] for message in messages if message["role"] == "system"), "")
+        reply = server.model.reply_for([SystemMessage(content=system)])
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        server.count("ok")
+        self._send(200, {
+            "id": f"chatcmpl-{server.requests}",
+            "object": "chat.completion",
+            "model": request.get("model", "stand-in"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": estimate_tokens(reply),
+                      "total_tokens": prompt_tokens + estimate_tokens(reply)},
+        })
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Threaded stand-in server; counts responses by outcome in .counts"""
+
+    daemon_threads = True
+
+    def __init__(self, address, rpm: float = 120, burst: Optional[float] = None, latency: float = 0.1,
+                 error_rate: float = 0.0):
+        super().__init__(address, FakeLLMHandler)
+        self.bucket = TokenBucket(rpm, burst)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.model = StubChatModel()
+        self.counts = Counter()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def admit(self) -> Optional[float]:
+        """None if a request is within the rate limit, else seconds until it would be"""
+        with self._lock:
+            self.requests += 1
+            self.bucket.refill(time.monotonic())
+            wait = self.bucket.wait_time(1)
+            if wait > 0:
+                return wait
+            self.bucket.take(1)
+            return None
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] += 1
+
+def serve(port: int = 0, **options) -> FakeLLMServer:
+    """Start a stand-in on a background thread; port 0 picks a free one (see .server_address)"""
+    server = FakeLLMServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rpm", type=float, default=120, help="Requests per minute before answering 429")
+    parser.add_argument("--burst", type=float, default=None, help="Requests allowed at once (default: --rpm)")
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of admitted requests that get 503")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(("127.0.0.1", args.port), args.rpm, args.burst, args.latency, args.error_rate)
+    print(f"Stand-in LLM API on http://127.0.0.1:{args.port}/v1 ({args.rpm:g} requests/min)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(dict(server.counts))
+
+
+if __name__ == "__main__":
+    main()
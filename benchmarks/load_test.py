@@ -0,0 +1,188 @@
+"""Load test for the headless server (server.py).
+
+Simulates --operators agents, each driving --conversations conversations
+from synthetic transcripts (batch_runner.generate_transcripts) over REST, or
+over the WebSocket stream with --ws. Reports turn latency, throughput and
+how many turns were shed with 503 or refused by a closed connection. Without
+--url it starts server.py against the stub backend (--delay seconds of LLM
+latency) on a free port; with --drain it sends that server SIGTERM once the
+load is under way, and every turn should then either complete or be shed -
+"failed" counts turns lost or broken part way.
+
+Run from the repository root:
+    python -m benchmarks.load_test --operators 500 --conversations 2 --delay 0.2
+    python -m benchmarks.load_test --operators 200 --ws
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --operators 1000
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import aiohttp
+
+from batch_runner import generate_transcripts
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.shed = 0
+        self.refused = 0
+        self.failed = 0
+        self.conversations = 0
+
+async def play_rest(http: aiohttp.ClientSession, url: str, turns, results: Results) -> None:
+    async with http.post(f"{url}/conversations") as response:
+        if response.status != 201:
+            results.shed += 1
+            return
+        conversation_id = (await response.json())["conversation_id"]
+    for agent_input in turns:
+        start = time.perf_counter()
+        async with http.post(f"{url}/conversations/{conversation_id}/turns", json={"message": agent_input}) as response:
+            await response.read()
+            if response.status == 503:
+                results.shed += 1
+                return
+            if response.status != 200:
+                results.failed += 1
+                return
+        results.latencies.append(time.perf_counter() - start)
+    results.conversations += 1
+
+async def play_ws(http: aiohttp.ClientSession, url: str, turns, results: Results) -> None:
+    async with http.post(f"{url}/conversations") as response:
+        if response.status != 201:
+            results.shed += 1
+            return
+        conversation_id = (await response.json())["conversation_id"]
+    async with http.ws_connect(f"{url}/conversations/{conversation_id}/stream") as stream:
+        for agent_input in turns:
+            start = time.perf_counter()
+            await stream.send_json({"message": agent_input})
+            tokens = 0
+            while True:
+                frame = await stream.receive()
+                if frame.type != aiohttp.WSMsgType.TEXT:
+                    # Closed before the reply started: the server never took the turn
+                    if tokens:
+                        results.failed += 1
+                    else:
+                        results.refused += 1
+                    return
+                event = frame.json()
+                if event["type"] != "token":
+                    break
+                tokens += 1
+            if event["type"] == "error":
+                if event["status"] == 503:
+                    results.shed += 1
+                else:
+                    results.failed += 1
+                return
+            results.latencies.append(time.perf_counter() - start)
+    results.conversations += 1
+
+async def operator(http, url: str, transcripts, use_ws: bool, results: Results) -> None:
+    for transcript in transcripts:
+        try:
+            await (play_ws if use_ws else play_rest)(http, url, transcript["turns"], results)
+        except aiohttp.ClientConnectionError:
+            # Refused, or reset on an idle keep-alive connection the draining server closed
+            results.refused += 1
+        except aiohttp.ClientError:
+            results.failed += 1
+
+async def run_load(url: str, operators: int, conversations: int, use_ws: bool, on_started=None) -> Results:
+    transcripts = list(generate_transcripts(operators * conversations))
+    results = Results()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=120)) as http:
+        tasks = [
+            asyncio.create_task(operator(http, url, transcripts[number::operators], use_ws, results))
+            for number in range(operators)
+        ]
+        if on_started is not None:
+            await on_started(results)
+        await asyncio.gather(*tasks)
+    return results
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def start_server(port: int, delay: float, checkpoint_path: str, llm_concurrency: int,
+                 script: str = "server.py", *options: str) -> subprocess.Popen:
+    """Start script (server.py, or supervisor.py with options) on the stub backend; returns once it listens"""
+    env = dict(os.environ, LLM_BACKEND="stub", LLM_STUB_LATENCY=str(delay), LLM_CACHE="off",
+               LLM_MAX_CONCURRENCY=str(llm_concurrency), CHECKPOINT_PATH=checkpoint_path, PYTHONWARNINGS="ignore")
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, script), "--port", str(port), *options], env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in server.stdout:
+        if "Running on" in line and f":{port} " in line:
+            # Keep reading so the server never blocks on a full pipe
+            threading.Thread(target=server.stdout.read, daemon=True).start()
+            return server
+    raise RuntimeError(f"{script} exited before it started listening")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="A running server (default: start server.py with the stub backend)")
+    parser.add_argument("--operators", type=int, default=500)
+    parser.add_argument("--conversations", type=int, default=2, help="Conversations per operator, one after another")
+    parser.add_argument("--delay", type=float, default=0.2, help="Stub LLM latency in seconds for the started server")
+    parser.add_argument("--llm-concurrency", type=int, default=256,
+                        help="LLM_MAX_CONCURRENCY for the started server (the stub has no provider limit)")
+    parser.add_argument("--ws", action="store_true", help="Stream replies over the WebSocket instead of REST")
+    parser.add_argument("--drain", action="store_true", help="SIGTERM the started server once load is under way")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    with tempfile.TemporaryDirectory() as scratch:
+        if url is None:
+            port = free_port()
+            server = start_server(port, args.delay, os.path.join(scratch, "checkpoints.sqlite"), args.llm_concurrency)
+            url = f"http://127.0.0.1:{port}"
+
+        async def drain_when_busy(results: Results) -> None:
+            while len(results.latencies) < args.operators:
+                await asyncio.sleep(0.05)
+            server.send_signal(signal.SIGTERM)
+
+        start = time.perf_counter()
+        on_started = drain_when_busy if args.drain and server is not None else None
+        results = asyncio.run(run_load(url, args.operators, args.conversations, args.ws, on_started))
+        elapsed = time.perf_counter() - start
+        if server is not None:
+            if not args.drain:
+                server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    latencies = sorted(results.latencies)
+    print(f"Operators: {args.operators} x {args.conversations} conversations over {'WebSocket' if args.ws else 'REST'}"
+          f"{f', stub LLM {args.delay * 1000:.0f} ms' if args.url is None else ''}")
+    print(f"Turns completed:     {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:,.0f} turns/s), "
+          f"{results.conversations} conversations finished")
+    if latencies:
+        print(f"Turn latency:        p50 {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"Shed (503):          {results.shed}")
+    print(f"Refused/closed:      {results.refused}")
+    print(f"Failed:              {results.failed}")
+    if args.drain and server is not None:
+        print(f"Server exit code:    {server.returncode}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Benchmark suite for the bot pipeline, with JSON baselines and regression gating.
+
+Every case runs against the deterministic stub model with no latency, no
+response cache, no templates and no speculation, so results are reproducible
+offline and reflect only this code:
+
+- graph.compile: create_workflow() plus compile(); graph.lookup: get_customer_bot()
+- turn.<STATE>: one handle_agent_input turn starting in each flow state
+- conversation: a full synthetic transcript end to end, plus turns per second
+- detector.name / detector.phrases / detector.intent: extract_name,
+  classify_message and classify_signals (intent model with rule fallback) per
+  batch of 1,000 messages from a large corpus, plus messages per second
+- session_memory: bytes per session held by SessionManager (tracemalloc)
+
+Run the suite and save the results as a baseline, then compare a later run
+(or a saved results file) against it:
+    python -m benchmarks.suite run -o benchmarks/baselines/baseline.json
+    python -m benchmarks.suite compare benchmarks/baselines/baseline.json --threshold 0.25
+
+compare exits with status 1 when any case's p50 or p99 grew by more than
+--threshold and by more than --min-delta-ms (so noise on tiny timings
+doesn't fail the gate). Throughput and memory are reported, not gated.
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import bot_agent
+from batch_runner import generate_transcripts
+from benchmarks.bench_phrase_matcher import build_corpus
+from benchmarks.bench_session_memory import managed_sessions
+from intent_classifier import INTENT_TASKS, classify_signals
+from llm_backends import StubChatModel, set_llm
+from name_extractor import extract_name
+from phrase_matcher import classify_message
+
+# Metrics compared by the regression gate
+GATED_METRICS = ("p50_ms", "p99_ms")
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """p50/p99/mean in milliseconds of samples in seconds"""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "p50_ms": round(ordered[int(0.50 * (len(ordered) - 1))] * 1000, 4),
+        "p99_ms": round(ordered[int(0.99 * (len(ordered) - 1))] * 1000, 4),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 4),
+    }
+
+def timed(operation: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_graph(scale: float) -> Dict[str, Dict]:
+    bot_agent.get_customer_bot()
+    return {
+        "graph.compile": summarize(timed(lambda: bot_agent.create_workflow().compile(), max(5, int(50 * scale)))),
+        "graph.lookup": summarize(timed(bot_agent.get_customer_bot, max(100, int(20_000 * scale)))),
+    }
+
+def turns_by_state(transcripts: List[Dict]) -> Dict[str, List[tuple]]:
+    """Replay transcripts once, keeping (state before the turn, agent message) per starting state"""
+    turns: Dict[str, List[tuple]] = {}
+    for transcript in transcripts:
+        state = None
+        for agent_input in transcript["turns"]:
+            if state is not None:
+                snapshot = dict(state, messages=list(state["messages"]))
+                turns.setdefault(state["conversation_state"], []).append((snapshot, agent_input))
+            state = bot_agent.handle_agent_input(agent_input, state)
+    return turns
+
+def bench_turns(scale: float) -> Dict[str, Dict]:
+    results = {}
+    samples_per_state = max(20, int(300 * scale))
+    for conversation_state, turns in sorted(turns_by_state(list(generate_transcripts(40))).items()):
+        samples = []
+        for position in range(samples_per_state):
+            state, agent_input = turns[position % len(turns)]
+            state = dict(state, messages=list(state["messages"]))
+            start = time.perf_counter()
+            bot_agent.handle_agent_input(agent_input, state)
+            samples.append(time.perf_counter() - start)
+        results[f"turn.{conversation_state}"] = summarize(samples)
+    return results
+
+def bench_conversations(scale: float) -> Dict[str, Dict]:
+    transcripts = list(generate_transcripts(max(20, int(200 * scale))))
+
+    async def run_all() -> List[float]:
+        durations = []
+        for transcript in transcripts:
+            start = time.perf_counter()
+            state = None
+            for agent_input in transcript["turns"]:
+                state = await bot_agent.ahandle_agent_input(agent_input, state)
+            durations.append(time.perf_counter() - start)
+        return durations
+
+    start = time.perf_counter()
+    durations = bot_agent.run_sync(run_all())
+    elapsed = time.perf_counter() - start
+    turns = sum(len(transcript["turns"]) for transcript in transcripts)
+    return {"conversation": dict(summarize(durations), turns_per_second=round(turns / elapsed, 1))}
+
+def bench_detectors(scale: float) -> Dict[str, Dict]:
+    corpus = build_corpus(max(10_000, int(200_000 * scale)))
+    batches = [corpus[start:start + 1000] for start in range(0, len(corpus), 1000)]
+    results = {}
+    detectors = (
+        ("detector.name", extract_name),
+        ("detector.phrases", classify_message),
+        ("detector.intent", lambda message: classify_signals(message, INTENT_TASKS["queue"])),
+    )
+    for name, detect in detectors:
+        samples = []
+        for batch in batches:
+            start = time.perf_counter()
+            for message in batch:
+                detect(message)
+            samples.append(time.perf_counter() - start)
+        results[name] = dict(summarize(samples), messages_per_second=round(len(corpus) / sum(samples)))
+    return results
+
+def bench_session_memory(scale: float) -> Dict[str, Dict]:
+    sessions = max(100, int(2000 * scale))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    manager = managed_sessions(sessions, 10)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del manager
+    return {"session_memory": {"n": sessions, "bytes_per_session": round(total / sessions)}}
+
+# Cases in the order they run: name -> function(scale) -> {case: results}
+CASES: Dict[str, Callable[[float], Dict[str, Dict]]] = {
+    "graph": bench_graph,
+    "turns": bench_turns,
+    "conversations": bench_conversations,
+    "detectors": bench_detectors,
+    "memory": bench_session_memory,
+}
+
+def run_suite(scale: float = 1.0, only: List[str] = None) -> Dict:
+    """Run the cases against the stub model and return the results document"""
+    set_llm(StubChatModel())
+    bot_agent.reply_mode = "llm"
+    bot_agent.speculator.enabled = False
+    bot_agent.warm_up()
+    cases = {}
+    for name, bench in CASES.items():
+        if only and name not in only:
+            continue
+        print(f"running {name}...", file=sys.stderr)
+        cases.update(bench(scale))
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scale": scale,
+        },
+        "cases": cases,
+    }
+
+def compare(baseline: Dict, current: Dict, threshold: float, min_delta_ms: float) -> List[str]:
+    """Print a comparison table and return the regressions found"""
+    regressions = []
+    for case, base in baseline["cases"].items():
+        result = current["cases"].get(case)
+        if result is None:
+            print(f"{case:<28} missing from the current run")
+            continue
+        for metric, base_value in base.items():
+            if metric == "n" or metric not in result:
+                continue
+            value = result[metric]
+            change = (value - base_value) / base_value if base_value else 0.0
+            regressed = (metric in GATED_METRICS and change > threshold and value - base_value > min_delta_ms)
+            if regressed:
+                regressions.append(f"{case} {metric}: {base_value:g} -> {value:g} ({change:+.1%})")
+            flag = "REGRESSED" if regressed else ("" if metric in GATED_METRICS else "(not gated)")
+            print(f"{case:<28} {metric:<20} {base_value:>14,.4g} {value:>14,.4g} {change:>+8.1%}  {flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Run the suite and write the results as JSON")
+    run.add_argument("-o", "--output", help="Results file (default: print to stdout)")
+    check = commands.add_parser("compare", help="Compare results against a baseline; exit 1 on regressions")
+    check.add_argument("baseline")
+    check.add_argument("current", nargs="?", help="Saved results (default: run the suite now)")
+    check.add_argument("--threshold", type=float, default=0.25, help="Allowed relative growth of p50/p99")
+    check.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore growth smaller than this")
+    for command in (run, check):
+        command.add_argument("--scale", type=float, default=1.0, help="Multiply sample counts, e.g. 0.1 for a quick run")
+        command.add_argument("--only", nargs="*", choices=sorted(CASES), help="Run only these cases")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = json.dumps(run_suite(args.scale, args.only), indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(results + "\n")
+        else:
+            print(results)
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args.scale, args.only)
+    print(f"{'case':<28} {'metric':<20} {'baseline':>14} {'current':>14} {'change':>8}")
+    regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
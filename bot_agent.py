@@ -1,21 +1,26 @@
-
+import asyncio
+import functools
 import os
-from typing import Dict, List, Optional, TypedDict, Literal
-
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_groq import ChatGroq
-from langgraph.graph import StateGraph, END
-
-# Define conversation states
-ConversationState = Literal[
-    "INTRODUCTION", 
-    "QUEUE_CONFIRMATION", 
-    "AUTHENTICATION", 
-    "PLAN_INQUIRY",
-    "CONCLUSION"
-]
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, TypedDict
+
+from conversation_flow import DEFAULT_FLOW_PATH, ConversationFlow, load_flow, match_template
+import instrumentation
+from conversation_history import HistoryBuilder, estimate_tokens
+from intent_classifier import get_intent_model
+from rate_limiter import PRIORITY_ACTIVE, PRIORITY_BACKGROUND, PRIORITY_NEW
+from speculation import Speculator
+
+# langchain, langgraph and the LLM client are imported on first use to keep startup fast
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
+
+# Graph end marker, same value as langgraph.graph.END
+END = "__end__"
+
+# Conversation states are defined by the flow (flows/coverage_inquiry.yaml by default)
+ConversationState = str
 
 # Define the state schema
 class State(TypedDict):
@@ -26,262 +31,593 @@ class State(TypedDict):
     authenticated: Optional[bool]
     plan_status: Optional[str]
     conversation_state: ConversationState
+    llm_calls: Optional[int]  # LLM calls made while handling the latest agent message
+    history_summary: Optional[str]  # Rolling summary of messages too old for the prompt
+    summarized_count: Optional[int]  # Messages already folded into history_summary
+    turns_in_state: Optional[int]  # Bot replies since entering conversation_state
+    conversation_id: Optional[str]  # Set when the caller tracks the conversation by id
 
-# Initialize LLM
-groq_api_key = os.environ.get("GROQ_API_KEY", "")
-llm = ChatGroq(
-    model="llama3-70b-8192",
-    temperature=0.7,
-    api_key=groq_api_key
-)
-
-# System prompts for each state
-SYSTEM_PROMPTS = {
-    "INTRODUCTION": """You are a bot acting on behalf of a customer interacting with a customer support agent.
-    Your goal is to introduce yourself politely and ask for the agent's name.
-    Record the agent's name when they provide it.
-    Only respond as the customer.""",
-    
-    "QUEUE_CONFIRMATION": """You are a bot acting on behalf of a customer.
-    Your goal is to confirm if you're in the right queue for coverage inquiries.
-    If not, ask to be transferred to the right queue or request the phone number for the right department.
-    Remember the agent's name is {agent_name}.
-    Only respond as the customer.""",
-    
-    "AUTHENTICATION": """You are a bot acting on behalf of a customer.
-    Your goal is to provide authentication details.
-    Offer your member ID (AD78902145) proactively and ask if any further details are needed.
-    Remember the agent's name is {agent_name}.
-    Only respond as the customer.""",
-    
-    "PLAN_INQUIRY": """You are a bot acting on behalf of a customer.
-    Your goal is to inquire about whether your insurance plan is active.
-    Ask {agent_name} to check if your plan is currently active.
-    Only respond as the customer."""
-}
-
-# Define state transitions
-def should_transition_to_queue_confirmation(state: State) -> bool:
-    """Check if we should move to queue confirmation state"""
-    messages = state["messages"]
-    if len(messages) < 2:
-        return False
-    # After introducing and getting agent's name
-    return state["agent_name"] is not None
-
-def should_transition_to_authentication(state: State) -> bool:
-    """Check if we should move to authentication state"""
-    return state["correct_queue"] is True
-
-def should_transition_to_plan_inquiry(state: State) -> bool:
-    """Check if we should move to plan inquiry state"""
-    return state["authenticated"] is True
-
-def should_end_conversation(state: State) -> bool:
-    """Check if we should end the conversation"""
-    return state["plan_status"] is not None
+# Cache LLM responses in memory and on disk (set LLM_CACHE=off to disable)
+response_cache = None
+_response_cache_lock = threading.Lock()
 
-# Define state processing functions
-def process_introduction(state: State) -> State:
-    """Process introduction state and extract agent name"""
-    messages = state["messages"]
-    # Check last message for agent name
-    if len(messages) > 0 and messages[-1]["role"] == "agent":
-        agent_message = messages[-1]["content"].lower()
+# The LLM backend (groq, stub or replay) is chosen with LLM_BACKEND and created on first use
+def get_llm():
+    """Get the shared chat model for the configured backend"""
+    global response_cache
+    import llm_backends
+    
+    if response_cache is None and os.environ.get("LLM_CACHE", "on") != "off":
+        from llm_cache import ResponseCache
         
-        # Simple name extraction logic - can be improved with NER
-        name_indicators = ["name is", "this is", "speaking", "i am", "i'm"]
-        for indicator in name_indicators:
-            if indicator in agent_message:
-                parts = agent_message.split(indicator, 1)
-                if len(parts) > 1:
-                    # Take the first word after the indicator as the name
-                    potential_name = parts[1].strip().split()[0].strip(',.!?')
-                    if potential_name and len(potential_name) > 1:  # Ensure it's not just a letter
-                        # Capitalize the name
-                        state["agent_name"] = potential_name.capitalize()
-                        break
-    
-    # Generate customer bot response
-    system_prompt = SYSTEM_PROMPTS["INTRODUCTION"]
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", "Generate the customer's next response.")
-    ])
-    
-    chain = prompt | llm | StrOutputParser()
-    response = chain.invoke({})
-    
-    # Add bot response to messages
-    state["messages"].append({"role": "bot", "content": response})
-    state["conversation_state"] = "INTRODUCTION"
-    
-    return state
+        with _response_cache_lock:
+            if response_cache is None:
+                response_cache = ResponseCache(
+                    path=os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite"),
+                    ttl=float(os.environ.get("LLM_CACHE_TTL", 24 * 60 * 60)),
+                    max_rows=int(os.environ.get("LLM_CACHE_MAX_ROWS", 10000)),
+                    variants=int(os.environ.get("LLM_CACHE_VARIANTS", 1))
+                )
+    return llm_backends.get_llm(cache=response_cache)
 
-def process_queue_confirmation(state: State) -> State:
-    """Process queue confirmation state"""
-    messages = state["messages"]
-    
-    # Check last agent message for queue confirmation
-    if len(messages) > 0 and messages[-1]["role"] == "agent":
-        agent_message = messages[-1]["content"].lower()
-        
-        # Check if agent confirmed correct queue
-        if any(phrase in agent_message for phrase in ["coverage", "right queue", "correct queue", "help with coverage", "assist with coverage"]):
-            state["correct_queue"] = True
-        elif any(phrase in agent_message for phrase in ["wrong queue", "incorrect queue", "transfer you", "different department"]):
-            state["correct_queue"] = False
-    
-    # Generate customer bot response
-    system_prompt = SYSTEM_PROMPTS["QUEUE_CONFIRMATION"].format(agent_name=state["agent_name"] or "agent")
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", "Generate the customer's next response.")
-    ])
-    
-    chain = prompt | llm | StrOutputParser()
-    response = chain.invoke({})
-    
-    # Add bot response to messages
-    state["messages"].append({"role": "bot", "content": response})
-    state["conversation_state"] = "QUEUE_CONFIRMATION"
-    
-    return state
+# The agent's canned opening line that starts every conversation
+GREETING = "Hello, this is customer support. How can I help you today?"
 
-def process_authentication(state: State) -> State:
-    """Process authentication state"""
-    messages = state["messages"]
-    
-    # Check last agent message for authentication confirmation
-    if len(messages) > 0 and messages[-1]["role"] == "agent":
-        agent_message = messages[-1]["content"].lower()
+# The conversation flow (states, prompts, detectors and transitions) is loaded from FLOW_PATH on first use
+_flow: Optional[ConversationFlow] = None
+_flow_lock = threading.Lock()
+
+def get_flow() -> ConversationFlow:
+    """Get the compiled conversation flow"""
+    global _flow
+    if _flow is None:
+        with _flow_lock:
+            if _flow is None:
+                _flow = load_flow(os.environ.get("FLOW_PATH", DEFAULT_FLOW_PATH))
+    return _flow
+
+def set_flow(flow: Optional[ConversationFlow]) -> None:
+    """Use a different compiled flow, or None to reload from FLOW_PATH"""
+    global _flow
+    with _flow_lock:
+        _flow = flow
+
+def new_state() -> State:
+    """State for a conversation that has not started"""
+    return {
+        "messages": [],
+        "agent_name": None,
+        "member_id": None,
+        "correct_queue": None,
+        "authenticated": None,
+        "plan_status": None,
+        "conversation_state": get_flow().initial_state,
+        "llm_calls": 0,
+        "turns_in_state": 0
+    }
+
+# Define state processing functions
+def process_agent_message(state: State) -> State:
+    """Apply the current state's detector to the latest agent message and advance at most one state"""
+    with instrumentation.span("node.agent_message"):
+        messages = state["messages"]
+        flow = get_flow()
+        step = flow.step(state["conversation_state"] or flow.initial_state)
+        state["conversation_state"] = step.name
+        state["llm_calls"] = 0
+        state["turns_in_state"] = state.get("turns_in_state") or 0
         
-        # Check if agent confirmed authentication
-        if any(phrase in agent_message for phrase in ["authenticated", "verified", "confirmed your identity", "thank you for the information"]):
-            state["authenticated"] = True
-            state["member_id"] = "AD78902145"  # Store the member ID
-    
-    # Generate customer bot response
-    system_prompt = SYSTEM_PROMPTS["AUTHENTICATION"].format(agent_name=state["agent_name"] or "agent")
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", "Generate the customer's next response.")
-    ])
-    
-    chain = prompt | llm | StrOutputParser()
-    response = chain.invoke({})
-    
-    # Add bot response to messages
-    state["messages"].append({"role": "bot", "content": response})
-    state["conversation_state"] = "AUTHENTICATION"
+        # Check last message for information the current state is waiting on
+        if step.detector is not None and len(messages) > 0 and messages[-1]["role"] == "agent":
+            with instrumentation.span("detector"):
+                step.detector(state, messages[-1]["content"])
+        
+        if step.advance_to is not None and step.advance_when(state):
+            state["conversation_state"] = step.advance_to
+            state["turns_in_state"] = 0
+            instrumentation.count("chatbot_state_transitions_total", from_state=step.name, to_state=step.advance_to)
     
     return state
 
-def process_plan_inquiry(state: State) -> State:
-    """Process plan inquiry state"""
-    messages = state["messages"]
-    
-    # Check last agent message for plan status information
-    if len(messages) > 0 and messages[-1]["role"] == "agent":
-        agent_message = messages[-1]["content"].lower()
-        
-        # Extract plan status
-        if "active" in agent_message:
-            state["plan_status"] = "active"
-        elif "inactive" in agent_message or "not active" in agent_message or "expired" in agent_message:
-            state["plan_status"] = "inactive"
-    
-    # Generate customer bot response
-    system_prompt = SYSTEM_PROMPTS["PLAN_INQUIRY"].format(agent_name=state["agent_name"] or "agent")
+def route_to_reply(state: State) -> str:
+    """Reply to this agent message unless the conversation has reached a terminal state"""
+    return "reply" if get_flow().step(state["conversation_state"]).prompt is not None else END
+
+# Recent messages go into each prompt within HISTORY_TOKEN_BUDGET; older ones are summarized
+history_builder = HistoryBuilder.from_env()
+
+REPLY_INSTRUCTION = "Generate the customer's next response."
+
+# One reply chain per conversation state, shared by every conversation
+_reply_chains: Dict[str, tuple] = {}
+_reply_chains_lock = threading.Lock()
+
+def build_reply_chain(conversation_state: str):
+    """Build the prompt | llm | parser chain that generates the customer's next message
+
+    The chain takes agent_name and the conversation history as inputs, so
+    one chain serves every conversation in that state.
+    """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
     
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", "Generate the customer's next response.")
+        ("system", get_flow().prompts[conversation_state]),
+        MessagesPlaceholder("history"),
+        ("human", REPLY_INSTRUCTION)
     ])
     
-    chain = prompt | llm | StrOutputParser()
-    response = chain.invoke({})
-    
-    # Add bot response to messages
+    return prompt | get_llm() | StrOutputParser()
+
+def get_reply_chain(conversation_state: str):
+    """Get the shared reply chain for a state, rebuilding it if the prompt or LLM changed"""
+    llm = get_llm()
+    template = get_flow().prompts[conversation_state]
+    entry = _reply_chains.get(conversation_state)
+    if entry is None or entry[0] is not template or entry[1] is not llm:
+        with _reply_chains_lock:
+            entry = _reply_chains.get(conversation_state)
+            if entry is None or entry[0] is not template or entry[1] is not llm:
+                entry = (template, llm, build_reply_chain(conversation_state))
+                _reply_chains[conversation_state] = entry
+    return entry[2]
+
+def build_reply_inputs(state: State, conversation_state: str) -> Dict:
+    """Fill the reply chain's inputs, fitting the history into the token budget"""
+    agent_name = state["agent_name"] or "agent"
+    history = history_builder.build(state)
+    tokens = history_builder.record_prompt(get_flow().prompts[conversation_state], agent_name, REPLY_INSTRUCTION,
+                                           history=history)
+    instrumentation.count("chatbot_prompt_tokens_total", tokens)
+    return {"agent_name": agent_name, "history": history}
+
+def reply_config(state: State, priority: Optional[int] = None) -> Dict:
+    """Run config for a reply; the rate limiter serves conversations already under way before new ones"""
+    if priority is None:
+        priority = PRIORITY_NEW if len(state["messages"]) <= 1 else PRIORITY_ACTIVE
+    return {"metadata": {"priority": priority}}
+
+# How replies are produced: "llm" always calls the model, "template-first" uses the
+# flow's reply templates when one covers the turn, "template-only" never calls the model
+REPLY_MODES = ("llm", "template-first", "template-only")
+reply_mode = os.environ.get("REPLY_MODE", "llm")
+
+class ReplyStats:
+    """Counts of replies served from templates versus the LLM, and their latency"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.template_replies = 0
+        self.llm_replies = 0
+        self.template_seconds = 0.0
+        self.llm_seconds = 0.0
+    
+    def record(self, from_llm: bool, seconds: float) -> None:
+        """Count a reply here and in the instrumentation registry"""
+        with self._lock:
+            if from_llm:
+                self.llm_replies += 1
+                self.llm_seconds += seconds
+                saved = 0.0
+            else:
+                self.template_replies += 1
+                self.template_seconds += seconds
+                saved = self.llm_seconds / self.llm_replies - seconds if self.llm_replies else 0.0
+        instrumentation.count("chatbot_reply_mode_replies_total", source="llm" if from_llm else "template")
+        instrumentation.count("chatbot_reply_seconds_total", seconds, source="llm" if from_llm else "template")
+        if saved > 0:
+            instrumentation.count("chatbot_template_seconds_saved_total", saved)
+    
+    def stats(self) -> Dict[str, float]:
+        """Fraction of replies without a model call, and the latency saved at the mean LLM latency"""
+        with self._lock:
+            replies = self.template_replies + self.llm_replies
+            mean_llm = self.llm_seconds / self.llm_replies if self.llm_replies else 0.0
+            return {
+                "replies": replies,
+                "template_replies": self.template_replies,
+                "template_fraction": self.template_replies / replies if replies else 0.0,
+                "mean_llm_seconds": mean_llm,
+                "latency_saved_seconds": self.template_replies * mean_llm - self.template_seconds,
+            }
+
+reply_stats = ReplyStats()
+
+def template_reply(state: State, conversation_state: str) -> Optional[str]:
+    """The templated reply for this turn, or None if the LLM should answer"""
+    if reply_mode == "llm":
+        return None
+    if reply_mode not in REPLY_MODES:
+        raise ValueError(f"Unknown REPLY_MODE {reply_mode!r}; expected one of {', '.join(REPLY_MODES)}")
+    flow = get_flow()
+    reply = match_template(flow.step(conversation_state), state)
+    if reply is None and reply_mode == "template-only":
+        reply = flow.fallback_reply or ""
+    return reply
+
+def record_customer_response(state: State, conversation_state: str, response: str, from_llm: bool = True) -> State:
+    """Add the bot response to the state and settle the conversation state"""
     state["messages"].append({"role": "bot", "content": response})
-    state["conversation_state"] = "PLAN_INQUIRY"
+    if from_llm:
+        state["llm_calls"] = (state.get("llm_calls") or 0) + 1
+    state["turns_in_state"] = (state.get("turns_in_state") or 0) + 1
+    
+    # Terminal conditions, e.g. concluding once the agent has told us the plan status
+    step = get_flow().step(conversation_state)
+    if step.end_to is not None and step.end_when(state):
+        conversation_state = step.end_to
+        state["turns_in_state"] = 0
+        instrumentation.count("chatbot_state_transitions_total", from_state=step.name, to_state=step.end_to)
+    state["conversation_state"] = conversation_state
     
     return state
 
+# Speculative pre-generation of the next reply while the agent types (SPECULATION=on)
+speculator = Speculator.from_env()
+
+def speculation_key(state: State, conversation_state: str) -> tuple:
+    """What a candidate reply depends on; a candidate is only served if this matches"""
+    return (conversation_state, state["agent_name"], len(state["messages"]))
+
+def generate_speculative_reply(state: State, conversation_state: str):
+    """Generate a candidate reply in a background worker; returns (reply, tokens spent)"""
+    inputs = build_reply_inputs(state, conversation_state)
+    reply = get_reply_chain(conversation_state).invoke(inputs, config=reply_config(state, PRIORITY_BACKGROUND))
+    count_llm_call("speculative", reply)
+    tokens = (estimate_tokens(get_flow().prompts[conversation_state]) + estimate_tokens(REPLY_INSTRUCTION)
+              + history_builder.history_tokens(inputs["history"]) + estimate_tokens(reply))
+    return reply, tokens
+
+def start_speculation(state: State) -> None:
+    """After a turn, pre-generate the replies for staying in this state and for advancing
+
+    Candidates are built from the conversation so far, so they cannot react
+    to the content of the agent's next message; branches a template would
+    answer are skipped.
+    """
+    conversation_id = state.get("conversation_id")
+    if not speculator.enabled or conversation_id is None:
+        return
+    flow = get_flow()
+    step = flow.step(state["conversation_state"])
+    branches = {}
+    candidates = [(step.name, state.get("turns_in_state") or 0)]
+    if step.advance_to is not None:
+        candidates.append((step.advance_to, 0))
+    for conversation_state, turns_in_state in candidates:
+        if flow.step(conversation_state).prompt is None:
+            continue
+        # The state as it would be once the next agent message arrives
+        hypothetical = dict(state, conversation_state=conversation_state, turns_in_state=turns_in_state,
+                            messages=list(state["messages"]))
+        if template_reply(hypothetical, conversation_state) is not None:
+            continue
+        key = (conversation_state, state["agent_name"], len(state["messages"]) + 1)
+        branches[key] = functools.partial(generate_speculative_reply, hypothetical, conversation_state)
+    speculator.start(conversation_id, branches)
+
+def claim_speculative_reply(state: State, conversation_state: str):
+    """The pre-generated candidate for this turn as a concurrent Future, if one was started"""
+    if not speculator.enabled:
+        return None
+    return speculator.claim(state.get("conversation_id"), speculation_key(state, conversation_state))
+
+def count_llm_call(kind: str, response: str) -> None:
+    """Count one reply chain call and its completion tokens"""
+    instrumentation.count("chatbot_llm_calls_total", kind=kind)
+    instrumentation.count("chatbot_completion_tokens_total", estimate_tokens(response))
+
+async def process_reply(state: State) -> State:
+    """Generate the customer's reply from a template, a speculative candidate, or with the current state's prompt"""
+    with instrumentation.span("node.reply"):
+        conversation_state = state["conversation_state"]
+        start = time.perf_counter()
+        with instrumentation.span("template"):
+            response = template_reply(state, conversation_state)
+        source = "template"
+        from_llm = response is None
+        if from_llm:
+            source = "speculative"
+            candidate = claim_speculative_reply(state, conversation_state)
+            if candidate is not None:
+                try:
+                    with instrumentation.span("speculative_wait"):
+                        response = (await asyncio.wrap_future(candidate))[0]
+                except Exception:
+                    response = None
+            if response is None:
+                source = "llm"
+                with instrumentation.span("prompt"):
+                    inputs = build_reply_inputs(state, conversation_state)
+                with instrumentation.span("llm"):
+                    response = await get_reply_chain(conversation_state).ainvoke(inputs, config=reply_config(state))
+                count_llm_call("reply", response)
+        reply_stats.record(from_llm, time.perf_counter() - start)
+        instrumentation.count("chatbot_replies_total", source=source)
+        return record_customer_response(state, conversation_state, response, from_llm)
+
 # Create the graph
-def create_workflow() -> StateGraph:
-    """Create the conversation workflow graph"""
+def create_workflow() -> "StateGraph":
+    """Create the conversation workflow graph
+
+    The reply node is async, so the compiled graph is run with ainvoke.
+    Each invocation handles exactly one agent message: the agent message is
+    checked against the current state, then the reply node generates the bot
+    reply with that state's prompt and the graph ends. The next invocation resumes from the
+    conversation_state stored in the returned state.
+    """
+    from langgraph.graph import StateGraph
+    
     # Initialize the graph
     workflow = StateGraph(State)
     
-    # Define nodes
-    workflow.add_node("introduction", process_introduction)
-    workflow.add_node("queue_confirmation", process_queue_confirmation)
-    workflow.add_node("authentication", process_authentication)
-    workflow.add_node("plan_inquiry", process_plan_inquiry)
-    
-    # Define edges
-    workflow.add_edge("introduction", "queue_confirmation", should_transition_to_queue_confirmation)
-    workflow.add_edge("queue_confirmation", "authentication", should_transition_to_authentication)
-    workflow.add_edge("authentication", "plan_inquiry", should_transition_to_authentication)
-    workflow.add_edge("plan_inquiry", END, should_end_conversation)
+    # Define nodes: the flow's transition table drives both, so the graph is the same for every flow
+    workflow.add_node("agent_message", process_agent_message)
+    workflow.add_node("reply", process_reply)
     
-    # Add conditional loopbacks for states that need more interaction
-    workflow.add_conditional_edges(
-        "introduction",
-        lambda state: "queue_confirmation" if should_transition_to_queue_confirmation(state) else "introduction"
-    )
-    workflow.add_conditional_edges(
-        "queue_confirmation",
-        lambda state: "authentication" if should_transition_to_authentication(state) else "queue_confirmation"
-    )
-    workflow.add_conditional_edges(
-        "authentication",
-        lambda state: "plan_inquiry" if should_transition_to_plan_inquiry(state) else "authentication"
-    )
-    workflow.add_conditional_edges(
-        "plan_inquiry",
-        lambda state: END if should_end_conversation(state) else "plan_inquiry"
-    )
+    # Define edges: reply once, then wait for the next agent message
+    workflow.add_conditional_edges("agent_message", route_to_reply)
+    workflow.add_edge("reply", END)
     
     # Set the entry point
-    workflow.set_entry_point("introduction")
+    workflow.set_entry_point("agent_message")
     
     return workflow
 
+# The compiled graph, shared by every thread and Streamlit session in the process
+_customer_bot = None
+_customer_bot_lock = threading.Lock()
+
 # Compile the graph
 def get_customer_bot():
-    """Get the compiled customer support bot workflow"""
-    workflow = create_workflow()
-    return workflow.compile()
+    """Get the compiled customer support bot workflow
+
+    The graph is compiled once per process. It has the same two nodes for
+    every flow: states, prompts and transitions are read from the flow's
+    transition table at run time, and reply chains are rebuilt when a
+    state's prompt changes, so a new flow (set_flow) needs no new graph.
+    """
+    global _customer_bot
+    if _customer_bot is None:
+        with _customer_bot_lock:
+            if _customer_bot is None:
+                _customer_bot = create_workflow().compile()
+    return _customer_bot
 
 # Function to handle agent input and generate bot response
-def handle_agent_input(agent_input: str, state: Dict = None) -> Dict:
-    """Process agent input and update conversation state"""
-    if state is None:
-        # Initialize state
-        state = {
-            "messages": [],
-            "agent_name": None,
-            "member_id": None,
-            "correct_queue": None,
-            "authenticated": None,
-            "plan_status": None,
-            "conversation_state": "INTRODUCTION"
-        }
-    
-    # Add agent message to state
-    state["messages"].append({"role": "agent", "content": agent_input})
-    
-    # Get the workflow
-    customer_bot = get_customer_bot()
-    
-    # Process the state through the workflow
-    for output in customer_bot.stream(state):
-        if "messages" in output:
-            latest_state = output
-    
-    return latest_state
+async def ahandle_agent_input(agent_input: str, state: Dict = None, conversation_id: Optional[str] = None) -> Dict:
+    """Process agent input and update conversation state without blocking the event loop
+
+    Runs one state node (one LLM call) per agent message; the returned
+    state's llm_calls records how many calls the turn made. With a
+    conversation_id and no state, the turn resumes from the checkpoint store
+    and its result is checkpointed back.
+    """
+    with instrumentation.turn(conversation_id=conversation_id):
+        if conversation_id is not None:
+            from checkpoint_store import get_checkpoint_store
+            store = get_checkpoint_store()
+            if state is None:
+                with instrumentation.span("load"):
+                    state = await asyncio.get_running_loop().run_in_executor(None, store.load, conversation_id)
+        
+        if state is None:
+            # Initialize state
+            state = new_state()
+        if conversation_id is not None:
+            state["conversation_id"] = conversation_id
+        instrumentation.annotate(state_before=state["conversation_state"])
+        
+        # Add agent message to state
+        state["messages"].append({"role": "agent", "content": agent_input})
+        
+        # Get the shared compiled workflow
+        customer_bot = get_customer_bot()
+        
+        # Run a single turn through the workflow
+        with instrumentation.span("graph"):
+            state = await customer_bot.ainvoke(state)
+        instrumentation.record_overhead("graph_overhead", "graph", "node.agent_message", "node.reply")
+        instrumentation.annotate(state_after=state["conversation_state"], llm_calls=state["llm_calls"])
+        
+        # Checkpoint the turn so any process can resume the conversation
+        if conversation_id is not None:
+            with instrumentation.span("save"):
+                await asyncio.get_running_loop().run_in_executor(None, store.save, conversation_id, state)
+        
+        # Get a head start on the next reply while the agent types
+        with instrumentation.span("speculation_start"):
+            start_speculation(state)
+    return state
+
+# Synchronous callers run their turns on one event loop in a background thread, kept for
+# the life of the process: the LLM client is shared process-wide, and async clients
+# (AsyncGroq's and HTTPChatModel's httpx pools) fail once the loop they were first used
+# on is closed, as asyncio.run does after every call. Keyed by pid so a forked worker
+# (batch_runner's Pool) starts its own loop instead of waiting on the parent's thread.
+_sync_loop: tuple = (None, None)
+_sync_loop_lock = threading.Lock()
+
+def run_sync(coroutine):
+    """Run a coroutine on the shared background loop and wait for its result"""
+    global _sync_loop
+    pid, loop = _sync_loop
+    if pid != os.getpid():
+        with _sync_loop_lock:
+            pid, loop = _sync_loop
+            if pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="bot-agent-loop", daemon=True).start()
+                _sync_loop = (os.getpid(), loop)
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+def handle_agent_input(agent_input: str, state: Dict = None, conversation_id: Optional[str] = None) -> Dict:
+    """Process agent input and update conversation state
+
+    Blocking wrapper around ahandle_agent_input for callers without an event loop.
+    """
+    return run_sync(ahandle_agent_input(agent_input, state, conversation_id))
+
+class PreparedReply(NamedTuple):
+    """A streamed turn after the agent message node, before the reply is produced"""
+    working: State
+    conversation_state: Optional[str]  # None when the conversation has ended and gets no reply
+    response: Optional[str]  # The templated reply, when one covers the turn
+    candidate: Optional[object]  # Speculative reply Future to wait for, when no template applies
+    start: float
+
+class ReplyStream:
+    """Token stream of the bot's reply to one agent message
+
+    Iterate it (or async-iterate it) to receive the reply as the LLM produces
+    it. The caller's state is left untouched while streaming; the updated
+    state is committed to .state in one step once the stream completes.
+    """
+    
+    def __init__(self, agent_input: str, state: Dict = None):
+        self.agent_input = agent_input
+        self.previous_state = state
+        self.state = None
+    
+    def _turn(self):
+        return instrumentation.turn(conversation_id=(self.previous_state or {}).get("conversation_id"), streamed=True)
+    
+    def _prepare(self) -> PreparedReply:
+        """Copy the state, add the agent message, run the agent message node and look for a reply without the LLM"""
+        if self.previous_state is None:
+            working = new_state()
+        else:
+            working = dict(self.previous_state)
+            working["messages"] = list(self.previous_state["messages"])
+        
+        working["messages"].append({"role": "agent", "content": self.agent_input})
+        instrumentation.annotate(state_before=working["conversation_state"])
+        working = process_agent_message(working)
+        conversation_state = working["conversation_state"]
+        start = time.perf_counter()
+        if get_flow().step(conversation_state).prompt is None:
+            return PreparedReply(working, None, None, None, start)
+        with instrumentation.span("template"):
+            response = template_reply(working, conversation_state)
+        candidate = claim_speculative_reply(working, conversation_state) if response is None else None
+        return PreparedReply(working, conversation_state, response, candidate, start)
+    
+    @staticmethod
+    def _llm_call(prepared: PreparedReply) -> tuple:
+        """(chain, inputs, config) to stream the reply from the LLM"""
+        chain = get_reply_chain(prepared.conversation_state)
+        with instrumentation.span("prompt"):
+            inputs = build_reply_inputs(prepared.working, prepared.conversation_state)
+        return chain, inputs, reply_config(prepared.working)
+    
+    def _commit(self, prepared: PreparedReply, response: Optional[str], source: str) -> None:
+        """Record the reply, settle the conversation state and publish it as .state"""
+        working = prepared.working
+        if prepared.conversation_state is not None:
+            from_llm = source != "template"
+            if source == "llm":
+                count_llm_call("reply", response)
+            reply_stats.record(from_llm, time.perf_counter() - prepared.start)
+            instrumentation.count("chatbot_replies_total", source=source)
+            record_customer_response(working, prepared.conversation_state, response, from_llm)
+        instrumentation.annotate(state_after=working["conversation_state"], llm_calls=working["llm_calls"])
+        self.state = working
+        with instrumentation.span("speculation_start"):
+            start_speculation(working)
+    
+    def __iter__(self):
+        with self._turn():
+            prepared = self._prepare()
+            response, source = prepared.response, "template"
+            if prepared.conversation_state is not None and response is None:
+                source = "speculative"
+                if prepared.candidate is not None:
+                    try:
+                        with instrumentation.span("speculative_wait"):
+                            response = prepared.candidate.result()[0]
+                    except Exception:
+                        response = None
+                if response is None:
+                    source = "llm"
+                    chain, inputs, config = self._llm_call(prepared)
+                    chunks = []
+                    # Includes the time the caller spends on each chunk
+                    with instrumentation.span("llm_stream"):
+                        for chunk in chain.stream(inputs, config=config):
+                            chunks.append(chunk)
+                            yield chunk
+                    response = "".join(chunks)
+            if response is not None and source != "llm":
+                # A templated or pre-generated reply is complete at once
+                yield response
+            self._commit(prepared, response, source)
+    
+    async def __aiter__(self):
+        with self._turn():
+            prepared = self._prepare()
+            response, source = prepared.response, "template"
+            if prepared.conversation_state is not None and response is None:
+                source = "speculative"
+                if prepared.candidate is not None:
+                    try:
+                        with instrumentation.span("speculative_wait"):
+                            response = (await asyncio.wrap_future(prepared.candidate))[0]
+                    except Exception:
+                        response = None
+                if response is None:
+                    source = "llm"
+                    chain, inputs, config = self._llm_call(prepared)
+                    chunks = []
+                    # Includes the time the caller spends on each chunk
+                    with instrumentation.span("llm_stream"):
+                        async for chunk in chain.astream(inputs, config=config):
+                            chunks.append(chunk)
+                            yield chunk
+                    response = "".join(chunks)
+            if response is not None and source != "llm":
+                # A templated or pre-generated reply is complete at once
+                yield response
+            self._commit(prepared, response, source)
+
+def stream_agent_input(agent_input: str, state: Dict = None) -> ReplyStream:
+    """Process agent input, streaming the bot reply token by token
+
+    Usage:
+        reply = stream_agent_input(agent_input, state)
+        for token in reply:
+            ...
+        state = reply.state
+    """
+    return ReplyStream(agent_input, state)
+
+def generate_opener() -> State:
+    """The state of a new conversation once the bot has answered GREETING, for the opener pool
+
+    Runs the same steps as a turn through the graph, but calls the LLM at
+    background priority so refilling the pool never delays live conversations.
+    """
+    state = new_state()
+    state["messages"].append({"role": "agent", "content": GREETING})
+    state = process_agent_message(state)
+    conversation_state = state["conversation_state"]
+    response = template_reply(state, conversation_state)
+    from_llm = response is None
+    if from_llm:
+        inputs = build_reply_inputs(state, conversation_state)
+        response = get_reply_chain(conversation_state).invoke(inputs, config=reply_config(state, PRIORITY_BACKGROUND))
+        count_llm_call("opener", response)
+    instrumentation.count("chatbot_replies_total", source="opener")
+    return record_customer_response(state, conversation_state, response, from_llm)
+
+def warm_up():
+    """Load the flow, compile the graph, create the LLM client and build the reply chains ahead of the first turn
+
+    Also loads the intent classifier's weights, so the first turn doesn't.
+
+    Returns the shared (graph, llm) pair so callers like st.cache_resource
+    can hold on to them.
+    """
+    for conversation_state in get_flow().prompts:
+        get_reply_chain(conversation_state)
+    get_intent_model()
+    return get_customer_bot(), get_llm()
@@ -0,0 +1,42 @@
+import functools
+import html
+import os
+from typing import List, Sequence
+
+# Messages shown when a conversation opens, and added by each "load older" click
+CHAT_WINDOW = int(os.environ.get("CHAT_WINDOW", 50))
+
+# Messages per st.markdown block; blocks start at multiples of this, so only the
+# newest block changes from one run to the next and the browser keeps the rest
+CHUNK_SIZE = 25
+
+# role -> (css class, avatar, sender)
+SENDERS = {
+    "agent": ("agent", "A", "Support Agent"),
+    "bot": ("bot", "C", "Customer Bot"),
+}
+
+def bubble_html(role: str, content: str) -> str:
+    """Build the chat bubble markup for one message, escaping its content"""
+    css_class, avatar, sender = SENDERS.get(role, SENDERS["bot"])
+    text = html.escape(content).replace("\n", "<br>")
+    return (f'<div class="chat-message {css_class}"><div class="avatar">{avatar}</div>'
+            f'<div class="content"><div class="sender">{sender}</div><div class="message">{text}</div></div></div>')
+
+# Each message is escaped and built once; streaming previews use bubble_html directly
+@functools.lru_cache(maxsize=16384)
+def message_html(role: str, content: str) -> str:
+    return bubble_html(role, content)
+
+def window_start(total: int, window: int) -> int:
+    """Index of the first message shown: the last `window` messages, from the start of a block"""
+    if window <= 0 or total <= window:
+        return 0
+    return (total - window) // CHUNK_SIZE * CHUNK_SIZE
+
+def history_chunks(messages: Sequence, start: int = 0) -> List[str]:
+    """Markup for messages[start:], one string per block of CHUNK_SIZE messages"""
+    return [
+        "".join(message_html(message.role, message.content) for message in messages[offset:offset + CHUNK_SIZE])
+        for offset in range(start, len(messages), CHUNK_SIZE)
+    ]
@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from session_manager import pack_flags, unpack_flags
+
+class CheckpointStore(ABC):
+    """Durable conversation state keyed by conversation id
+
+    Implementations persist each turn incrementally: the scalar state plus
+    only the messages added since the last checkpoint.
+    """
+
+    @abstractmethod
+    def load(self, conversation_id: str) -> Optional[Dict]:
+        """Return the latest State for a conversation, or None if unknown"""
+
+    @abstractmethod
+    def save(self, conversation_id: str, state: Dict) -> None:
+        """Checkpoint a conversation's State after a turn"""
+
+    @abstractmethod
+    def delete(self, conversation_ids: List[str]) -> None:
+        """Remove finished conversations and their messages"""
+
+    def flush(self) -> None:
+        """Make every saved checkpoint durable"""
+
+    def release(self, conversation_ids: List[str]) -> None:
+        """Flush, then forget what is cached about conversations another process takes over"""
+        self.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Checkpoint store in a local SQLite file
+
+    Saves are buffered and written in one transaction per batch, either when
+    batch_size conversations are pending or every flush_interval seconds
+    from a background thread. WAL mode with synchronous=NORMAL means a batch
+    costs one fsync at checkpoint time rather than one per write; pass
+    synchronous="FULL" to fsync every batch.
+
+    The message counts of the max_tracked most recently saved conversations
+    are kept in memory so a save doesn't have to read them back; older ones
+    are read from the database on their next save.
+    """
+
+    def __init__(self, path: str = "checkpoints.sqlite", batch_size: int = 256,
+                 flush_interval: Optional[float] = 0.05, synchronous: str = "NORMAL", max_tracked: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_tracked = max_tracked
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={synchronous}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "conversation_id TEXT PRIMARY KEY, agent_name TEXT, member_id TEXT, flags INTEGER NOT NULL, "
+            "conversation_state TEXT NOT NULL, "
+            "llm_calls INTEGER NOT NULL, history_summary TEXT, summarized_count INTEGER NOT NULL, "
+            "turns_in_state INTEGER NOT NULL, "
+            "message_count INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+            "PRIMARY KEY (conversation_id, seq)) WITHOUT ROWID"
+        )
+        self._db.commit()
+        self._lock = threading.RLock()
+
+        # conversation_id -> (conversation row, new message rows) waiting to be written
+        self._pending: Dict[str, tuple] = {}
+        # conversation_id -> messages already written or pending, least recently saved first
+        self._saved_counts: "OrderedDict[str, int]" = OrderedDict()
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, args=(flush_interval,), daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def _saved_count(self, conversation_id: str) -> int:
+        saved = self._saved_counts.get(conversation_id)
+        if saved is not None:
+            return saved
+        if conversation_id in self._pending:
+            self.flush()
+        row = self._db.execute(
+            "SELECT message_count FROM conversations WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def save(self, conversation_id: str, state: Dict) -> None:
+        messages = state["messages"]
+        with self._lock:
+            saved = self._saved_count(conversation_id)
+            new_rows = [
+                (conversation_id, seq, message["role"], message["content"])
+                for seq, message in enumerate(messages[saved:], start=saved)
+            ]
+            conversation_row = (
+                conversation_id, state["agent_name"], state["member_id"], pack_flags(state),
+                state["conversation_state"],
+                state.get("llm_calls") or 0, state.get("history_summary"), state.get("summarized_count") or 0,
+                state.get("turns_in_state") or 0,
+                len(messages), time.time(),
+            )
+            if conversation_id in self._pending:
+                new_rows = self._pending[conversation_id][1] + new_rows
+            self._pending[conversation_id] = (conversation_row, new_rows)
+            self._saved_counts[conversation_id] = len(messages)
+            self._saved_counts.move_to_end(conversation_id)
+            while len(self._saved_counts) > self.max_tracked:
+                self._saved_counts.popitem(last=False)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [conversation_row for conversation_row, _ in pending.values()],
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)",
+                    [row for _, rows in pending.values() for row in rows],
+                )
+
+    def release(self, conversation_ids: List[str]) -> None:
+        with self._lock:
+            self.flush()
+            for conversation_id in conversation_ids:
+                self._saved_counts.pop(conversation_id, None)
+
+    def delete(self, conversation_ids: List[str]) -> None:
+        with self._lock:
+            for conversation_id in conversation_ids:
+                self._pending.pop(conversation_id, None)
+                self._saved_counts.pop(conversation_id, None)
+            with self._db:
+                self._db.executemany("DELETE FROM conversations WHERE conversation_id = ?",
+                                     [(conversation_id,) for conversation_id in conversation_ids])
+                self._db.executemany("DELETE FROM messages WHERE conversation_id = ?",
+                                     [(conversation_id,) for conversation_id in conversation_ids])
+
+    def load(self, conversation_id: str) -> Optional[Dict]:
+        with self._lock:
+            # Serve unflushed checkpoints too, so a conversation can resume right away
+            if conversation_id in self._pending:
+                self.flush()
+            row = self._db.execute(
+                "SELECT agent_name, member_id, flags, conversation_state, llm_calls, "
+                "history_summary, summarized_count, turns_in_state "
+                "FROM conversations WHERE conversation_id = ?",
+                (conversation_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            messages: List[Dict] = [
+                {"role": role, "content": content}
+                for role, content in self._db.execute(
+                    "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY seq", (conversation_id,)
+                )
+            ]
+        (agent_name, member_id, flags, conversation_state, llm_calls,
+         history_summary, summarized_count, turns_in_state) = row
+        state = unpack_flags(flags)
+        state.update(conversation_id=conversation_id, messages=messages, agent_name=agent_name,
+                     member_id=member_id, conversation_state=conversation_state, llm_calls=llm_calls,
+                     history_summary=history_summary, summarized_count=summarized_count,
+                     turns_in_state=turns_in_state)
+        return state
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        self._db.close()
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+def set_checkpoint_store(store: Optional[CheckpointStore]) -> None:
+    """Install a store (e.g. a network-backed one), or None to rebuild from config"""
+    global _store
+    with _store_lock:
+        _store = store
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Return the shared store, creating the SQLite one from CHECKPOINT_* settings on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteCheckpointStore(
+                    path=os.environ.get("CHECKPOINT_PATH", "checkpoints.sqlite"),
+                    batch_size=int(os.environ.get("CHECKPOINT_BATCH_SIZE", 256)),
+                    flush_interval=float(os.environ.get("CHECKPOINT_FLUSH_INTERVAL", 0.05)),
+                    synchronous=os.environ.get("CHECKPOINT_SYNCHRONOUS", "NORMAL"),
+                    max_tracked=int(os.environ.get("CHECKPOINT_MAX_TRACKED", 10000)),
+                )
+    return _store
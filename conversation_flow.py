@@ -0,0 +1,330 @@
+import json
+import os
+import string
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from intent_classifier import INTENT_CONFIDENCE_THRESHOLD, classify_signals
+from name_extractor import extract_name
+from phrase_matcher import DETECTOR_PHRASES
+
+# The flow used when FLOW_PATH is not set
+DEFAULT_FLOW_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "flows", "coverage_inquiry.yaml")
+
+# Minimum confidence before an extracted name is used as the agent's name
+NAME_CONFIDENCE_THRESHOLD = 0.5
+
+# State fields a flow may set, with the values each accepts (str means any string)
+SETTABLE_FIELDS = {
+    "agent_name": str,
+    "member_id": str,
+    "correct_queue": (True, False),
+    "authenticated": (True, False),
+    "plan_status": ("active", "inactive"),
+}
+CONDITION_FIELDS = set(SETTABLE_FIELDS) | {"messages", "turns_in_state"}
+# Fields holding free text: the only ones a name detector may write, and with messages the only sized ones
+TEXT_FIELDS = {field for field, allowed in SETTABLE_FIELDS.items() if allowed is str}
+PROMPT_VARIABLES = {"agent_name"}
+# State fields a reply template can fill in; a template with an unset slot is skipped
+TEMPLATE_VARIABLES = {"agent_name", "member_id", "plan_status"}
+
+class FlowDefinitionError(ValueError):
+    """A flow definition that failed validation; lists every problem found"""
+
+    def __init__(self, source: str, problems: List[str]):
+        self.problems = problems
+        super().__init__(f"Invalid flow {source}:\n  " + "\n  ".join(problems))
+
+# Condition operators: (state value, expected) -> bool
+CONDITION_OPERATORS = {
+    "equals": lambda value, expected: value == expected,
+    "is_set": lambda value, expected: (value is not None) is expected,
+    "min_length": lambda value, expected: value is not None and len(value) >= expected,
+}
+
+def compile_condition(conditions: Dict[str, Dict[str, Any]]) -> Callable[[Dict], bool]:
+    """Turn {field: {operator: expected}} into a predicate over the state"""
+    checks = tuple(
+        (field, CONDITION_OPERATORS[operator], expected)
+        for field, test in conditions.items()
+        for operator, expected in test.items()
+    )
+
+    def condition(state: Dict) -> bool:
+        return all(operator(state.get(field), expected) for field, operator, expected in checks)
+
+    return condition
+
+# Detector builders: spec -> detector(state, agent_message)
+def build_name_detector(spec: Dict) -> Callable[[Dict, str], None]:
+    """Store the agent's name from an introduction like "my name is Alex" """
+    field = spec.get("field", "agent_name")
+    min_confidence = spec.get("min_confidence", NAME_CONFIDENCE_THRESHOLD)
+
+    def detect(state: Dict, agent_message: str) -> None:
+        match = extract_name(agent_message)
+        if match is not None and match.confidence >= min_confidence:
+            state[field] = match.name
+
+    return detect
+
+def build_signals_detector(spec: Dict) -> Callable[[Dict, str], None]:
+    """Set fields from the first rule whose signal is in the message
+
+    The phrase_matcher rules find the signals; with INTENT_CLASSIFIER=on the
+    intent classifier adds one it is at least min_confidence sure of to
+    messages where the rules find none.
+    """
+    rules = tuple((rule["signal"], tuple(rule["set"].items())) for rule in spec["rules"])
+    candidates = tuple(signal for signal, _ in rules)
+    min_confidence = spec.get("min_confidence", INTENT_CONFIDENCE_THRESHOLD)
+
+    def detect(state: Dict, agent_message: str) -> None:
+        signals = classify_signals(agent_message, candidates, min_confidence)
+        for signal, updates in rules:
+            if signal in signals:
+                state.update(updates)
+                return
+
+    return detect
+
+DETECTOR_TYPES: Dict[str, Callable[[Dict], Callable[[Dict, str], None]]] = {
+    "name": build_name_detector,
+    "signals": build_signals_detector,
+}
+
+def register_detector(kind: str, builder: Callable[[Dict], Callable[[Dict, str], None]]) -> None:
+    """Make a detector type available to flow definitions"""
+    DETECTOR_TYPES[kind] = builder
+
+class ReplyTemplate(NamedTuple):
+    """A fixed reply with slots filled from the state, used when its condition holds"""
+    text: str
+    slots: Tuple[str, ...]
+    when: Optional[Callable[[Dict], bool]]
+
+class FlowStep(NamedTuple):
+    """One row of the compiled transition table"""
+    name: str
+    prompt: Optional[str]  # None for terminal states, which get no reply
+    templates: Tuple[ReplyTemplate, ...]  # Tried in order before the prompt
+    detector: Optional[Callable[[Dict, str], None]]
+    advance_to: Optional[str]  # Checked after the agent message
+    advance_when: Optional[Callable[[Dict], bool]]
+    end_to: Optional[str]  # Checked after the bot reply
+    end_when: Optional[Callable[[Dict], bool]]
+
+class ConversationFlow:
+    """A validated flow compiled into a transition table indexed by state name"""
+
+    def __init__(self, name: str, initial_state: str, steps: Tuple[FlowStep, ...],
+                 fallback_reply: Optional[str] = None):
+        self.name = name
+        self.initial_state = initial_state
+        self.fallback_reply = fallback_reply
+        self.steps = steps
+        self.index = {step.name: position for position, step in enumerate(steps)}
+        self.prompts = {step.name: step.prompt for step in steps if step.prompt is not None}
+
+    def step(self, conversation_state: str) -> FlowStep:
+        return self.steps[self.index[conversation_state]]
+
+def match_template(step: FlowStep, state: Dict) -> Optional[str]:
+    """Fill in the first of a step's templates that covers the state, if any"""
+    for template in step.templates:
+        if template.when is not None and not template.when(state):
+            continue
+        values = {slot: state.get(slot) for slot in template.slots}
+        if None not in values.values():
+            return template.text.format(**values)
+    return None
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _check_operand(where: str, field: str, operator: str, expected: Any, problems: List[str]) -> None:
+    """Check an operator's argument against the field it tests, so a bad one fails at load time"""
+    if operator == "is_set":
+        if not isinstance(expected, bool):
+            problems.append(f"{where}: is_set takes true or false")
+    elif operator == "min_length":
+        if field != "messages" and field not in TEXT_FIELDS:
+            problems.append(f"{where}: min_length only applies to messages and {', '.join(sorted(TEXT_FIELDS))}")
+        elif not _is_int(expected) or expected < 0:
+            problems.append(f"{where}: min_length takes a whole number")
+    elif field == "turns_in_state":
+        if not _is_int(expected):
+            problems.append(f"{where}: equals takes a whole number for turns_in_state")
+    elif field == "messages":
+        problems.append(f"{where}: messages can only be tested with min_length or is_set")
+    elif expected is not None:
+        allowed = SETTABLE_FIELDS[field]
+        if allowed is str and not isinstance(expected, str) or allowed is not str and expected not in allowed:
+            problems.append(f"{where}: invalid value {expected!r} for {field}")
+
+def _check_condition(where: str, conditions: Any, problems: List[str]) -> None:
+    if not isinstance(conditions, dict) or not conditions:
+        problems.append(f"{where}: expected a mapping of field to test")
+        return
+    for field, test in conditions.items():
+        if field not in CONDITION_FIELDS:
+            problems.append(f"{where}.{field}: unknown field")
+            continue
+        if not isinstance(test, dict) or len(test) != 1 or next(iter(test)) not in CONDITION_OPERATORS:
+            problems.append(f"{where}.{field}: expected one of {sorted(CONDITION_OPERATORS)}")
+            continue
+        (operator, expected), = test.items()
+        _check_operand(f"{where}.{field}.{operator}", field, operator, expected, problems)
+
+def _check_updates(where: str, updates: Any, problems: List[str]) -> None:
+    if not isinstance(updates, dict) or not updates:
+        problems.append(f"{where}: expected a mapping of field to value")
+        return
+    for field, value in updates.items():
+        allowed = SETTABLE_FIELDS.get(field)
+        if allowed is None:
+            problems.append(f"{where}.{field}: not a settable field")
+        elif allowed is str and not isinstance(value, str) or allowed is not str and value not in allowed:
+            problems.append(f"{where}.{field}: invalid value {value!r}")
+
+def _check_detector(where: str, spec: Any, problems: List[str]) -> None:
+    if not isinstance(spec, dict) or not isinstance(spec.get("type"), str) or spec["type"] not in DETECTOR_TYPES:
+        problems.append(f"{where}: type must be one of {sorted(DETECTOR_TYPES)}")
+        return
+    if spec["type"] == "name":
+        field = spec.get("field", "agent_name")
+        if not isinstance(field, str) or field not in TEXT_FIELDS:
+            problems.append(f"{where}.field: must be one of {sorted(TEXT_FIELDS)}")
+    confidence = spec.get("min_confidence", 0.5)
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0 <= confidence <= 1:
+        problems.append(f"{where}.min_confidence: expected a number from 0 to 1")
+    if spec["type"] == "signals":
+        rules = spec.get("rules")
+        if not isinstance(rules, list) or not rules:
+            problems.append(f"{where}.rules: expected a list of rules")
+            return
+        for position, rule in enumerate(rules):
+            signal = rule.get("signal") if isinstance(rule, dict) else None
+            if not isinstance(signal, str) or signal not in DETECTOR_PHRASES:
+                problems.append(f"{where}.rules[{position}].signal: must be one of {sorted(DETECTOR_PHRASES)}")
+            else:
+                _check_updates(f"{where}.rules[{position}].set", rule.get("set"), problems)
+
+def _check_prompt(where: str, prompt: Any, problems: List[str], allowed: set = PROMPT_VARIABLES) -> None:
+    if not isinstance(prompt, str) or not prompt.strip():
+        problems.append(f"{where}: expected a non-empty string")
+        return
+    try:
+        variables = {field for _, field, _, _ in string.Formatter().parse(prompt) if field is not None}
+    except ValueError as error:
+        problems.append(f"{where}: {error}")
+        return
+    for variable in sorted(variables - allowed):
+        problems.append(f"{where}: unknown variable {{{variable}}}")
+
+def _check_templates(where: str, templates: Any, problems: List[str]) -> None:
+    if not isinstance(templates, list):
+        problems.append(f"{where}: expected a list of templates")
+        return
+    for position, template in enumerate(templates):
+        if not isinstance(template, dict) or set(template) - {"reply", "when"}:
+            problems.append(f"{where}[{position}]: expected reply and an optional when")
+            continue
+        _check_prompt(f"{where}[{position}].reply", template.get("reply"), problems, allowed=TEMPLATE_VARIABLES)
+        if "when" in template:
+            _check_condition(f"{where}[{position}].when", template["when"], problems)
+
+def _compile_template(template: Dict) -> ReplyTemplate:
+    text = template["reply"]
+    slots = tuple(sorted({field for _, field, _, _ in string.Formatter().parse(text) if field is not None}))
+    when = compile_condition(template["when"]) if "when" in template else None
+    return ReplyTemplate(text, slots, when)
+
+def validate_flow(definition: Any, source: str = "<flow>") -> None:
+    """Raise FlowDefinitionError listing every problem in a flow definition"""
+    problems: List[str] = []
+    if not isinstance(definition, dict):
+        raise FlowDefinitionError(source, ["expected a mapping at the top level"])
+    states = definition.get("states")
+    if not isinstance(states, dict) or not states:
+        raise FlowDefinitionError(source, ["states: expected a mapping of state name to definition"])
+    for key in sorted(set(definition) - {"name", "initial_state", "fallback_reply", "states"}):
+        problems.append(f"{key}: unknown key")
+    if "fallback_reply" in definition:
+        _check_prompt("fallback_reply", definition["fallback_reply"], problems, allowed=set())
+    initial_state = definition.get("initial_state")
+    if not isinstance(initial_state, str) or initial_state not in states:
+        problems.append("initial_state: must name one of the states")
+
+    for name, spec in states.items():
+        where = f"states.{name}"
+        spec = spec or {}
+        if not isinstance(spec, dict):
+            problems.append(f"{where}: expected a mapping")
+            continue
+        for key in sorted(set(spec) - {"prompt", "templates", "detector", "advance", "end"}):
+            problems.append(f"{where}.{key}: unknown key")
+        if "prompt" in spec:
+            _check_prompt(f"{where}.prompt", spec["prompt"], problems)
+        elif set(spec) & {"templates", "detector", "advance", "end"}:
+            problems.append(f"{where}: a terminal state (no prompt) cannot have templates, a detector or transitions")
+        if "templates" in spec:
+            _check_templates(f"{where}.templates", spec["templates"], problems)
+        if "detector" in spec:
+            _check_detector(f"{where}.detector", spec["detector"], problems)
+        for kind in ("advance", "end"):
+            if kind in spec:
+                transition = spec[kind]
+                target = transition.get("to") if isinstance(transition, dict) else None
+                if not isinstance(target, str) or target not in states:
+                    problems.append(f"{where}.{kind}.to: must name one of the states")
+                else:
+                    _check_condition(f"{where}.{kind}.when", transition.get("when"), problems)
+
+    # Every state should be reachable from the initial one
+    if not problems:
+        reachable, pending = set(), [definition["initial_state"]]
+        while pending:
+            name = pending.pop()
+            if name not in reachable:
+                reachable.add(name)
+                spec = states[name] or {}
+                pending.extend(spec[kind]["to"] for kind in ("advance", "end") if kind in spec)
+        for name in states:
+            if name not in reachable:
+                problems.append(f"states.{name}: unreachable from {definition['initial_state']}")
+
+    if problems:
+        raise FlowDefinitionError(source, problems)
+
+def compile_flow(definition: Dict, source: str = "<flow>") -> ConversationFlow:
+    """Validate a flow definition and compile it into a transition table"""
+    validate_flow(definition, source)
+    steps = []
+    for name, spec in definition["states"].items():
+        spec = spec or {}
+        detector = spec.get("detector")
+        advance = spec.get("advance")
+        end = spec.get("end")
+        steps.append(FlowStep(
+            name=name,
+            prompt=spec.get("prompt"),
+            templates=tuple(_compile_template(template) for template in spec.get("templates", ())),
+            detector=DETECTOR_TYPES[detector["type"]](detector) if detector else None,
+            advance_to=advance["to"] if advance else None,
+            advance_when=compile_condition(advance["when"]) if advance else None,
+            end_to=end["to"] if end else None,
+            end_when=compile_condition(end["when"]) if end else None,
+        ))
+    return ConversationFlow(definition.get("name", source), definition["initial_state"], tuple(steps),
+                            definition.get("fallback_reply"))
+
+def load_flow(path: str) -> ConversationFlow:
+    """Load a flow from a .yaml/.yml or .json file"""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            definition = yaml.safe_load(f)
+        else:
+            definition = json.load(f)
+    return compile_flow(definition, path)
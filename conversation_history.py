@@ -0,0 +1,121 @@
+import math
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Prompt roles for the chat history: the LLM plays the customer, so the agent is the human
+HISTORY_ROLES = {"agent": "human", "bot": "ai"}
+SUMMARY_PREFIX = "Earlier in this call:"
+
+_first_sentence = re.compile(r"\s*(.+?[.!?])(?:\s|$)", re.DOTALL)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), without loading a tokenizer"""
+    return math.ceil(len(text) / 4) + 1
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text to roughly the given number of tokens"""
+    limit = max(tokens - 1, 0) * 4
+    return text if len(text) <= limit else text[:max(limit - 3, 0)].rstrip() + "..."
+
+def summary_line(message: Dict, tokens: int = 24) -> str:
+    """Condense one message to a short line for the rolling summary"""
+    speaker = "Agent" if message["role"] == "agent" else "Customer"
+    content = " ".join(message["content"].split())
+    found = _first_sentence.match(content)
+    return f"{speaker}: {_truncate(found.group(1) if found else content, tokens)}"
+
+class HistoryBuilder:
+    """Fit a conversation's messages into a prompt token budget
+
+    The most recent messages are sent verbatim within the budget. Older
+    messages are folded, once each, into a rolling extractive summary kept in
+    the State (history_summary, summarized_count), so a turn only touches the
+    messages added since the previous one. The summary keeps its newest
+    lines within summary_tokens; the whole history stays within token_budget.
+    """
+
+    def __init__(self, token_budget: int = 600, summary_tokens: int = 150,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        if summary_tokens >= token_budget:
+            raise ValueError("summary_tokens must be smaller than token_budget")
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.count_tokens = count_tokens
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.max_prompt_tokens = 0
+
+    @classmethod
+    def from_env(cls) -> "HistoryBuilder":
+        return cls(
+            token_budget=int(os.environ.get("HISTORY_TOKEN_BUDGET", 600)),
+            summary_tokens=int(os.environ.get("HISTORY_SUMMARY_TOKENS", 150)),
+        )
+
+    def _fold(self, summary: str, messages: List[Dict]) -> str:
+        """Add messages to the summary, dropping its oldest lines to stay within summary_tokens"""
+        lines = summary.split("\n") if summary else []
+        lines.extend(summary_line(message) for message in messages)
+        tokens = sum(self.count_tokens(line) for line in lines)
+        while lines and tokens > self.summary_tokens - self.count_tokens(SUMMARY_PREFIX):
+            tokens -= self.count_tokens(lines.pop(0))
+        return "\n".join(lines)
+
+    def build(self, state: Dict) -> List[Tuple[str, str]]:
+        """Return the history as (role, content) prompt messages, updating the state's summary"""
+        messages = state["messages"]
+        summary = state.get("history_summary") or ""
+        start = state.get("summarized_count") or 0
+
+        # Walk back from the newest message until the recent window is full
+        window_budget = self.token_budget - self.summary_tokens
+        window_start, used = len(messages), 0
+        while window_start > start:
+            tokens = self.count_tokens(messages[window_start - 1]["content"])
+            if used + tokens > window_budget:
+                break
+            window_start -= 1
+            used += tokens
+
+        # The latest message alone is over budget; it is sent truncated rather than summarized
+        oversized = bool(messages) and window_start == len(messages)
+        fold_end = window_start - 1 if oversized else window_start
+
+        # Everything older than the window is folded into the summary exactly once
+        if fold_end > start:
+            summary = self._fold(summary, messages[start:fold_end])
+            state["history_summary"] = summary
+            state["summarized_count"] = fold_end
+
+        history = []
+        if summary:
+            history.append(("system", f"{SUMMARY_PREFIX}\n{summary}"))
+        history.extend((HISTORY_ROLES[message["role"]], message["content"]) for message in messages[window_start:])
+        if oversized:
+            latest = messages[-1]
+            history.append((HISTORY_ROLES[latest["role"]], _truncate(latest["content"], window_budget)))
+        return history
+
+    def history_tokens(self, history: List[Tuple[str, str]]) -> int:
+        return sum(self.count_tokens(content) for _, content in history)
+
+    def record_prompt(self, *texts: str, history: Optional[List[Tuple[str, str]]] = None) -> int:
+        """Count one LLM call's prompt tokens into the metrics"""
+        tokens = sum(self.count_tokens(text) for text in texts) + self.history_tokens(history or [])
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+            self.max_prompt_tokens = max(self.max_prompt_tokens, tokens)
+        return tokens
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "mean_prompt_tokens": self.prompt_tokens / self.calls if self.calls else 0.0,
+                "max_prompt_tokens": self.max_prompt_tokens,
+            }
@@ -0,0 +1,45 @@
+import bisect
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+def _point(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hashing of conversation ids onto workers
+
+    Each worker is placed on the ring at `replicas` points; a conversation
+    belongs to the first worker point at or after its own hash. Adding or
+    removing a worker only moves the conversations on that worker's arcs,
+    and every process building a ring from the same workers agrees on the
+    owner of each conversation.
+    """
+
+    def __init__(self, workers: Iterable[str] = (), replicas: int = 128):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for worker in workers:
+            self.add(worker)
+
+    @property
+    def workers(self) -> List[str]:
+        return sorted(set(self._owners.values()))
+
+    def add(self, worker: str) -> None:
+        for replica in range(self.replicas):
+            point = _point(f"{worker}#{replica}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = worker
+
+    def remove(self, worker: str) -> None:
+        self._points = [point for point in self._points if self._owners[point] != worker]
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != worker}
+
+    def owner(self, conversation_id: str) -> Optional[str]:
+        """The worker a conversation is routed to, or None if the ring is empty"""
+        if not self._points:
+            return None
+        position = bisect.bisect_left(self._points, _point(conversation_id))
+        return self._owners[self._points[position % len(self._points)]]
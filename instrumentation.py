@@ -0,0 +1,276 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Descriptions for the exported metrics; others are exported without HELP text
+METRIC_HELP = {
+    "chatbot_turns_total": "Agent messages handled",
+    "chatbot_turn_seconds": "Time to handle one agent message",
+    "chatbot_stage_seconds": "Time spent in each stage of a turn",
+    "chatbot_replies_total": "Bot replies by where they came from",
+    "chatbot_reply_mode_replies_total": "Bot replies sent from a template versus generated by the LLM",
+    "chatbot_reply_seconds_total": "Time spent producing bot replies, template versus LLM",
+    "chatbot_template_seconds_saved_total": "Mean LLM reply time minus the time taken, summed over template replies",
+    "chatbot_llm_calls_total": "Reply chain LLM calls, including speculative ones",
+    "chatbot_prompt_tokens_total": "Estimated prompt tokens sent to the LLM",
+    "chatbot_completion_tokens_total": "Estimated completion tokens received from the LLM",
+    "chatbot_state_transitions_total": "Conversation state changes",
+    "chatbot_admission_rejected_total": "Turns shed by the server's admission queue",
+    "chatbot_llm_failures_total": "Server turns whose LLM call failed, by provider status",
+    "chatbot_worker_restarts_total": "Worker processes restarted by the supervisor",
+    "chatbot_speculation_started_total": "Speculative replies started for a possible next turn",
+    "chatbot_speculation_claims_total": "Turns that looked for a speculative reply, by whether one matched",
+    "chatbot_speculation_cancelled_total": "Speculative replies cancelled before they started",
+    "chatbot_speculation_wasted_tokens_total": "Tokens spent on speculative replies that were never used",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
+
+class Registry:
+    """Counters and latency histograms, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        # name -> labels -> [count per bucket..., sum, count]
+        self._histograms: Dict[str, Dict[Labels, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, labels: Labels = ()) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: Labels = ()) -> None:
+        position = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            values = series.get(labels)
+            if values is None:
+                values = series[labels] = [0] * (len(self.buckets) + 2)
+            if position < len(self.buckets):
+                values[position] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def value(self, name: str, **labels: str) -> float:
+        """A counter's current value, e.g. for tests and benchmarks"""
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                if name in METRIC_HELP:
+                    lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, values in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (float("inf"),), values[:-2] + [values[-1] - sum(values[:-2])]):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative:g}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {values[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+# Off unless METRICS=on; when off, span() and turn() return a shared no-op
+enabled = os.environ.get("METRICS", "off") == "on"
+registry = Registry()
+
+# One JSON line per turn on this logger (TURN_LOG=path, or - for stderr)
+turn_logger = logging.getLogger("chatbot.turns")
+
+# The record of the turn being handled in this context, if any
+_current_turn: ContextVar[Optional[Dict]] = ContextVar("current_turn", default=None)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        seconds = time.perf_counter() - self.start
+        registry.observe("chatbot_stage_seconds", seconds, (("stage", self.name),))
+        record = _current_turn.get()
+        if record is not None:
+            stages = record["stages"]
+            stages[self.name] = stages.get(self.name, 0.0) + seconds * 1000
+        return False
+
+def span(name: str):
+    """Time a stage of the current turn: with span("llm"): ..."""
+    if not enabled:
+        return _NOOP
+    return _Span(name)
+
+def count(name: str, value: float = 1, **labels: str) -> None:
+    """Add to a counter, and to the current turn's record under the same name"""
+    if not enabled:
+        return
+    registry.inc(name, value, tuple(sorted(labels.items())))
+    record = _current_turn.get()
+    if record is not None:
+        counters = record["counters"]
+        counters[name] = counters.get(name, 0) + value
+
+def annotate(**fields) -> None:
+    """Add fields to the current turn's log line"""
+    record = _current_turn.get()
+    if record is not None:
+        record.update(fields)
+
+def record_overhead(name: str, outer: str, *inner: str) -> None:
+    """Record the time in stage outer not spent in the inner stages as stage name"""
+    record = _current_turn.get()
+    if record is not None and outer in record["stages"]:
+        stages = record["stages"]
+        stages[name] = stages[outer] - sum(stages.get(stage, 0.0) for stage in inner)
+
+class _Turn:
+    __slots__ = ("fields", "record", "token", "start")
+
+    def __init__(self, fields: Dict):
+        self.fields = fields
+
+    def __enter__(self) -> Dict:
+        self.record = dict(self.fields, stages={}, counters={})
+        self.token = _current_turn.set(self.record)
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, *exc_info) -> bool:
+        seconds = time.perf_counter() - self.start
+        try:
+            _current_turn.reset(self.token)
+        except ValueError:
+            # Exited in another context, e.g. a stream closed from a different task
+            _current_turn.set(None)
+        registry.inc("chatbot_turns_total")
+        registry.observe("chatbot_turn_seconds", seconds)
+        record = self.record
+        record["total_ms"] = round(seconds * 1000, 3)
+        record["stages"] = {name: round(ms, 3) for name, ms in record["stages"].items()}
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        if turn_logger.isEnabledFor(logging.INFO):
+            turn_logger.info(json.dumps(record, default=str))
+        _export()
+        return False
+
+def turn(**fields):
+    """Collect a turn's spans and counters into one JSON log line"""
+    if not enabled:
+        return _NOOP
+    return _Turn(fields)
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return registry.render()
+
+def write_prometheus(path: str) -> None:
+    """Write the metrics file atomically, e.g. for node_exporter's textfile collector"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        f.write(render_prometheus())
+    os.replace(temporary, path)
+
+_metrics_file = os.environ.get("METRICS_FILE")
+_metrics_file_interval = float(os.environ.get("METRICS_FILE_INTERVAL", 10))
+_metrics_file_written = 0.0
+_metrics_server = None
+_export_lock = threading.Lock()
+
+def _export() -> None:
+    """Rewrite METRICS_FILE every METRICS_FILE_INTERVAL seconds and start the METRICS_PORT endpoint"""
+    global _metrics_file_written
+    if _metrics_file and time.monotonic() - _metrics_file_written >= _metrics_file_interval:
+        with _export_lock:
+            if time.monotonic() - _metrics_file_written >= _metrics_file_interval:
+                _metrics_file_written = time.monotonic()
+                write_prometheus(_metrics_file)
+    if _metrics_server is None and os.environ.get("METRICS_PORT"):
+        serve_metrics(int(os.environ["METRICS_PORT"]))
+
+def serve_metrics(port: int, host: str = "127.0.0.1"):
+    """Serve GET /metrics on a background thread (once per process)"""
+    global _metrics_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    with _export_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    return _metrics_server
+
+def configure(enable: Optional[bool] = None, turn_log: Optional[str] = None) -> None:
+    """Turn instrumentation on or off (default: METRICS) and direct turn logs (default: TURN_LOG)"""
+    global enabled
+    enabled = os.environ.get("METRICS", "off") == "on" if enable is None else enable
+    turn_log = turn_log if turn_log is not None else os.environ.get("TURN_LOG")
+    if turn_log and not turn_logger.handlers:
+        handler = logging.StreamHandler() if turn_log == "-" else logging.FileHandler(turn_log)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        turn_logger.addHandler(handler)
+        turn_logger.setLevel(logging.INFO)
+        turn_logger.propagate = False
+
+configure(enabled)
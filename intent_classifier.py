@@ -0,0 +1,203 @@
+import os
+import re
+import threading
+import warnings
+import zlib
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from phrase_matcher import classify_message
+
+# Weights trained by intent_training.py
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "intent_classifier.npz")
+
+# Below this confidence the model's signal is ignored and a detector has only the phrase matcher's
+INTENT_CONFIDENCE_THRESHOLD = 0.6
+
+# Each task is one softmax over the signals a detector chooses between, plus NO_SIGNAL
+INTENT_TASKS: Dict[str, Tuple[str, ...]] = {
+    "queue": ("queue_correct", "queue_wrong"),
+    "authentication": ("authenticated",),
+    "plan": ("plan_active", "plan_inactive"),
+}
+NO_SIGNAL = "none"
+
+# Words after which the next NEGATION_SCOPE tokens are marked as negated ("not active" -> !active)
+NEGATION_TOKENS = frozenset(["not", "no", "never", "cannot", "without"])
+NEGATION_SCOPE = 3
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+def _hash(feature: str, mask: int) -> Tuple[int, float]:
+    """Bucket and sign of a feature; crc32 is stable across processes, unlike hash()"""
+    code = zlib.crc32(feature.encode())
+    return code & mask, 1.0 if code >> 31 else -1.0
+
+def message_features(text: str, n_features: int) -> Dict[int, float]:
+    """Hashed unigrams, bigrams and phrase matcher signals of a message, L2-normalized
+
+    Tokens shortly after a negation are marked, and the rules' signals are
+    features too, so the model learns where to agree with them and where not.
+    """
+    mask = n_features - 1
+    tokens = []
+    negated = 0
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in NEGATION_TOKENS or token.endswith("n't"):
+            negated = NEGATION_SCOPE
+            tokens.append(token)
+            continue
+        tokens.append("!" + token if negated else token)
+        negated = max(negated - 1, 0)
+    features: Dict[int, float] = {}
+    # A constant feature, so every message has at least one
+    grams = ["<s>"] + tokens + [f"{first} {second}" for first, second in zip(["<s>"] + tokens, tokens + ["</s>"])]
+    grams.extend(f"<rule:{signal}>" for signal in classify_message(text))
+    for gram in grams:
+        index, sign = _hash(gram, mask)
+        features[index] = features.get(index, 0.0) + sign
+    norm = sum(value * value for value in features.values()) ** 0.5 or 1.0
+    return {index: value / norm for index, value in features.items()}
+
+def batch_features(texts: Sequence[str], n_features: int):
+    """Sparse rows for a batch: (feature indices, values, start offset of each row)"""
+    import numpy as np
+
+    indices: List[int] = []
+    values: List[float] = []
+    offsets = []
+    for text in texts:
+        offsets.append(len(indices))
+        features = message_features(text, n_features)
+        indices.extend(features)
+        values.extend(features.values())
+    return np.array(indices, dtype=np.int64), np.array(values, dtype=np.float32), np.array(offsets, dtype=np.int64)
+
+def linear_scores(weights, bias, indices, values, offsets):
+    """X @ weights + bias for sparse rows; every row is non-empty"""
+    import numpy as np
+
+    return np.add.reduceat(weights[indices] * values[:, None], offsets, axis=0) + bias
+
+def softmax(scores):
+    import numpy as np
+
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+class IntentModel:
+    """Linear classifiers over hashed n-grams, one per task, with temperature-calibrated softmax
+
+    weights[task] is (n_features, labels) and labels[task] lists the task's
+    signals then NO_SIGNAL; dividing the scores by temperature[task] makes
+    the softmax probabilities match accuracy on held-out messages.
+    """
+
+    def __init__(self, n_features: int, weights: Dict, biases: Dict, temperatures: Dict[str, float],
+                 labels: Dict[str, Tuple[str, ...]]):
+        self.n_features = n_features
+        self.weights = weights
+        self.biases = biases
+        self.temperatures = temperatures
+        self.labels = labels
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "IntentModel":
+        import numpy as np
+
+        with np.load(path) as data:
+            tasks = [str(task) for task in data["tasks"]]
+            return cls(
+                n_features=int(data["n_features"]),
+                weights={task: data[f"{task}.weights"].astype(np.float32) for task in tasks},
+                biases={task: data[f"{task}.bias"].astype(np.float32) for task in tasks},
+                temperatures={task: float(data[f"{task}.temperature"]) for task in tasks},
+                labels={task: tuple(str(label) for label in data[f"{task}.labels"]) for task in tasks},
+            )
+
+    def save(self, path: str) -> None:
+        """Write the weights as float16 in a compressed .npz"""
+        import numpy as np
+
+        arrays = {"n_features": np.array(self.n_features), "tasks": np.array(sorted(self.weights))}
+        for task in self.weights:
+            arrays[f"{task}.weights"] = self.weights[task].astype(np.float16)
+            arrays[f"{task}.bias"] = self.biases[task].astype(np.float16)
+            arrays[f"{task}.temperature"] = np.array(self.temperatures[task])
+            arrays[f"{task}.labels"] = np.array(self.labels[task])
+        np.savez_compressed(path, **arrays)
+
+    def task_for(self, signals: Iterable[str]) -> Optional[str]:
+        """The task that decides between these signals, if the model has one"""
+        wanted = set(signals)
+        for task, labels in self.labels.items():
+            if wanted <= set(labels):
+                return task
+        return None
+
+    def probabilities(self, task: str, texts: Sequence[str]):
+        """Calibrated (texts, labels) probabilities for a batch of messages"""
+        scores = linear_scores(self.weights[task], self.biases[task], *batch_features(texts, self.n_features))
+        return softmax(scores / self.temperatures[task])
+
+    def predict(self, task: str, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """(label, confidence) for each message; the label is a signal or NO_SIGNAL"""
+        probabilities = self.probabilities(task, texts)
+        labels = self.labels[task]
+        return [(labels[best], float(row[best])) for row, best in zip(probabilities, probabilities.argmax(axis=1))]
+
+# The model is loaded from INTENT_MODEL_PATH on first use when INTENT_CLASSIFIER=on; None when it
+# is off (the default), the weights file is missing or unreadable, or NumPy is not installed, and
+# detectors use the phrase matcher alone
+_model: Optional[IntentModel] = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def get_intent_model() -> Optional[IntentModel]:
+    global _model, _model_loaded
+    if not _model_loaded:
+        with _model_lock:
+            if not _model_loaded:
+                path = os.environ.get("INTENT_MODEL_PATH", DEFAULT_MODEL_PATH)
+                if os.environ.get("INTENT_CLASSIFIER", "off") == "on" and os.path.exists(path):
+                    try:
+                        _model = IntentModel.load(path)
+                    except Exception as error:
+                        warnings.warn(f"Intent model {path} not loaded, using the phrase matcher: {error!r}")
+                        _model = None
+                _model_loaded = True
+    return _model
+
+def set_intent_model(model: Optional[IntentModel]) -> None:
+    """Use a different model, or None for the phrase matcher alone"""
+    global _model, _model_loaded
+    with _model_lock:
+        _model = model
+        _model_loaded = True
+
+def classify_batch(texts: Sequence[str], signals: Iterable[str],
+                   min_confidence: float = INTENT_CONFIDENCE_THRESHOLD) -> List[FrozenSet[str]]:
+    """The detector signals in each of a batch of agent messages, as classify_message returns them
+
+    The phrase matcher's signals always stand. Where they include none of
+    the given signals, the intent model (if it has a task for them) adds the
+    signal it finds with at least min_confidence; a predicted NO_SIGNAL adds
+    nothing. The messages the rules leave open are scored in one pass.
+    """
+    results = [classify_message(text) for text in texts]
+    model = get_intent_model()
+    task = model.task_for(signals) if model is not None else None
+    if task is None:
+        return results
+    wanted = frozenset(signals)
+    undecided = [position for position, found in enumerate(results) if not found & wanted]
+    if undecided:
+        predictions = model.predict(task, [texts[position] for position in undecided])
+        for position, (label, confidence) in zip(undecided, predictions):
+            if label != NO_SIGNAL and confidence >= min_confidence:
+                results[position] = results[position] | {label}
+    return results
+
+def classify_signals(text: str, signals: Iterable[str],
+                     min_confidence: float = INTENT_CONFIDENCE_THRESHOLD) -> FrozenSet[str]:
+    """classify_batch for a single message"""
+    return classify_batch([text], signals, min_confidence)[0]
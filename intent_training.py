@@ -0,0 +1,430 @@
+"""Train and evaluate the intent classifier (intent_classifier.py).
+
+Write the synthetic labelled corpus (agent lines per task and label, with
+phrasings held out for the test split), or your own in the same format:
+    python intent_training.py generate -o intents.jsonl --split train
+
+Train on it (or on the built-in corpus without --data) and write the weights:
+    python intent_training.py train -o models/intent_classifier.npz
+
+Compare the phrase matcher rules, the model, and the rules with the model
+filling in where they find nothing, on held-out messages:
+    python intent_training.py evaluate
+
+Each corpus line is {"text": ..., "task": ..., "label": ...}, where task is one
+of intent_classifier.INTENT_TASKS and label is one of its signals or "none".
+An optional "group" (e.g. the phrasing or transcript a line came from) keeps
+related lines in the same fold when the confidence temperature is calibrated.
+"""
+import argparse
+import json
+import random
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from intent_classifier import (DEFAULT_MODEL_PATH, INTENT_CONFIDENCE_THRESHOLD, INTENT_TASKS, NO_SIGNAL, IntentModel,
+                               batch_features, linear_scores, softmax)
+from phrase_matcher import classify_message
+
+# Agent phrasings per task and label. Every fourth phrasing is held out of
+# training, so the test split measures messages worded in ways never seen.
+PHRASINGS: Dict[str, Dict[str, List[str]]] = {
+    "queue": {
+        "queue_correct": [
+            "Yes, you're in the right queue for coverage inquiries.",
+            "You're in the right place, I can help with coverage.",
+            "This is the coverage team, how can I help?",
+            "Yes, coverage questions are handled here.",
+            "You've reached the benefits and coverage line.",
+            "I can help you with your coverage questions.",
+            "Yep, this is the right department for that.",
+            "Correct, this queue handles coverage inquiries.",
+            "Sure, I can look into the member's coverage for you.",
+            "That's us, we handle eligibility and coverage.",
+            "You're in the correct queue.",
+            "Absolutely, I can check coverage details here.",
+            "Yes, I can assist with coverage.",
+            "This line handles plan coverage, so you're all set.",
+            "Yes, that's something I can help with.",
+            "Right queue, go ahead.",
+            "Coverage inquiries come through here, yes.",
+            "You've got the right team.",
+            "I handle coverage verification, so we can start.",
+            "Yes, this is where you check on a member's plan.",
+        ],
+        "queue_wrong": [
+            "Let me transfer you to the coverage department.",
+            "You're not in the right queue, sorry.",
+            "That's a different department.",
+            "This is the billing line, I'll need to send you to coverage.",
+            "Coverage questions go to a different team, I'll connect you.",
+            "Sorry, this is pharmacy support.",
+            "You'll want to call the eligibility line at 555-123-4567.",
+            "I can't help with coverage here, let me route you.",
+            "This queue is for claims only.",
+            "Wrong queue, unfortunately.",
+            "You've reached technical support, not coverage.",
+            "I'll transfer you to someone who handles that.",
+            "That's not something we handle in this queue.",
+            "Please hold while I connect you to the right team.",
+            "We only do billing here; the coverage team's number is 555-987-6543.",
+            "Unfortunately this isn't the coverage line.",
+            "Let me get you over to member services.",
+            "You need the benefits department for that.",
+            "This is the general support queue, I'll pass you along.",
+            "I'm going to redirect your call to coverage.",
+        ],
+        NO_SIGNAL: [
+            "How can I help you today?",
+            "Could you repeat that?",
+            "One moment please.",
+            "Which queue were you looking for?",
+            "Let me check which team handles that.",
+            "Can I get the member's name first?",
+            "Sorry, the line cut out, what did you say?",
+            "Hold on, let me look.",
+            "What's the reason for your call?",
+            "Who am I speaking with?",
+            "Give me a second to check.",
+            "I'm not sure yet, what do you need exactly?",
+            "Are you calling about a claim?",
+            "Thanks for waiting.",
+            "Hi there!",
+            "Can you tell me more about the question?",
+            "I'll need a few details before I can say.",
+            "What kind of coverage question is it?",
+            "Let me find out if we cover that here.",
+            "Bear with me while I check the queue.",
+        ],
+    },
+    "authentication": {
+        "authenticated": [
+            "Perfect, I've verified your identity in our system.",
+            "Thank you for the information.",
+            "Thanks, I've pulled up the account.",
+            "Got it, the member is verified.",
+            "Great, that matches what we have on file.",
+            "You're all set, the account is confirmed.",
+            "I've confirmed your identity.",
+            "Okay, I found the member and everything checks out.",
+            "Verification complete.",
+            "That ID matches our records.",
+            "Thanks, I have the account open now.",
+            "Alright, you've been authenticated.",
+            "Everything lines up, thank you.",
+            "I located the member record, thanks.",
+            "The details check out.",
+            "Identity confirmed, how can I help further?",
+            "Thanks, that's all I needed to verify.",
+            "Found it, the member ID is valid.",
+            "Okay, the account is verified.",
+            "Great, I can see the member's file.",
+        ],
+        NO_SIGNAL: [
+            "Can you please provide your member ID?",
+            "I'll need to verify your identity first.",
+            "Could you also confirm the date of birth?",
+            "I couldn't verify that member ID.",
+            "That ID doesn't match our records.",
+            "I haven't verified you yet.",
+            "Can you spell the member's last name?",
+            "What's the address on the account?",
+            "Hmm, I'm not finding that ID.",
+            "Let me look that up.",
+            "One moment while I check the system.",
+            "Can you read the ID again slowly?",
+            "The system is slow today, bear with me.",
+            "Is AD78902145 the full ID?",
+            "I need one more detail to verify the account.",
+            "Sorry, that doesn't match.",
+            "What's the member's date of birth?",
+            "I'm unable to confirm the identity with that.",
+            "Please hold while I pull that up.",
+            "Which plan is the member on?",
+        ],
+    },
+    "plan": {
+        "plan_active": [
+            "I've checked your plan, and yes, it is currently active.",
+            "Your plan is active and set to renew next month.",
+            "The plan is in force.",
+            "Coverage is current.",
+            "Yes, the member is covered.",
+            "The policy is active as of today.",
+            "Everything looks good, the plan is in effect.",
+            "The member has active coverage.",
+            "Yes, it's active through December.",
+            "Coverage is in good standing.",
+            "The plan hasn't lapsed, it's active.",
+            "The plan is currently effective.",
+            "Yep, still covered.",
+            "The membership is current and active.",
+            "Benefits are active for this member.",
+            "The plan renewed and is active.",
+            "Yes, the plan is valid.",
+            "The coverage has not expired.",
+            "It shows as active in our system.",
+            "The member is eligible for benefits right now.",
+        ],
+        "plan_inactive": [
+            "Your plan is inactive.",
+            "Your plan is not active at the moment.",
+            "The plan expired last month.",
+            "Coverage lapsed in March.",
+            "The policy was terminated.",
+            "The member's coverage has ended.",
+            "I'm afraid the plan was cancelled.",
+            "It shows as inactive.",
+            "The plan is no longer in effect.",
+            "The member isn't covered anymore.",
+            "Coverage ended at the end of last year.",
+            "The plan was active until it was cancelled last month.",
+            "Unfortunately the policy has lapsed.",
+            "No active coverage for this member.",
+            "The plan isn't active.",
+            "The membership was discontinued.",
+            "Benefits were terminated for non-payment.",
+            "The member is not eligible right now.",
+            "The coverage was suspended.",
+            "That plan was closed in January.",
+        ],
+        NO_SIGNAL: [
+            "Let me check the plan status.",
+            "Is the plan active? Let me look.",
+            "Which plan are you asking about?",
+            "One moment while I pull up the plan.",
+            "Can you confirm the member ID again?",
+            "I need to check with my supervisor.",
+            "What date do you need coverage for?",
+            "I'll look into whether it's active.",
+            "Hold on, the system is loading.",
+            "Are you asking about medical or dental?",
+            "Do you want me to check if the plan is active?",
+            "Let me see what the plan shows.",
+            "Give me a moment to review the coverage.",
+            "I can check that for you.",
+            "What's the effective date you're asking about?",
+            "I'm still looking.",
+            "Can you hold for a minute?",
+            "Let me verify a few things first.",
+            "Sure, checking now.",
+            "Are you asking whether the plan is active or inactive?",
+        ],
+    },
+}
+
+PREFIXES = ["", "", "Okay, ", "Alright. ", "Sure, ", "Thanks for holding. ", "Hmm, ", "So ", "Let me see. ", "Right, "]
+SUFFIXES = ["", "", " Anything else?", " Is there anything else I can help with?", " Thanks.", " Let me know.",
+            " Okay?"]
+
+# The order flows list each task's rules in: the first rule whose signal matches wins
+RULE_ORDER = {
+    "queue": ("queue_wrong", "queue_correct"),
+    "authentication": ("authenticated",),
+    "plan": ("plan_inactive", "plan_active"),
+}
+
+def _vary(rng: random.Random, phrasing: str) -> str:
+    text = rng.choice(PREFIXES) + phrasing + rng.choice(SUFFIXES)
+    if rng.random() < 0.2:
+        text = text.lower()
+    if rng.random() < 0.2:
+        text = text.rstrip(".!?")
+    return text
+
+def _in_split(position: int, split: str) -> bool:
+    return (position % 4 == 3) == (split == "test")
+
+def generate_examples(split: str = "train", per_phrasing: int = 12, seed: int = 7) -> Iterator[Dict[str, str]]:
+    """Labelled agent lines from PHRASINGS: split "train", or "test" for the held-out phrasings
+
+    Each task also gets some of the other tasks' lines as "none" examples,
+    since a detector may see any message.
+    """
+    rng = random.Random(f"{seed}-{split}")
+    for task, labels in PHRASINGS.items():
+        others = [
+            phrasing
+            for other, other_labels in PHRASINGS.items() if other != task
+            for phrasings in other_labels.values()
+            for position, phrasing in enumerate(phrasings) if _in_split(position, split)
+        ]
+        for label, phrasings in labels.items():
+            for position, phrasing in enumerate(phrasings):
+                if not _in_split(position, split):
+                    continue
+                group = f"{task}/{label}/{position}"
+                for _ in range(per_phrasing):
+                    yield {"text": _vary(rng, phrasing), "task": task, "label": label, "group": group}
+                    if rng.random() < 0.25:
+                        other = rng.randrange(len(others))
+                        yield {"text": _vary(rng, others[other]), "task": task, "label": NO_SIGNAL,
+                               "group": f"{task}/other/{other}"}
+
+def read_examples(path: str) -> List[Dict[str, str]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def by_task(examples: List[Dict[str, str]]) -> Dict[str, Tuple[List[str], List[str], List[str]]]:
+    """task -> (texts, labels, groups); a group is the phrasing a message was made from, if known"""
+    tasks: Dict[str, Tuple[List[str], List[str], List[str]]] = {}
+    for position, example in enumerate(examples):
+        texts, labels, groups = tasks.setdefault(example["task"], ([], [], []))
+        texts.append(example["text"])
+        labels.append(example["label"])
+        groups.append(example.get("group", str(position)))
+    return tasks
+
+def fit_softmax(texts: List[str], targets, classes: int, n_features: int, epochs: int = 300,
+                learning_rate: float = 0.05, l2: float = 1e-4, seed: int = 7):
+    """Multinomial logistic regression by full-batch Adam on hashed features; returns (weights, bias)"""
+    indices, values, offsets = batch_features(texts, n_features)
+    rows = np.repeat(np.arange(len(texts)), np.diff(np.append(offsets, len(indices))))
+    onehot = np.eye(classes, dtype=np.float32)[targets]
+    weights = np.random.default_rng(seed).normal(0, 0.01, (n_features, classes)).astype(np.float32)
+    bias = np.zeros(classes, dtype=np.float32)
+    moments = [np.zeros_like(weights), np.zeros_like(weights), np.zeros_like(bias), np.zeros_like(bias)]
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    for step in range(1, epochs + 1):
+        error = (softmax(linear_scores(weights, bias, indices, values, offsets)) - onehot) / len(texts)
+        weight_grad = np.zeros_like(weights)
+        np.add.at(weight_grad, indices, error[rows] * values[:, None])
+        weight_grad += l2 * weights
+        for parameter, grad, first, second in ((weights, weight_grad, moments[0], moments[1]),
+                                                (bias, error.sum(axis=0), moments[2], moments[3])):
+            first *= beta1
+            first += (1 - beta1) * grad
+            second *= beta2
+            second += (1 - beta2) * grad * grad
+            parameter -= (learning_rate * (first / (1 - beta1 ** step))
+                          / (np.sqrt(second / (1 - beta2 ** step)) + epsilon))
+    return weights, bias
+
+def fit_temperature(scores, targets) -> float:
+    """The softmax temperature that minimizes negative log-likelihood on held-out scores"""
+    best, best_loss = 1.0, float("inf")
+    for temperature in np.exp(np.linspace(np.log(0.1), np.log(10), 200)):
+        probabilities = softmax(scores / temperature)
+        loss = -np.log(probabilities[np.arange(len(targets)), targets] + 1e-12).mean()
+        if loss < best_loss:
+            best, best_loss = float(temperature), loss
+    return best
+
+def train(examples: List[Dict[str, str]], n_features: int = 4096, epochs: int = 300, folds: int = 4,
+          seed: int = 7) -> IntentModel:
+    """Fit one classifier per task and calibrate its temperature out of fold
+
+    Examples are split into folds by group, so the temperature is fitted on
+    scores for phrasings the fold's model never saw: confidences then hold
+    for new wordings, not just for variations of the training ones.
+    """
+    weights, biases, temperatures, labels = {}, {}, {}, {}
+    for task, (texts, task_labels, groups) in by_task(examples).items():
+        labels[task] = INTENT_TASKS[task] + (NO_SIGNAL,)
+        targets = np.array([labels[task].index(label) for label in task_labels])
+        names = sorted(set(groups))
+        random.Random(seed).shuffle(names)
+        fold_of = {name: position % folds for position, name in enumerate(names)}
+        folds_of_examples = np.array([fold_of[group] for group in groups])
+        scores = np.zeros((len(texts), len(labels[task])), dtype=np.float32)
+        for fold in range(folds):
+            held_out = np.flatnonzero(folds_of_examples == fold)
+            fitted = np.flatnonzero(folds_of_examples != fold)
+            fold_weights, fold_bias = fit_softmax([texts[i] for i in fitted], targets[fitted], len(labels[task]),
+                                                  n_features, epochs, seed=seed)
+            scores[held_out] = linear_scores(fold_weights, fold_bias,
+                                             *batch_features([texts[i] for i in held_out], n_features))
+        temperatures[task] = fit_temperature(scores, targets)
+        weights[task], biases[task] = fit_softmax(texts, targets, len(labels[task]), n_features, epochs, seed=seed)
+    return IntentModel(n_features, weights, biases, temperatures, labels)
+
+def rule_label(task: str, text: str) -> str:
+    """What the phrase matcher rules decide for a task's detector"""
+    signals = classify_message(text)
+    return next((signal for signal in RULE_ORDER[task] if signal in signals), NO_SIGNAL)
+
+def calibration_error(confidences, correct, bins: int = 10) -> float:
+    """Expected calibration error: mean |accuracy - confidence| over confidence bins, weighted by size"""
+    confidences, correct = np.asarray(confidences), np.asarray(correct, dtype=float)
+    edges = np.linspace(0, 1, bins + 1)
+    error = 0.0
+    for low, high in zip(edges[:-1], edges[1:]):
+        selected = (confidences > low) & (confidences <= high)
+        if selected.any():
+            error += selected.mean() * abs(correct[selected].mean() - confidences[selected].mean())
+    return float(error)
+
+def evaluate(model: IntentModel, examples: List[Dict[str, str]],
+             min_confidence: float = INTENT_CONFIDENCE_THRESHOLD) -> Dict[str, Dict[str, float]]:
+    """Accuracy per task of the rules, the model, and the rules with the model filling in; plus calibration
+
+    The combination is what classify_batch does: a rule's signal stands, and
+    where the rules find none the model's signal counts if it is at least
+    min_confidence sure.
+    """
+    results = {}
+    for task, (texts, labels, _) in sorted(by_task(examples).items()):
+        predictions = model.predict(task, texts)
+        rules = [rule_label(task, text) for text in texts]
+        filled = [rule == NO_SIGNAL and label != NO_SIGNAL and confidence >= min_confidence
+                  for (label, confidence), rule in zip(predictions, rules)]
+        combined = [label if fill else rule for (label, _), rule, fill in zip(predictions, rules, filled)]
+        correct = [label == truth for (label, _), truth in zip(predictions, labels)]
+        results[task] = {
+            "messages": len(texts),
+            "rules": float(np.mean([rule == truth for rule, truth in zip(rules, labels)])),
+            "model": float(np.mean(correct)),
+            "rules_with_model": float(np.mean([label == truth for label, truth in zip(combined, labels)])),
+            "model_share": float(np.mean(filled)),
+            "calibration_error": calibration_error([confidence for _, confidence in predictions], correct),
+        }
+    return results
+
+def print_evaluation(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'task':<16} {'messages':>8} {'rules':>8} {'model':>8} {'combined':>9} {'by model':>9} {'ECE':>7}")
+    for task, result in results.items():
+        print(f"{task:<16} {result['messages']:>8} {result['rules']:>8.1%} {result['model']:>8.1%} "
+              f"{result['rules_with_model']:>9.1%} {result['model_share']:>9.1%} "
+              f"{result['calibration_error']:>7.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="Write the synthetic labelled corpus as JSON lines")
+    generate.add_argument("-o", "--output", required=True)
+    generate.add_argument("--split", choices=["train", "test"], default="train")
+    generate.add_argument("--per-phrasing", type=int, default=12)
+    fit = commands.add_parser("train", help="Train the classifier and write its weights")
+    fit.add_argument("--data", help="Labelled JSON lines (default: the synthetic train split)")
+    fit.add_argument("-o", "--output", default=DEFAULT_MODEL_PATH)
+    fit.add_argument("--features", type=int, default=4096, help="Hashed feature buckets, a power of two")
+    fit.add_argument("--epochs", type=int, default=300)
+    check = commands.add_parser("evaluate", help="Accuracy and calibration on held-out messages")
+    check.add_argument("--data", help="Labelled JSON lines (default: the synthetic test split)")
+    check.add_argument("--model", default=DEFAULT_MODEL_PATH)
+    check.add_argument("--min-confidence", type=float, default=INTENT_CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        with open(args.output, "w") as f:
+            for example in generate_examples(args.split, args.per_phrasing):
+                f.write(json.dumps(example) + "\n")
+        return
+
+    if args.command == "train":
+        if args.features & (args.features - 1):
+            parser.error("--features must be a power of two")
+        examples = read_examples(args.data) if args.data else list(generate_examples("train"))
+        model = train(examples, args.features, args.epochs)
+        model.save(args.output)
+        print(f"Trained on {len(examples)} messages; wrote {args.output}")
+        print_evaluation(evaluate(model, examples))
+        return
+
+    examples = read_examples(args.data) if args.data else list(generate_examples("test"))
+    print_evaluation(evaluate(IntentModel.load(args.model), examples, args.min_confidence))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from conversation_history import estimate_tokens
+from rate_limiter import PRIORITY_ACTIVE, RateLimiter, get_rate_limiter, retry_after, retry_delay, retryable_status
+
+# Canned customer replies the stub picks from, keyed by a phrase in the system prompt
+STUB_REPLIES = [
+    ("ask for the agent's name", "Hi, I'm calling on behalf of a member about their insurance coverage. May I know your name, please?"),
+    ("right queue", "Thanks, {agent_name}. Am I in the right queue for coverage inquiries?"),
+    ("authentication details", "Sure, the member ID is AD78902145. Do you need any other details to verify the account?"),
+    ("plan is active", "Thanks, {agent_name}. Could you check whether my plan is currently active?"),
+]
+STUB_FALLBACK_REPLY = "Thanks, could you help me with my coverage question?"
+
+_agent_name = re.compile(r"(?:agent's name is|Ask) (\w+)")
+_tokens = re.compile(r"\S+\s*")
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(f"{message.type}: {message.content}" for message in messages)
+
+class StubChatModel(BaseChatModel):
+    """Deterministic local chat model for offline runs and load tests
+
+    Replies are picked from STUB_REPLIES by the system prompt, so the same
+    prompt always gives the same reply. latency simulates time to first
+    token; tokens_per_second (0 for instant) simulates generation speed.
+    """
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"latency": self.latency, "tokens_per_second": self.tokens_per_second}
+
+    def reply_for(self, messages: List[BaseMessage]) -> str:
+        """Pick the canned reply for a prompt"""
+        # Only the system prompt selects the reply; the history may quote other states' phrases
+        prompt = _prompt_text(messages[:1])
+        found = _agent_name.search(prompt)
+        agent_name = found.group(1) if found else "agent"
+        for phrase, reply in STUB_REPLIES:
+            if phrase in prompt:
+                return reply.format(agent_name=agent_name)
+        return STUB_FALLBACK_REPLY
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        reply = self.reply_for(messages)
+        time.sleep(self.latency + self._token_delay() * len(_tokens.findall(reply)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        reply = self.reply_for(messages)
+        await asyncio.sleep(self.latency + self._token_delay() * len(_tokens.findall(reply)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in _tokens.findall(self.reply_for(messages)):
+            time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in _tokens.findall(self.reply_for(messages)):
+            await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+# Recordings loaded per file, shared by every RecordReplayChatModel on that file
+_recordings: Dict[str, Dict[str, str]] = {}
+_recordings_lock = threading.Lock()
+
+def _load_recordings(path: str) -> Dict[str, str]:
+    with _recordings_lock:
+        if path not in _recordings:
+            recordings = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        recordings[entry["key"]] = entry["reply"]
+            _recordings[path] = recordings
+        return _recordings[path]
+
+def recording_key(messages: List[BaseMessage]) -> str:
+    """Key a prompt by its messages, ignoring whitespace differences"""
+    prompt = " ".join(_prompt_text(messages).split())
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+class RecordReplayChatModel(BaseChatModel):
+    """Record replies from another backend to a JSONL file, or replay them offline
+
+    In "record" mode every call goes to the inner model and the reply is
+    appended to the file. In "replay" mode replies come from the file and an
+    unrecorded prompt raises KeyError.
+    """
+
+    path: str
+    mode: str = "replay"
+    inner: Optional[BaseChatModel] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "record-replay"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"path": self.path, "mode": self.mode}
+
+    def _replay(self, key: str) -> ChatResult:
+        recordings = _load_recordings(self.path)
+        if key not in recordings:
+            raise KeyError(f"No recorded reply for prompt {key[:12]} in {self.path}")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=recordings[key]))])
+
+    def _record(self, key: str, reply: str) -> None:
+        recordings = _load_recordings(self.path)
+        with _recordings_lock:
+            recordings[key] = reply
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": key, "reply": reply}) + "\n")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = recording_key(messages)
+        if self.mode == "replay":
+            return self._replay(key)
+        reply = self.inner.invoke(messages, stop=stop, **kwargs).content
+        self._record(key, reply)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = recording_key(messages)
+        if self.mode == "replay":
+            return self._replay(key)
+        reply = (await self.inner.ainvoke(messages, stop=stop, **kwargs)).content
+        self._record(key, reply)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+# Pooled HTTP clients shared by every HTTPChatModel with the same endpoint and limits;
+# async clients are per event loop because their connections belong to the loop
+_http_clients: Dict[tuple, Any] = {}
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, Any]]" = weakref.WeakKeyDictionary()
+_http_clients_lock = threading.Lock()
+
+# OpenAI-style roles for LangChain message types
+_ROLES = {"human": "user", "ai": "assistant"}
+
+class HTTPChatModel(BaseChatModel):
+    """Chat model for any OpenAI-compatible /chat/completions endpoint
+
+    Requests go through a shared httpx connection pool capped at
+    max_connections. Groq serves this API at https://api.groq.com/openai/v1;
+    benchmarks.fake_llm_server is a local stand-in that simulates rate limits.
+    Non-2xx responses raise httpx.HTTPStatusError.
+    """
+
+    base_url: str
+    model: str
+    api_key: str = ""
+    temperature: float = 0.7
+    max_connections: int = 8
+    timeout: float = 30.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "http"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"base_url": self.base_url, "model": self.model, "temperature": self.temperature}
+
+    def _client_options(self) -> Dict[str, Any]:
+        import httpx
+
+        return {
+            "base_url": self.base_url,
+            "timeout": self.timeout,
+            "limits": httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            "headers": {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {},
+        }
+
+    def _client(self):
+        import httpx
+
+        key = (self.base_url, self.api_key, self.max_connections, self.timeout)
+        with _http_clients_lock:
+            if key not in _http_clients:
+                _http_clients[key] = httpx.Client(**self._client_options())
+            return _http_clients[key]
+
+    def _async_client(self):
+        import httpx
+
+        key = (self.base_url, self.api_key, self.max_connections, self.timeout)
+        with _http_clients_lock:
+            clients = _async_http_clients.setdefault(asyncio.get_running_loop(), {})
+            if key not in clients:
+                clients[key] = httpx.AsyncClient(**self._client_options())
+            return clients[key]
+
+    def _payload(self, messages: List[BaseMessage], stop: Optional[List[str]]) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "messages": [{"role": _ROLES.get(message.type, message.type), "content": message.content} for message in messages],
+        }
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    def _result(self, response) -> ChatResult:
+        response.raise_for_status()
+        body = response.json()
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=body["choices"][0]["message"]["content"]))],
+            llm_output={"token_usage": body.get("usage", {}), "model_name": body.get("model", self.model)},
+        )
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return self._result(self._client().post("/chat/completions", json=self._payload(messages, stop)))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        return self._result(await self._async_client().post("/chat/completions", json=self._payload(messages, stop)))
+
+def _run_priority(run_manager: Any) -> int:
+    """A request's priority from the "priority" key of the run's metadata"""
+    return (getattr(run_manager, "metadata", None) or {}).get("priority", PRIORITY_ACTIVE)
+
+def _total_tokens(result: ChatResult) -> Optional[int]:
+    return ((result.llm_output or {}).get("token_usage") or {}).get("total_tokens")
+
+def _model_stream(model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+                  **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+    """A model's reply as chunks; a model without native streaming gives one chunk"""
+    if type(model)._stream is BaseChatModel._stream:
+        message = model._generate(messages, stop=stop, **kwargs).generations[0].message
+        yield ChatGenerationChunk(message=AIMessageChunk(content=message.content))
+    else:
+        yield from model._stream(messages, stop=stop, **kwargs)
+
+async def _model_astream(model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+                         **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+    if type(model)._astream is BaseChatModel._astream and type(model)._stream is BaseChatModel._stream:
+        message = (await model._agenerate(messages, stop=stop, **kwargs)).generations[0].message
+        yield ChatGenerationChunk(message=AIMessageChunk(content=message.content))
+    else:
+        async for chunk in model._astream(messages, stop=stop, **kwargs):
+            yield chunk
+
+class RateLimitedChatModel(BaseChatModel):
+    """Send another model's requests through a shared RateLimiter, retrying 429s and 5xx
+
+    Each attempt waits for a grant from the limiter (requests/min,
+    tokens/min and concurrency), highest priority first; the priority comes
+    from the run's metadata, e.g. chain.invoke(inputs, config={"metadata":
+    {"priority": PRIORITY_NEW}}). Failed attempts back off exponentially with
+    full jitter, honouring Retry-After. A streamed reply is only retried
+    before its first chunk. On release the charge is corrected to the
+    provider's reported usage, or else to the estimated tokens of the prompt
+    and the reply actually received; a failed attempt costs nothing.
+    """
+
+    inner: BaseChatModel
+    limiter: RateLimiter
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_cap: float = 20.0
+    completion_tokens: int = 256  # Charged up front, corrected with the reported usage
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    def _prompt_tokens(self, messages: List[BaseMessage]) -> int:
+        return sum(estimate_tokens(message.content) for message in messages)
+
+    def _used_tokens(self, prompt_tokens: int, result: ChatResult) -> int:
+        """Reported total tokens, or the prompt plus the reply's estimated tokens"""
+        return _total_tokens(result) or prompt_tokens + estimate_tokens(result.generations[0].message.content)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retrying, or re-raise the error if it should not be retried"""
+        if attempt >= self.max_retries or retryable_status(error) is None:
+            raise error
+        return retry_delay(attempt, self.backoff_base, self.backoff_cap, retry_after(error))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt_tokens, priority = self._prompt_tokens(messages), _run_priority(run_manager)
+        estimate = prompt_tokens + self.completion_tokens
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(estimate, priority)
+            try:
+                result = self.inner._generate(messages, stop=stop, **kwargs)
+            except Exception as error:
+                self.limiter.release(estimate, 0)
+                time.sleep(self._backoff(attempt, error))
+                continue
+            self.limiter.release(estimate, self._used_tokens(prompt_tokens, result))
+            return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        prompt_tokens, priority = self._prompt_tokens(messages), _run_priority(run_manager)
+        estimate = prompt_tokens + self.completion_tokens
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire(estimate, priority)
+            try:
+                result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+            except Exception as error:
+                self.limiter.release(estimate, 0)
+                await asyncio.sleep(self._backoff(attempt, error))
+                continue
+            self.limiter.release(estimate, self._used_tokens(prompt_tokens, result))
+            return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        prompt_tokens, priority = self._prompt_tokens(messages), _run_priority(run_manager)
+        estimate = prompt_tokens + self.completion_tokens
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(estimate, priority)
+            received = []
+            try:
+                for chunk in _model_stream(self.inner, messages, stop, **kwargs):
+                    received.append(chunk.message.content)
+                    yield chunk
+                return
+            except Exception as error:
+                if received:
+                    raise
+                delay = self._backoff(attempt, error)
+            finally:
+                # Charge what was streamed, even if the caller stopped reading early
+                self.limiter.release(estimate, prompt_tokens + estimate_tokens("".join(received)) if received else 0)
+            time.sleep(delay)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        prompt_tokens, priority = self._prompt_tokens(messages), _run_priority(run_manager)
+        estimate = prompt_tokens + self.completion_tokens
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire(estimate, priority)
+            received = []
+            try:
+                async for chunk in _model_astream(self.inner, messages, stop, **kwargs):
+                    received.append(chunk.message.content)
+                    yield chunk
+                return
+            except Exception as error:
+                if received:
+                    raise
+                delay = self._backoff(attempt, error)
+            finally:
+                # Charge what was streamed, even if the caller stopped reading early
+                self.limiter.release(estimate, prompt_tokens + estimate_tokens("".join(received)) if received else 0)
+            await asyncio.sleep(delay)
+
+class CachedChatModel(BaseChatModel):
+    """Serve another model's replies from a response cache (llm_cache.ResponseCache)
+
+    LangChain 0.1 only accepts a bool for a model's own cache field and never
+    consults a cache when streaming, so the lookup and write-back happen here,
+    for invoke and stream alike. A hit is streamed as one chunk; a streamed
+    reply is stored once it has finished. Wrapped around RateLimitedChatModel,
+    hits never wait for the limiter.
+    """
+
+    inner: BaseChatModel
+    response_cache: BaseCache
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    def _cache_key(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> tuple:
+        return dumps(messages), self._get_llm_string(stop=stop, **kwargs)
+
+    def _lookup(self, key: tuple) -> Optional[ChatResult]:
+        generations = self.response_cache.lookup(*key)
+        return ChatResult(generations=list(generations)) if generations else None
+
+    def _store(self, key: tuple, content: str) -> None:
+        self.response_cache.update(*key, [ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = self._cache_key(messages, stop, **kwargs)
+        result = self._lookup(key)
+        if result is None:
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self._store(key, result.generations[0].message.content)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        key = self._cache_key(messages, stop, **kwargs)
+        result = self._lookup(key)
+        if result is None:
+            result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self._store(key, result.generations[0].message.content)
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        key = self._cache_key(messages, stop, **kwargs)
+        result = self._lookup(key)
+        if result is not None:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+            return
+        content = []
+        for chunk in _model_stream(self.inner, messages, stop, run_manager=run_manager, **kwargs):
+            content.append(chunk.message.content)
+            yield chunk
+        self._store(key, "".join(content))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        key = self._cache_key(messages, stop, **kwargs)
+        result = self._lookup(key)
+        if result is not None:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+            return
+        content = []
+        async for chunk in _model_astream(self.inner, messages, stop, run_manager=run_manager, **kwargs):
+            content.append(chunk.message.content)
+            yield chunk
+        self._store(key, "".join(content))
+
+def rate_limited(model: BaseChatModel, limiter: Optional[RateLimiter] = None, **options) -> RateLimitedChatModel:
+    """Wrap a model so its requests share the process-wide limiter (or the one given)"""
+    return RateLimitedChatModel(
+        inner=model,
+        limiter=limiter or get_rate_limiter(),
+        max_retries=int(options.get("max_retries", os.environ.get("LLM_MAX_RETRIES", 4))),
+    )
+
+def build_groq(**options) -> BaseChatModel:
+    """Groq-hosted model (needs GROQ_API_KEY)"""
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model=options.get("model", os.environ.get("GROQ_MODEL", "llama3-70b-8192")),
+        temperature=options.get("temperature", 0.7),
+        api_key=options.get("api_key", os.environ.get("GROQ_API_KEY", "")),
+        max_retries=options.get("max_retries", 2),
+    )
+
+def build_http(**options) -> BaseChatModel:
+    """OpenAI-compatible endpoint at LLM_HTTP_BASE_URL (default: Groq's)"""
+    return HTTPChatModel(
+        base_url=options.get("base_url", os.environ.get("LLM_HTTP_BASE_URL", "https://api.groq.com/openai/v1")),
+        model=options.get("model", os.environ.get("LLM_HTTP_MODEL", os.environ.get("GROQ_MODEL", "llama3-70b-8192"))),
+        api_key=options.get("api_key", os.environ.get("LLM_HTTP_API_KEY", os.environ.get("GROQ_API_KEY", ""))),
+        temperature=options.get("temperature", 0.7),
+        max_connections=int(options.get("max_connections", os.environ.get("LLM_MAX_CONNECTIONS", 8))),
+    )
+
+def build_stub(**options) -> BaseChatModel:
+    """Deterministic local model with configurable latency"""
+    return StubChatModel(
+        latency=float(options.get("latency", os.environ.get("LLM_STUB_LATENCY", 0.0))),
+        tokens_per_second=float(options.get("tokens_per_second", os.environ.get("LLM_STUB_TOKENS_PER_SEC", 0.0))),
+    )
+
+def build_replay(**options) -> BaseChatModel:
+    """Record replies from LLM_REPLAY_INNER, or replay them from LLM_REPLAY_PATH"""
+    mode = options.get("mode", os.environ.get("LLM_REPLAY_MODE", "replay"))
+    inner = None
+    if mode == "record":
+        # The recorded backend's own retries follow max_retries, as its builder's would
+        retries = {"max_retries": options["max_retries"]} if "max_retries" in options else {}
+        inner = LLM_BACKENDS[options.get("inner", os.environ.get("LLM_REPLAY_INNER", "groq"))](**retries)
+    return RecordReplayChatModel(
+        path=options.get("path", os.environ.get("LLM_REPLAY_PATH", "llm_recordings.jsonl")),
+        mode=mode,
+        inner=inner,
+    )
+
+# Backend factories by name, selected with LLM_BACKEND
+LLM_BACKENDS: Dict[str, Callable[..., BaseChatModel]] = {
+    "groq": build_groq,
+    "http": build_http,
+    "stub": build_stub,
+    "replay": build_replay,
+}
+
+def register_backend(name: str, factory: Callable[..., BaseChatModel]) -> None:
+    """Make another backend selectable by name"""
+    LLM_BACKENDS[name] = factory
+
+_llm: Optional[BaseChatModel] = None
+_llm_lock = threading.RLock()
+
+def configure_llm(backend: Optional[str] = None, cache: Optional[BaseCache] = None, **options) -> BaseChatModel:
+    """Build the shared model from a backend name (default: LLM_BACKEND, then groq)
+
+    Unless LLM_RATE_LIMIT=off the model is wrapped in RateLimitedChatModel,
+    which then owns the retries: the backend is built with max_retries=0,
+    which switches off groq's client retries, including when groq is the
+    backend a replay recording wraps. The stub, http and replay backends never
+    retry on their own. A response cache wraps the result in CachedChatModel.
+    """
+    global _llm
+    backend = backend or os.environ.get("LLM_BACKEND", "groq")
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM backend {backend!r}; choose from {sorted(LLM_BACKENDS)}")
+    if os.environ.get("LLM_RATE_LIMIT", "on") == "off":
+        model = LLM_BACKENDS[backend](**options)
+    else:
+        model = rate_limited(LLM_BACKENDS[backend](**dict(options, max_retries=0)))
+    if cache is not None:
+        model = CachedChatModel(inner=model, response_cache=cache)
+    with _llm_lock:
+        _llm = model
+    return model
+
+def set_llm(model: Optional[BaseChatModel]) -> None:
+    """Install an explicit model, or None to rebuild from config on next use"""
+    global _llm
+    with _llm_lock:
+        _llm = model
+
+def get_llm(**options) -> BaseChatModel:
+    """Return the shared model, creating it on first use"""
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                configure_llm(**options)
+    return _llm
+
+def supports_async(model: BaseChatModel) -> bool:
+    """Whether a model has native async calls rather than the thread-pool fallback"""
+    if isinstance(model, (CachedChatModel, RateLimitedChatModel)):
+        return supports_async(model.inner)
+    return type(model)._agenerate is not BaseChatModel._agenerate
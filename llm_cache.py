@@ -0,0 +1,189 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+# Cached value for one LLM call
+CachedGenerations = Sequence[Generation]
+
+_whitespace = re.compile(r"\s+")
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return _whitespace.sub(" ", prompt).strip()
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Key a response by the normalized prompt and the model parameters"""
+    digest = hashlib.sha256()
+    digest.update(normalize_prompt(prompt).encode())
+    digest.update(b"\0")
+    digest.update(llm_string.encode())
+    return digest.hexdigest()
+
+class ResponseCache(BaseCache):
+    """Two-tier LLM response cache: an in-memory LRU in front of SQLite
+
+    With variants=1 every identical prompt is served the first response.
+    With variants=k the first k calls for a prompt go to the model and are
+    all stored; after that the k variants are served round-robin, so replies
+    keep some of the variety of a non-zero temperature.
+
+    The SQLite row count is kept in memory. Once it passes max_rows, expired
+    rows are deleted, then the oldest, down to nine tenths of max_rows, so
+    eviction runs once per max_rows / 10 writes rather than on every write.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = ".llm_cache.sqlite",
+        memory_entries: int = 1024,
+        ttl: Optional[float] = 24 * 60 * 60,
+        max_rows: int = 10000,
+        variants: int = 1,
+    ):
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.variants = max(1, variants)
+
+        # key -> list of (created_at, generations) variants
+        self._memory: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        self._next_variant: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT NOT NULL, variant INTEGER NOT NULL, created_at REAL NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (key, variant))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+            self._db.commit()
+            (self._rows,) = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+
+    def _is_fresh(self, created_at: float, now: float) -> bool:
+        return self.ttl is None or now - created_at < self.ttl
+
+    def _remember(self, key: str, variants: List[tuple]) -> None:
+        """Store variants in the memory tier, evicting the least recently used key"""
+        self._memory[key] = variants
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            evicted, _ = self._memory.popitem(last=False)
+            self._next_variant.pop(evicted, None)
+
+    def _load_variants(self, key: str, now: float) -> List[tuple]:
+        """Fetch the fresh variants for a key, from memory first and then disk"""
+        variants = self._memory.get(key)
+        if variants is not None:
+            variants = [variant for variant in variants if self._is_fresh(variant[0], now)]
+            if variants:
+                self._memory.move_to_end(key)
+                return variants
+            del self._memory[key]
+
+        if self._db is None:
+            return []
+        rows = self._db.execute(
+            "SELECT created_at, value FROM responses WHERE key = ? ORDER BY variant", (key,)
+        ).fetchall()
+        variants = [(created_at, loads(value)) for created_at, value in rows if self._is_fresh(created_at, now)]
+        if len(variants) < len(rows):
+            self._rows -= self._db.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount
+            self._db.commit()
+            variants = []
+        if variants:
+            self._remember(key, variants)
+        return variants
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[CachedGenerations]:
+        """Return a cached response, or None if the model should be called"""
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            in_memory = key in self._memory
+            variants = self._load_variants(key, now)
+
+            # Keep sampling the model until all variants have been collected
+            if len(variants) < self.variants:
+                self.misses += 1
+                return None
+
+            index = self._next_variant.get(key, 0) % len(variants)
+            self._next_variant[key] = index + 1
+            self.hits += 1
+            if in_memory:
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            return variants[index][1]
+
+    def update(self, prompt: str, llm_string: str, return_val: CachedGenerations) -> None:
+        """Store a fresh model response as another variant for the prompt"""
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            # From disk too: a key evicted from memory may still have variants stored
+            variants = list(self._load_variants(key, now))
+            if len(variants) >= self.variants:
+                return
+            variants.append((now, list(return_val)))
+            self._remember(key, variants)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, variant, created_at, value) VALUES (?, ?, ?, ?)",
+                    (key, len(variants) - 1, now, dumps(list(return_val))),
+                )
+                self._rows += 1
+                if self._rows > self.max_rows:
+                    self._evict()
+                self._db.commit()
+
+    def _evict(self) -> None:
+        """Drop expired rows, then the oldest rows, down to nine tenths of max_rows"""
+        if self.ttl is not None:
+            self._rows -= self._db.execute(
+                "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+        target = self.max_rows - self.max_rows // 10
+        if self._rows > target:
+            self._rows -= self._db.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses ORDER BY created_at LIMIT ?)",
+                (self._rows - target,),
+            ).rowcount
+
+    def clear(self, **kwargs) -> None:
+        """Empty both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._next_variant.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+                self._rows = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for monitoring"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "memory_entries": len(self._memory),
+        }
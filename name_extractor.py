@@ -0,0 +1,141 @@
+import re
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+class NameMatch(NamedTuple):
+    """An agent name found in a message"""
+    name: str
+    confidence: float
+    start: int
+
+# Words that follow "I'm", "this is", etc. without being a name
+NAME_BLOCKLIST = frozenset("""
+    a able about afraid agent alright also an and are as at available back calling certainly
+    checking coverage customer department doing fine for from glad going good great happy
+    he help her here hi his how i in just let looking member more my new not now of off ok okay
+    on one only our pleased please ready really representative right she so sorry speaking
+    support sure team thank thanks that the their there they this to today very we welcome
+    what with yes you your
+""".split())
+
+HONORIFICS = frozenset(["Dr", "Mr", "Mrs", "Ms", "Mx", "Miss"])
+
+# One name token: letters, with inner apostrophes or hyphens (O'Brien, Jean-Luc)
+_NAME_TOKEN = r"[A-Za-z][A-Za-z'\-]*[A-Za-z]"
+# Honorifics are skipped over (Dr. Ramirez)
+_HONORIFIC = r"(?:(?:Dr|Mr|Mrs|Ms|Mx|Miss)\.?[ \t]+)?"
+# Further capitalized tokens make a multi-word name (Mary Ann Smith)
+_NAME = rf"{_HONORIFIC}{_NAME_TOKEN}(?:[ \t]+[A-Z][A-Za-z'\-]*[A-Za-z]){{0,2}}"
+
+# Self-introduction phrases that come before the name, and the confidence each gives.
+# They are matched against the lowercased message, which keeps the regex case-sensitive and fast.
+_INTRODUCTIONS = [
+    (r"my name is|my name's|name is|name's", 0.95),
+    (r"you(?:'re| are) (?:speaking|talking|chatting) (?:with|to)|you've reached|call me", 0.85),
+    (r"i am|i'm|im", 0.6),
+    (r"this is", 0.55),
+]
+
+INTRODUCTION_PATTERN = re.compile(r"\b(?:{})\s+".format(
+    "|".join(f"(?P<intro{index}>{phrase})" for index, (phrase, _) in enumerate(_INTRODUCTIONS))
+))
+_INTRODUCTION_CONFIDENCE = {f"intro{index}": confidence for index, (_, confidence) in enumerate(_INTRODUCTIONS)}
+
+# The name itself, matched on the original message right after the introduction
+NAME_PATTERN = re.compile(_NAME)
+# "This is Taylor speaking" is more certain than a bare "This is Taylor"
+SPEAKING_PATTERN = re.compile(r"\s+(?:speaking|here)\b")
+# Names that come before "speaking" or "here" ("Alex here", "Casey speaking")
+TRAILING_NAME_PATTERN = re.compile(
+    r"\b(?P<name>[A-Z][A-Za-z'\-]*[A-Za-z](?:[ \t]+[A-Z][A-Za-z'\-]*[A-Za-z]){0,2})\s+(?i:speaking|here)\b"
+)
+TRAILING_NAME_CONFIDENCE = 0.8
+SPEAKING_CONFIDENCE = 0.9
+
+def _clean_name(raw: str, trim_leading: bool = False) -> Optional[str]:
+    """Trim blocklisted trailing words and normalize casing, or reject the candidate"""
+    tokens = [token for token in raw.split() if token.rstrip(".") not in HONORIFICS]
+    if trim_leading:
+        # "Hi Alex here": the name is whatever precedes "here"
+        while tokens and tokens[0].lower() in NAME_BLOCKLIST:
+            tokens.pop(0)
+    if not tokens or tokens[0].lower() in NAME_BLOCKLIST:
+        return None
+    kept = [tokens[0]]
+    for token in tokens[1:]:
+        if token.lower() in NAME_BLOCKLIST:
+            break
+        kept.append(token)
+    # Keep the agent's own casing; capitalize names typed all in lowercase
+    return " ".join(token if token != token.lower() else token.capitalize() for token in kept)
+
+def _lowercase_same_length(message: str) -> str:
+    """Lowercase without shifting character offsets"""
+    lowered = message.lower()
+    if len(lowered) == len(message):
+        return lowered
+    # A few characters (e.g. "İ") grow when lowercased
+    return "".join(char if len(char.lower()) != 1 else char.lower() for char in message)
+
+def extract_name(message: str) -> Optional[NameMatch]:
+    """Return the most confident agent name introduced in the message, if any"""
+    best = None
+    lowered = _lowercase_same_length(message)
+    candidates = []
+    
+    for found in INTRODUCTION_PATTERN.finditer(lowered):
+        name_found = NAME_PATTERN.match(message, found.end())
+        if name_found is None:
+            continue
+        confidence = _INTRODUCTION_CONFIDENCE[found.lastgroup]
+        if found.lastgroup == "intro3" and SPEAKING_PATTERN.match(lowered, name_found.end()):
+            confidence = SPEAKING_CONFIDENCE
+        candidates.append((name_found.group(), name_found.start(), confidence, False))
+    
+    if "speaking" in lowered or "here" in lowered:
+        for found in TRAILING_NAME_PATTERN.finditer(message):
+            candidates.append((found.group("name"), found.start("name"), TRAILING_NAME_CONFIDENCE, True))
+    
+    for raw, start, confidence, trim_leading in candidates:
+        name = _clean_name(raw, trim_leading)
+        if name is None:
+            continue
+        if raw[0].islower():
+            confidence -= 0.1  # Lowercase names are less certain
+        if best is None or confidence > best.confidence:
+            start += raw.lower().index(name.split()[0].lower())
+            best = NameMatch(name, round(confidence, 2), start)
+    return best
+
+# Transcripts repeat canned greetings heavily, so batch extraction memoizes by message
+_extract_cached = lru_cache(maxsize=65536)(extract_name)
+
+def _extract_chunk(messages: List[str]) -> List[Optional[NameMatch]]:
+    return [_extract_cached(message) for message in messages]
+
+def extract_names(messages: Iterable[str], processes: Optional[int] = None, chunksize: int = 5000) -> Iterator[Optional[NameMatch]]:
+    """Extract names from many messages, in order
+
+    Messages are read lazily in chunks, so this can stream millions of
+    historical transcript lines. Repeated messages are served from a memo.
+    With processes > 1 the chunks are spread over a process pool.
+    """
+    def chunks():
+        chunk = []
+        for message in messages:
+            chunk.append(message)
+            if len(chunk) == chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    if processes is None or processes <= 1:
+        for chunk in chunks():
+            yield from _extract_chunk(chunk)
+        return
+
+    with Pool(processes) as pool:
+        for results in pool.imap(_extract_chunk, chunks()):
+            yield from results
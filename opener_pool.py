@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+class OpenerPool:
+    """Conversation openings generated ahead of time and refilled in the background
+
+    An opener is the state of a conversation after the bot has answered the
+    agent's canned greeting. A background thread keeps up to size of them,
+    generating at most refill_per_minute, and drops any older than max_age
+    seconds so new conversations don't all start from stale replies. take()
+    hands out the oldest fresh opener, or generates one on the spot when the
+    pool is empty (or size is 0).
+    """
+
+    def __init__(self, generate: Callable[[], Dict], size: int = 8, refill_per_minute: float = 60.0,
+                 max_age: float = 60 * 60):
+        self.generate = generate
+        self.size = size
+        self.refill_per_minute = refill_per_minute
+        self.max_age = max_age
+        # (created, opener), oldest first
+        self._openers: Deque[Tuple[float, Dict]] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.generated = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, generate: Callable[[], Dict]) -> "OpenerPool":
+        return cls(
+            generate,
+            size=int(os.environ.get("OPENER_POOL_SIZE", 8)),
+            refill_per_minute=float(os.environ.get("OPENER_REFILL_PER_MINUTE", 60)),
+            max_age=float(os.environ.get("OPENER_MAX_AGE", 60 * 60)),
+        )
+
+    def start(self) -> "OpenerPool":
+        """Start filling the pool in a background thread"""
+        if self.size > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._refill, name="opener-pool", daemon=True)
+            self._thread.start()
+        return self
+
+    def take(self) -> Dict:
+        """A fresh opener for a new conversation; the caller owns the returned state"""
+        with self._lock:
+            self._expire()
+            opener = self._openers.popleft()[1] if self._openers else None
+            if opener is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._wake.set()
+        return self.generate() if opener is None else opener
+
+    def close(self) -> None:
+        self._closed.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _expire(self) -> None:
+        """Drop openers older than max_age; the caller holds the lock"""
+        cutoff = time.monotonic() - self.max_age
+        while self._openers and self._openers[0][0] < cutoff:
+            self._openers.popleft()
+            self.expired += 1
+
+    def _refill(self) -> None:
+        interval = 60 / self.refill_per_minute if self.refill_per_minute > 0 else 0
+        while not self._closed.is_set():
+            self._wake.clear()
+            with self._lock:
+                self._expire()
+                full = len(self._openers) >= self.size
+                oldest = self._openers[0][0] if self._openers else None
+            if full:
+                # Sleep until an opener is taken or the oldest one goes stale
+                self._wake.wait(oldest + self.max_age - time.monotonic())
+                continue
+            delay = interval
+            try:
+                opener = self.generate()
+            except Exception:
+                # e.g. the provider is rate limiting; sessions generate their own meanwhile
+                with self._lock:
+                    self.failures += 1
+                delay = max(interval, 1.0)
+            else:
+                with self._lock:
+                    self._openers.append((time.monotonic(), opener))
+                    self.generated += 1
+            self._closed.wait(delay)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            taken = self.hits + self.misses
+            return {
+                "pooled": len(self._openers),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / taken if taken else 0.0,
+                "expired": self.expired,
+                "generated": self.generated,
+                "failures": self.failures,
+            }
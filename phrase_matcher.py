@@ -0,0 +1,119 @@
+import re
+from typing import Dict, FrozenSet, Iterable, Optional
+
+# Phrases the agent uses for each signal the state detectors care about
+DETECTOR_PHRASES: Dict[str, Iterable[str]] = {
+    "queue_correct": ["coverage", "right queue", "correct queue", "help with coverage", "assist with coverage"],
+    "queue_wrong": ["wrong queue", "incorrect queue", "transfer you", "different department"],
+    "authenticated": ["authenticated", "verified", "confirmed your identity", "identity is confirmed",
+                      "identity has been confirmed", "identity confirmed", "thank you for the information"],
+    "plan_active": ["active"],
+    "plan_inactive": ["inactive", "expired"],
+}
+
+# What a signal turns into when the phrase is negated ("not active", "isn't verified");
+# None means the negated phrase carries no signal
+NEGATED_SIGNALS: Dict[str, Optional[str]] = {
+    "queue_correct": "queue_wrong",
+    "queue_wrong": None,
+    "authenticated": None,
+    "plan_active": "plan_inactive",
+    "plan_inactive": None,
+}
+
+# Words that negate a phrase shortly after them ("not active", "haven't been verified")
+NEGATION_WORDS = [
+    "not", "never", "no longer", "cannot", "ain't", "aren't", "can't", "couldn't", "didn't", "doesn't", "don't",
+    "hadn't", "hasn't", "haven't", "isn't", "mustn't", "needn't", "shouldn't", "wasn't", "weren't", "won't",
+    "wouldn't",
+]
+
+# Words that make the rest of their clause hypothetical ("let me check if it's active")
+CONDITIONAL_WORDS = ["if", "whether"]
+
+# How many words may sit between a negation and the phrase it negates
+NEGATION_WINDOW = 2
+
+# Punctuation that ends a clause, and with it the scope of a negation or conditional
+CLAUSE_END = re.compile(r"[.,;:!?]")
+
+def alternation(words: Iterable[str]) -> str:
+    """A regex alternation of words, factored into a trie so the regex engine never backtracks over a shared prefix"""
+    tree: Dict[str, Dict] = {}
+    for word in words:
+        node = tree
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if "" in node:
+            return "(?:{})?".format("|".join(branches))
+        return branches[0] if len(branches) == 1 else "(?:{})".format("|".join(branches))
+
+    return emit(tree)
+
+class PhraseMatcher:
+    """Classify a message against every detector's phrase set in one regex pass
+
+    All phrases, negation and conditional words are compiled into a single
+    alternation with word boundaries, so "inactive" no longer matches
+    "active" and "overage" no longer matches "coverage". A negation word at
+    most NEGATION_WINDOW words before a phrase in the same clause maps its
+    signal through NEGATED_SIGNALS, and negates only that phrase. A phrase
+    after a conditional word in the same clause gives no signal.
+    """
+
+    def __init__(self, phrases: Dict[str, Iterable[str]], negated: Dict[str, Optional[str]]):
+        self.signal_for_phrase: Dict[str, str] = {}
+        for signal, signal_phrases in phrases.items():
+            for phrase in signal_phrases:
+                self.signal_for_phrase[phrase.lower()] = signal
+        self.negated = negated
+
+        # The trie makes the longest phrase win, so "help with coverage" beats "coverage".
+        # A lookbehind rather than a leading \b lets the engine skip ahead on the first letters.
+        self.pattern = re.compile(
+            r"(?<![\w'])(?:(?P<negation>{})|(?P<conditional>{})|(?P<phrase>{}))\b".format(
+                alternation(NEGATION_WORDS),
+                alternation(CONDITIONAL_WORDS),
+                alternation(self.signal_for_phrase),
+            )
+        )
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Return the set of signals found in the text"""
+        text = text.lower().replace("\u2019", "'")
+        signals = set()
+        negation_end = conditional_end = None
+        for found in self.pattern.finditer(text):
+            kind = found.lastgroup
+            if kind == "negation":
+                negation_end = found.end()
+                continue
+            if kind == "conditional":
+                conditional_end = found.end()
+                continue
+            signal = self.signal_for_phrase[found.group()]
+            if conditional_end is not None:
+                if not CLAUSE_END.search(text, conditional_end, found.start()):
+                    continue
+                conditional_end = None
+            if negation_end is not None:
+                gap = text[negation_end:found.start()]
+                if len(gap.split()) <= NEGATION_WINDOW and not CLAUSE_END.search(gap):
+                    signal = self.negated.get(signal)
+                negation_end = None
+            if signal is not None:
+                signals.add(signal)
+        return frozenset(signals)
+
+# Built once at import and shared by all detectors
+PHRASE_MATCHER = PhraseMatcher(DETECTOR_PHRASES, NEGATED_SIGNALS)
+
+def classify_message(text: str) -> FrozenSet[str]:
+    """Return the detector signals present in an agent message"""
+    return PHRASE_MATCHER.match(text)
@@ -0,0 +1,196 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Request priorities, lowest value first: conversations already under way beat
+# new greetings, and both beat speculative pre-generation
+PRIORITY_ACTIVE = 0
+PRIORITY_NEW = 1
+PRIORITY_BACKGROUND = 2
+
+class TokenBucket:
+    """Refills at per_minute / 60 units a second up to burst; per_minute 0 means unlimited"""
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.rate:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (amounts over capacity wait for a full bucket)"""
+        if not self.rate:
+            return 0.0
+        return max(0.0, min(amount, self.capacity) - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        if self.rate:
+            self.level -= amount
+
+class RateLimiter:
+    """Admits LLM requests within requests/min, tokens/min and a concurrency bound
+
+    Waiting requests are granted strictly in priority order, then arrival
+    order. A background thread hands out grants as the buckets refill, so
+    sync callers (threads) and async callers (any event loop) share one queue.
+    Token usage is charged up front from an estimate and corrected with
+    the actual count on release.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_concurrency: int = 8,
+                 request_burst: Optional[float] = None, token_burst: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute, request_burst)
+        self.tokens = TokenBucket(tokens_per_minute, token_burst)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._queue: List[list] = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self.granted = 0
+        self.wait_seconds = 0.0
+        self.max_queued = 0
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            requests_per_minute=float(os.environ.get("LLM_REQUESTS_PER_MINUTE", 0)),
+            tokens_per_minute=float(os.environ.get("LLM_TOKENS_PER_MINUTE", 0)),
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 8)),
+        )
+
+    def _enqueue(self, tokens: float, priority: int, grant: Callable[[], None]) -> list:
+        waiter = [priority, next(self._sequence), tokens, grant]
+        with self._cond:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch_forever, name="rate-limiter", daemon=True)
+                self._dispatcher.start()
+            heapq.heappush(self._queue, waiter)
+            self.max_queued = max(self.max_queued, len(self._queue))
+            self._cond.notify()
+        return waiter
+
+    def _dispatch_forever(self) -> None:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                timeout = None
+                while self._queue and self.in_flight < self.max_concurrency:
+                    _, _, tokens, grant = self._queue[0]
+                    delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if delay > 0:
+                        timeout = delay
+                        break
+                    heapq.heappop(self._queue)
+                    try:
+                        grant()
+                    except Exception:
+                        # The waiter is gone (e.g. its event loop was closed); the dispatcher carries on
+                        continue
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    self.in_flight += 1
+                    self.granted += 1
+                self._cond.wait(timeout)
+
+    def acquire(self, tokens: float, priority: int = PRIORITY_ACTIVE) -> None:
+        """Block the calling thread until the request may be sent"""
+        granted = threading.Event()
+        start = time.monotonic()
+        self._enqueue(tokens, priority, granted.set)
+        granted.wait()
+        with self._cond:
+            self.wait_seconds += time.monotonic() - start
+
+    async def aacquire(self, tokens: float, priority: int = PRIORITY_ACTIVE) -> None:
+        """Wait without blocking the event loop until the request may be sent"""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def grant() -> None:
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        start = time.monotonic()
+        waiter = self._enqueue(tokens, priority, grant)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._cond:
+                if waiter in self._queue:
+                    self._queue.remove(waiter)
+                    heapq.heapify(self._queue)
+                    raise
+            # Granted just as we were cancelled: hand the slot back
+            self.release(tokens, 0)
+            raise
+        with self._cond:
+            self.wait_seconds += time.monotonic() - start
+
+    def release(self, estimated_tokens: float, actual_tokens: Optional[float] = None) -> None:
+        """Finish a request, correcting the token charge if the actual usage is known"""
+        with self._cond:
+            self.in_flight -= 1
+            if actual_tokens is not None:
+                self.tokens.take(actual_tokens - estimated_tokens)
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "granted": self.granted,
+                "queued": len(self._queue),
+                "max_queued": self.max_queued,
+                "in_flight": self.in_flight,
+                "mean_wait_seconds": self.wait_seconds / self.granted if self.granted else 0.0,
+            }
+
+def retry_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter, never shorter than a server's Retry-After"""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+def provider_status(error: BaseException) -> Optional[int]:
+    """The HTTP status an LLM provider answered with, if the error carries one"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def retryable_status(error: BaseException) -> Optional[int]:
+    """The HTTP status behind an error if it is worth retrying (429 or 5xx), else None"""
+    status = provider_status(error)
+    if status == 429 or status is not None and 500 <= status < 600:
+        return status
+    return None
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's response, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """The process-wide limiter every session's LLM requests go through"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_env()
+    return _limiter
@@ -1,17 +1,55 @@
-
-import streamlit as st
+import argparse
 import os
 import sys
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Check if GROQ_API_KEY is set
-if not os.environ.get("GROQ_API_KEY"):
+parser = argparse.ArgumentParser(description="Run the Customer Support Bot Simulator")
+parser.add_argument("--skip-warmup", action="store_true", help="Start the server without the preflight warm-up")
+parser.add_argument("--headless", action="store_true",
+                    help="Serve the HTTP/WebSocket API (server.py) on SERVER_HOST:SERVER_PORT instead of the app")
+parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVER_WORKERS", 1)),
+                    help="With --headless, run this many worker processes behind the supervisor (supervisor.py)")
+# Any other arguments are passed through to streamlit run
+args, streamlit_args = parser.parse_known_args()
+
+# Check if GROQ_API_KEY is set when the Groq backend is used
+if os.environ.get("LLM_BACKEND", "groq") == "groq" and not os.environ.get("GROQ_API_KEY"):
     print("Error: GROQ_API_KEY environment variable is not set.")
     print("Please add your Groq API key to the .env file or set it as an environment variable.")
+    print("To run offline, set LLM_BACKEND=stub.")
     sys.exit(1)
 
-# Run the Streamlit application
-os.system("streamlit run app.py")
+# Preflight: import the bot, compile the graph, create the LLM client and answer the
+# opening greeting once (filling the response cache) before the server takes traffic.
+# Streamlit runs in this same process below, so the app reuses all of it; supervised
+# workers are separate processes and warm themselves up. The headless server skips the
+# greeting: it runs turns on its own event loop, and the shared async client shouldn't
+# have connections open on the background loop that synchronous turns use.
+supervised = args.headless and args.workers > 1
+if not args.skip_warmup and not supervised:
+    start = time.perf_counter()
+    import bot_agent
+    bot_agent.warm_up()
+    if not args.headless:
+        bot_agent.handle_agent_input(bot_agent.GREETING)
+    print(f"Preflight warm-up finished in {time.perf_counter() - start:.2f}s")
+
+if supervised:
+    import supervisor
+    supervisor.serve(args.workers, os.environ.get("SERVER_HOST", "127.0.0.1"), int(os.environ.get("SERVER_PORT", 8080)))
+    sys.exit(0)
+
+if args.headless:
+    import server
+    server.serve(os.environ.get("SERVER_HOST", "127.0.0.1"), int(os.environ.get("SERVER_PORT", 8080)))
+    sys.exit(0)
+
+# Run the Streamlit application in-process
+from streamlit.web import cli as stcli
+
+sys.argv = ["streamlit", "run", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")] + streamlit_args
+sys.exit(stcli.main())
@@ -0,0 +1,396 @@
+"""Headless HTTP/WebSocket server for the customer bot.
+
+Endpoints:
+    POST /conversations                   start a conversation -> {"conversation_id", "state"}; the
+                                          body may pick the id: {"conversation_id": "..."}
+    POST /conversations/{id}/turns        {"message": "..."} -> {"reply", "state"}
+    GET  /conversations/{id}              the conversation's current state
+    GET  /conversations/{id}/stream       WebSocket: send {"message": "..."}, receive
+                                          {"type": "token"} frames then {"type": "done", "state"}
+    GET  /healthz                         {"status": "ok" | "draining", ...}
+    GET  /metrics                         Prometheus text (see instrumentation)
+    PUT  /internal/ring                   workers only (WORKER_ID set): {"workers": [...]}, the
+                                          supervisor's hash ring; hands off moved conversations
+
+Turns are admitted through a bounded queue: at most SERVER_MAX_ACTIVE run at
+once, up to SERVER_MAX_QUEUED wait, and the rest get 503 with Retry-After.
+A turn whose LLM provider answers with an error status leaves the
+conversation as it was and gets 503 with Retry-After when the provider is
+rate limiting or overloaded, else 502; any other failure is a 500.
+Live conversations are kept in a SessionManager and checkpointed to the
+checkpoint store after every turn, so any process can resume them. On
+SIGINT/SIGTERM the server stops admitting turns, lets running ones finish
+(up to SERVER_DRAIN_TIMEOUT seconds) and flushes the checkpoint store.
+Under the supervisor (supervisor.py) each worker process runs one of these.
+
+Run it against the stub backend:
+    LLM_BACKEND=stub python server.py --port 8080
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import re
+import uuid
+import weakref
+from typing import Dict, Optional
+
+from aiohttp import WSCloseCode, WSMsgType, web
+
+import bot_agent
+import instrumentation
+from checkpoint_store import get_checkpoint_store
+from hash_ring import HashRing
+from rate_limiter import provider_status, retry_after, retryable_status
+from session_manager import SessionManager
+
+# Longest agent message accepted, in characters
+MAX_MESSAGE_CHARS = 4000
+
+# Conversation ids a client may choose
+CONVERSATION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+class Overloaded(Exception):
+    """A turn was shed by the admission queue"""
+
+class AdmissionQueue:
+    """Bounds the turns in progress; excess turns wait in a bounded queue and the rest are shed
+
+    Turns of new conversations may only queue while fewer than
+    new_queue_limit turns are waiting, so under overload the remaining queue
+    space goes to conversations already under way.
+    """
+
+    def __init__(self, max_active: int = 256, max_queued: int = 1024, new_queue_limit: Optional[int] = None,
+                 queue_timeout: float = 10.0):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.new_queue_limit = max_queued // 2 if new_queue_limit is None else new_queue_limit
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_active)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @classmethod
+    def from_env(cls) -> "AdmissionQueue":
+        return cls(
+            max_active=int(os.environ.get("SERVER_MAX_ACTIVE", 256)),
+            max_queued=int(os.environ.get("SERVER_MAX_QUEUED", 1024)),
+            queue_timeout=float(os.environ.get("SERVER_QUEUE_TIMEOUT", 10)),
+        )
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected += 1
+        instrumentation.count("chatbot_admission_rejected_total", reason=reason)
+        return Overloaded(reason)
+
+    @contextlib.asynccontextmanager
+    async def admit(self, new_conversation: bool = False):
+        """Hold a turn slot for the duration of the block; raises Overloaded if shed"""
+        if self.draining:
+            raise self._reject("draining")
+        if self._slots.locked() and self.waiting >= (self.new_queue_limit if new_conversation else self.max_queued):
+            raise self._reject("queue_full")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout") from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+            if self.active == 0:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop admitting turns and wait for the running ones; False if some were still running"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "queued": self.waiting, "admitted": self.admitted, "rejected": self.rejected}
+
+def public_state(conversation_id: str, state: Dict) -> Dict:
+    """The JSON view of a conversation's state"""
+    return {
+        "conversation_id": conversation_id,
+        "conversation_state": state["conversation_state"] or bot_agent.get_flow().initial_state,
+        "agent_name": state["agent_name"],
+        "member_id": state["member_id"],
+        "correct_queue": state["correct_queue"],
+        "authenticated": state["authenticated"],
+        "plan_status": state["plan_status"],
+        "llm_calls": state.get("llm_calls") or 0,
+        "messages": [{"role": message["role"], "content": message["content"]} for message in state["messages"]],
+    }
+
+class BotServer:
+    """Conversations, admission and routes for one server process"""
+
+    def __init__(self, sessions: Optional[SessionManager] = None, admission: Optional[AdmissionQueue] = None,
+                 drain_timeout: float = 30.0, worker_id: Optional[str] = None):
+        self.sessions = sessions or SessionManager.from_env()
+        self.admission = admission or AdmissionQueue.from_env()
+        self.drain_timeout = drain_timeout
+        self.store = get_checkpoint_store()
+        self.worker_id = worker_id
+        self.ring: Optional[HashRing] = None
+        # One lock per conversation with a turn in flight, so its turns run in order
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._sockets: "weakref.WeakSet[web.WebSocketResponse]" = weakref.WeakSet()
+
+    def _lock(self, conversation_id: str) -> asyncio.Lock:
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = self._locks[conversation_id] = asyncio.Lock()
+        return lock
+
+    def _check_owner(self, conversation_id: str) -> None:
+        """Refuse conversations the supervisor's ring routes to another worker"""
+        if self.ring is not None and self.ring.owner(conversation_id) != self.worker_id:
+            raise web.HTTPMisdirectedRequest(text=f"Conversation {conversation_id} belongs to another worker")
+
+    async def _session(self, conversation_id: str):
+        """The live session, resumed from the checkpoint store if it isn't in memory"""
+        self._check_owner(conversation_id)
+        session = self.sessions.get(conversation_id)
+        if session is None:
+            state = await asyncio.get_running_loop().run_in_executor(None, self.store.load, conversation_id)
+            if state is None:
+                raise web.HTTPNotFound(text=f"Unknown conversation {conversation_id}")
+            session = self.sessions.create(conversation_id)
+            self.sessions.commit(session, state)
+        return session
+
+    @staticmethod
+    async def _message(request: web.Request) -> str:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Expected a JSON body") from None
+        message = body.get("message") if isinstance(body, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            raise web.HTTPBadRequest(text='Expected {"message": "..."}')
+        if len(message) > MAX_MESSAGE_CHARS:
+            raise web.HTTPRequestEntityTooLarge(max_size=MAX_MESSAGE_CHARS, actual_size=len(message))
+        return message
+
+    @staticmethod
+    def _overloaded(error: Overloaded) -> web.HTTPServiceUnavailable:
+        return web.HTTPServiceUnavailable(text=f"Overloaded: {error}", headers={"Retry-After": "1"})
+
+    @staticmethod
+    def _disconnected(request: web.Request, socket: web.WebSocketResponse) -> bool:
+        """Whether a WebSocket client has gone away, so there is no one to send to"""
+        return socket.closed or request.transport is None or request.transport.is_closing()
+
+    @staticmethod
+    def _llm_failed(error: Exception) -> web.HTTPException:
+        """503 with Retry-After if the LLM provider is rate limiting or overloaded, else 502"""
+        status = retryable_status(error)
+        instrumentation.count("chatbot_llm_failures_total", status=str(provider_status(error)))
+        if status in (429, 503):
+            seconds = max(1, round(retry_after(error) or 1))
+            return web.HTTPServiceUnavailable(text=f"LLM unavailable: {error}", headers={"Retry-After": str(seconds)})
+        return web.HTTPBadGateway(text=f"LLM request failed: {error}")
+
+    async def create_conversation(self, request: web.Request) -> web.Response:
+        if self.admission.draining:
+            raise web.HTTPServiceUnavailable(text="Draining", headers={"Retry-After": "1"})
+        conversation_id = uuid.uuid4().hex
+        if request.can_read_body:
+            try:
+                body = await request.json()
+            except ValueError:
+                raise web.HTTPBadRequest(text="Expected a JSON body") from None
+            if isinstance(body, dict) and body.get("conversation_id") is not None:
+                conversation_id = body["conversation_id"]
+                if not isinstance(conversation_id, str) or not CONVERSATION_ID.fullmatch(conversation_id):
+                    raise web.HTTPBadRequest(text="conversation_id must be 1-64 letters, digits, _ or -")
+                self._check_owner(conversation_id)
+                known = self.sessions.get(conversation_id) or await asyncio.get_running_loop().run_in_executor(
+                    None, self.store.load, conversation_id)
+                if known is not None:
+                    raise web.HTTPConflict(text=f"Conversation {conversation_id} already exists")
+        state = bot_agent.new_state()
+        session = self.sessions.create(conversation_id)
+        self.sessions.commit(session, state)
+        await asyncio.get_running_loop().run_in_executor(None, self.store.save, conversation_id, state)
+        return web.json_response({"conversation_id": conversation_id, "state": public_state(conversation_id, state)},
+                                 status=201)
+
+    async def get_conversation(self, request: web.Request) -> web.Response:
+        conversation_id = request.match_info["conversation_id"]
+        session = await self._session(conversation_id)
+        return web.json_response(public_state(conversation_id, self.sessions.to_state(session)))
+
+    async def take_turn(self, request: web.Request) -> web.Response:
+        conversation_id = request.match_info["conversation_id"]
+        message = await self._message(request)
+        async with self._lock(conversation_id):
+            session = await self._session(conversation_id)
+            # The turn appends to its own copy of the log; the session only takes it once the turn succeeds
+            state = self.sessions.to_state(session)
+            state["messages"] = list(state["messages"])
+            try:
+                async with self.admission.admit(new_conversation=not session.log):
+                    state = await bot_agent.ahandle_agent_input(message, state, conversation_id)
+            except Overloaded as error:
+                raise self._overloaded(error) from None
+            except Exception as error:
+                if provider_status(error) is None:
+                    raise
+                raise self._llm_failed(error) from error
+            self.sessions.commit(session, state)
+        last = state["messages"][-1]
+        reply = last["content"] if last["role"] == "bot" else None
+        return web.json_response({"reply": reply, "state": public_state(conversation_id, state)})
+
+    async def stream_turns(self, request: web.Request) -> web.WebSocketResponse:
+        conversation_id = request.match_info["conversation_id"]
+        session = await self._session(conversation_id)
+        socket = web.WebSocketResponse(heartbeat=30)
+        await socket.prepare(request)
+        self._sockets.add(socket)
+        async for frame in socket:
+            if frame.type != WSMsgType.TEXT:
+                continue
+            try:
+                body = frame.json()
+                message = body["message"] if isinstance(body, dict) else None
+            except (ValueError, KeyError):
+                message = None
+            if not isinstance(message, str) or not message.strip() or len(message) > MAX_MESSAGE_CHARS:
+                await socket.send_json({"type": "error", "status": 400, "error": 'Expected {"message": "..."}'})
+                continue
+            async with self._lock(conversation_id):
+                try:
+                    session = await self._session(conversation_id)
+                except web.HTTPMisdirectedRequest as error:
+                    # Handed off to another worker while the socket was open
+                    await socket.send_json({"type": "error", "status": error.status, "error": error.text})
+                    break
+                try:
+                    async with self.admission.admit(new_conversation=not session.log):
+                        stream = bot_agent.stream_agent_input(message, self.sessions.to_state(session))
+                        async for token in stream:
+                            await socket.send_json({"type": "token", "content": token})
+                        state = stream.state
+                        await asyncio.get_running_loop().run_in_executor(None, self.store.save, conversation_id, state)
+                except Overloaded as error:
+                    await socket.send_json({"type": "error", "status": 503, "error": f"Overloaded: {error}"})
+                    continue
+                except Exception as error:
+                    if self._disconnected(request, socket):
+                        # The client went away mid-turn: nothing failed that is worth counting or reporting
+                        break
+                    if provider_status(error) is None:
+                        await socket.close(code=WSCloseCode.INTERNAL_ERROR, message=b"Internal server error")
+                        raise
+                    failure = self._llm_failed(error)
+                    await socket.send_json({"type": "error", "status": failure.status, "error": failure.text})
+                    continue
+                self.sessions.commit(session, state)
+            await socket.send_json({"type": "done", "state": public_state(conversation_id, state)})
+            if self.admission.draining:
+                break
+        await socket.close()
+        return socket
+
+    async def set_ring(self, request: web.Request) -> web.Response:
+        """Adopt the supervisor's ring and hand off the live conversations now owned by another worker
+
+        Each moved conversation is dropped from memory once its turn in
+        flight (if any) finishes, and its checkpoint is flushed, so the new
+        owner resumes it from the store with every turn.
+        """
+        try:
+            body = await request.json()
+            ring = HashRing(body["workers"])
+        except (ValueError, KeyError, TypeError):
+            raise web.HTTPBadRequest(text='Expected {"workers": [...]}') from None
+        self.ring = ring
+        moved = [cid for cid in self.sessions.conversation_ids() if ring.owner(cid) != self.worker_id]
+        for conversation_id in moved:
+            async with self._lock(conversation_id):
+                self.sessions.discard(conversation_id)
+        await asyncio.get_running_loop().run_in_executor(None, self.store.release, moved)
+        return web.json_response({"worker": self.worker_id, "released": len(moved)})
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(
+            self.admission.stats(),
+            status="draining" if self.admission.draining else "ok",
+            live_sessions=self.sessions.stats()["live_sessions"],
+            worker=self.worker_id,
+        ))
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=instrumentation.render_prometheus(), content_type="text/plain")
+
+    async def _drain(self, app: web.Application) -> None:
+        """on_shutdown: finish running turns, then close the idle WebSockets"""
+        drained = await self.admission.drain(self.drain_timeout)
+        if not drained:
+            print(f"Drain timed out with {self.admission.active} turns still running")
+        for socket in list(self._sockets):
+            await socket.close(code=1001, message=b"Server shutting down")
+
+    async def _close_store(self, app: web.Application) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.store.flush)
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/conversations", self.create_conversation),
+            web.get("/conversations/{conversation_id}", self.get_conversation),
+            web.post("/conversations/{conversation_id}/turns", self.take_turn),
+            web.get("/conversations/{conversation_id}/stream", self.stream_turns),
+            web.get("/healthz", self.health),
+            web.get("/metrics", self.metrics),
+        ])
+        if self.worker_id is not None:
+            app.router.add_put("/internal/ring", self.set_ring)
+        app.on_shutdown.append(self._drain)
+        app.on_cleanup.append(self._close_store)
+        return app
+
+def create_app() -> web.Application:
+    """The server application, configured from the environment"""
+    return BotServer(drain_timeout=float(os.environ.get("SERVER_DRAIN_TIMEOUT", 30)),
+                     worker_id=os.environ.get("WORKER_ID")).create_app()
+
+def serve(host: str = "127.0.0.1", port: int = 8080) -> None:
+    """Warm up the bot and serve until SIGINT/SIGTERM, then drain"""
+    bot_agent.warm_up()
+    app = create_app()
+    # Leave aiohttp enough time to wait out the drain before it cancels handlers
+    web.run_app(app, host=host, port=port, shutdown_timeout=float(os.environ.get("SERVER_DRAIN_TIMEOUT", 30)) + 5,
+                print=lambda message: print(message, flush=True))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVER_PORT", 8080)))
+    args = parser.parse_args()
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
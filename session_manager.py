@@ -0,0 +1,202 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Roles are interned so every message shares the same two strings
+AGENT = sys.intern("agent")
+BOT = sys.intern("bot")
+
+class Message:
+    """One chat message; supports message["role"] like the plain dicts the nodes use"""
+    __slots__ = ("role", "content")
+
+    def __init__(self, role: str, content: str):
+        self.role = sys.intern(role)
+        self.content = content
+
+    def __getitem__(self, key: str):
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+class MessageLog(list):
+    """Append-only message log; dict messages are stored as Message records"""
+    __slots__ = ()
+
+    def append(self, message) -> None:
+        if not isinstance(message, Message):
+            message = Message(message["role"], message["content"])
+        super().append(message)
+
+# Compact encodings for the state flags, packed into one int per session
+_TRISTATE = (None, True, False)
+_PLAN_STATUS = (None, "active", "inactive")
+
+def pack_flags(state: Dict) -> int:
+    """Pack correct_queue, authenticated and plan_status into an int"""
+    return (
+        _TRISTATE.index(state["correct_queue"])
+        | _TRISTATE.index(state["authenticated"]) << 2
+        | _PLAN_STATUS.index(state["plan_status"]) << 4
+    )
+
+def unpack_flags(flags: int) -> Dict:
+    return {
+        "correct_queue": _TRISTATE[flags & 0b11],
+        "authenticated": _TRISTATE[flags >> 2 & 0b11],
+        "plan_status": _PLAN_STATUS[flags >> 4 & 0b11],
+    }
+
+class Session:
+    """One conversation: its message log and packed state"""
+    __slots__ = ("conversation_id", "log", "agent_name", "member_id", "flags", "conversation_state", "llm_calls",
+                 "history_summary", "summarized_count", "turns_in_state", "last_seen", "nbytes", "counted")
+
+    def __init__(self, conversation_id: str):
+        self.conversation_id = conversation_id
+        self.log = MessageLog()
+        self.agent_name: Optional[str] = None
+        self.member_id: Optional[str] = None
+        self.flags = 0
+        self.conversation_state: Optional[str] = None  # Interned; None until the first turn
+        self.llm_calls = 0
+        self.history_summary: Optional[str] = None
+        self.summarized_count = 0
+        self.turns_in_state = 0
+        self.last_seen = time.monotonic()
+        self.nbytes = 0
+        self.counted = 0  # Messages already included in nbytes
+
+def _message_size(message: Message) -> int:
+    return sys.getsizeof(message) + sys.getsizeof(message.content)
+
+class SessionManager:
+    """In-process conversation store with idle-TTL and memory-budget eviction
+
+    Sessions are kept in least-recently-used order. Idle sessions older than
+    ttl are dropped, then the least recently used ones until the bytes held
+    fit in memory_budget.
+    """
+
+    def __init__(self, ttl: float = 30 * 60, memory_budget: int = 256 * 1024 * 1024):
+        self.ttl = ttl
+        self.memory_budget = memory_budget
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.bytes_held = 0
+        self.evicted_idle = 0
+        self.evicted_memory = 0
+
+    @classmethod
+    def from_env(cls) -> "SessionManager":
+        return cls(
+            ttl=float(os.environ.get("SESSION_TTL", 30 * 60)),
+            memory_budget=int(os.environ.get("SESSION_MEMORY_BUDGET", 256 * 1024 * 1024)),
+        )
+
+    def create(self, conversation_id: Optional[str] = None) -> Session:
+        """Open a new, empty conversation"""
+        session = Session(conversation_id or uuid.uuid4().hex)
+        self._account(session)
+        with self._lock:
+            self._sessions[session.conversation_id] = session
+        self.evict()
+        return session
+
+    def get(self, conversation_id: Optional[str]) -> Optional[Session]:
+        """Look up a live conversation and mark it as recently used"""
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is not None:
+                session.last_seen = time.monotonic()
+                self._sessions.move_to_end(conversation_id)
+            return session
+
+    def conversation_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions)
+
+    def discard(self, conversation_id: Optional[str]) -> None:
+        with self._lock:
+            session = self._sessions.pop(conversation_id, None)
+            if session is not None:
+                self.bytes_held -= session.nbytes
+
+    def to_state(self, session: Session) -> Dict:
+        """Build the State dict handle_agent_input expects, sharing the session's log"""
+        state = unpack_flags(session.flags)
+        state["messages"] = session.log
+        state["conversation_id"] = session.conversation_id
+        state["conversation_state"] = session.conversation_state
+        state["agent_name"] = session.agent_name
+        state["member_id"] = session.member_id
+        state["llm_calls"] = session.llm_calls
+        state["history_summary"] = session.history_summary
+        state["summarized_count"] = session.summarized_count
+        state["turns_in_state"] = session.turns_in_state
+        return state
+
+    def commit(self, session: Session, state: Dict) -> None:
+        """Store the state returned by a turn back into the session"""
+        with self._lock:
+            messages = state["messages"]
+            if messages is not session.log:
+                for message in messages[len(session.log):]:
+                    session.log.append(message)
+            session.agent_name = state["agent_name"]
+            session.member_id = state["member_id"]
+            session.flags = pack_flags(state)
+            session.conversation_state = sys.intern(state["conversation_state"])
+            session.llm_calls = state.get("llm_calls") or 0
+            session.history_summary = state.get("history_summary")
+            session.summarized_count = state.get("summarized_count") or 0
+            session.turns_in_state = state.get("turns_in_state") or 0
+            session.last_seen = time.monotonic()
+            if session.conversation_id in self._sessions:
+                self._sessions.move_to_end(session.conversation_id)
+                self._account(session)
+        self.evict()
+
+    def _account(self, session: Session) -> None:
+        """Add the size of messages not yet counted to the session and the total"""
+        added = 0
+        if session.counted == 0:
+            added += sys.getsizeof(session) + sys.getsizeof(session.log)
+        for message in session.log[session.counted:]:
+            added += _message_size(message)
+        session.counted = len(session.log)
+        session.nbytes += added
+        self.bytes_held += added
+
+    def evict(self) -> None:
+        """Drop idle sessions, then least recently used ones over the memory budget"""
+        now = time.monotonic()
+        with self._lock:
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if now - oldest.last_seen > self.ttl:
+                    self.discard(oldest.conversation_id)
+                    self.evicted_idle += 1
+                elif self.bytes_held > self.memory_budget and len(self._sessions) > 1:
+                    self.discard(oldest.conversation_id)
+                    self.evicted_memory += 1
+                else:
+                    break
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "live_sessions": len(self._sessions),
+                "bytes_held": self.bytes_held,
+                "messages": sum(len(session.log) for session in self._sessions.values()),
+                "evicted_idle": self.evicted_idle,
+                "evicted_memory": self.evicted_memory,
+            }
@@ -0,0 +1,109 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import instrumentation
+
+# A speculative job returns the reply and the tokens it cost (prompt plus completion)
+SpeculativeJob = Callable[[], Tuple[str, int]]
+
+class Speculator:
+    """Pre-generates candidate replies for a conversation's next turn in background workers
+
+    After a turn, start() submits one job per possible branch of the next
+    turn, keyed by what the reply depends on. When the agent's message
+    arrives, claim() hands back the candidate for the branch actually taken
+    and cancels the others. Candidates that are never used count as wasted
+    tokens; jobs already running when cancelled still finish and are counted.
+    """
+
+    def __init__(self, enabled: bool = False, workers: int = 4):
+        self.enabled = enabled
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Dict[Hashable, Future]] = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.ready_hits = 0  # Hits whose reply was already complete
+        self.misses = 0
+        self.cancelled = 0
+        self.wasted_tokens = 0
+
+    @classmethod
+    def from_env(cls) -> "Speculator":
+        return cls(
+            enabled=os.environ.get("SPECULATION", "off") == "on",
+            workers=int(os.environ.get("SPECULATION_WORKERS", 4)),
+        )
+
+    def start(self, conversation_id: str, branches: Dict[Hashable, SpeculativeJob]) -> None:
+        """Begin generating candidates for a conversation's next turn, replacing older ones"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="speculation")
+            stale = self._pending.pop(conversation_id, {})
+            if branches:
+                self._pending[conversation_id] = {key: self._executor.submit(job) for key, job in branches.items()}
+                self.started += len(branches)
+        instrumentation.count("chatbot_speculation_started_total", len(branches))
+        self._waste(stale.values())
+
+    def claim(self, conversation_id: Optional[str], key: Hashable) -> Optional[Future]:
+        """Take the candidate for the branch the turn took, discarding the rest"""
+        with self._lock:
+            candidates = self._pending.pop(conversation_id, None)
+            if candidates is None:
+                return None
+            future = candidates.pop(key, None)
+            if future is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.ready_hits += future.done()
+        instrumentation.count("chatbot_speculation_claims_total", result="miss" if future is None else "hit")
+        self._waste(candidates.values())
+        return future
+
+    def discard(self, conversation_id: Optional[str]) -> None:
+        """Drop a conversation's candidates, e.g. when it ends"""
+        with self._lock:
+            candidates = self._pending.pop(conversation_id, {})
+        self._waste(candidates.values())
+
+    def close(self, wait: bool = True) -> None:
+        """Stop the workers, waiting for running candidates so their cost is counted"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _waste(self, futures: Iterable[Future]) -> None:
+        for future in futures:
+            if future.cancel():
+                with self._lock:
+                    self.cancelled += 1
+                instrumentation.count("chatbot_speculation_cancelled_total")
+            else:
+                future.add_done_callback(self._count_waste)
+
+    def _count_waste(self, future: Future) -> None:
+        if future.exception() is None:
+            tokens = future.result()[1]
+            with self._lock:
+                self.wasted_tokens += tokens
+            instrumentation.count("chatbot_speculation_wasted_tokens_total", tokens)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            claimed = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "ready_hits": self.ready_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / claimed if claimed else 0.0,
+                "cancelled": self.cancelled,
+                "wasted_tokens": self.wasted_tokens,
+            }
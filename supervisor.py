@@ -0,0 +1,360 @@
+"""Supervisor: N server.py worker processes behind one consistent-hash router.
+
+Each worker is a separate process with its own compiled graph, LLM client,
+rate limiter and SessionManager, listening on 127.0.0.1 at SERVER_PORT+1,
+SERVER_PORT+2, ... The supervisor serves the same API as server.py on
+SERVER_PORT and forwards every request for a conversation to the worker that
+owns its id on a HashRing, so a conversation's in-memory state stays on one
+process and only cold conversations touch the checkpoint store.
+
+When a worker exits, its conversations move to the ring's next workers, which
+resume them from the checkpoint store (turns already in flight there get 503;
+a checkpoint written in the last CHECKPOINT_FLUSH_INTERVAL may be lost). The
+worker is restarted, and once it is healthy the ring is republished: workers
+finish turns in flight on conversations that move back, flush them and drop
+them from memory before the router sends those conversations anywhere else.
+A worker that gets a conversation it does not own answers 421 and the router
+retries on the current ring.
+
+Provider rate limits (LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE) are
+split evenly between the workers. On SIGINT/SIGTERM the router stops
+accepting connections and every worker drains as server.py does.
+
+Run it against the stub backend:
+    LLM_BACKEND=stub python supervisor.py --workers 4 --port 8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+
+import aiohttp
+from aiohttp import WSMsgType, web
+
+import instrumentation
+from hash_ring import HashRing
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+
+# Response headers passed back from workers
+FORWARDED_HEADERS = ("Content-Type", "Retry-After")
+
+class Worker:
+    """One server.py process and the port it listens on"""
+
+    def __init__(self, name: str, port: int):
+        self.name = name
+        self.port = port
+        self.process: Optional[subprocess.Popen] = None
+        self.ready = False
+        self.restarting = False
+        self.restarts = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+def worker_env(name: str, workers: int) -> Dict[str, str]:
+    """The environment for one worker: its id, and its share of the provider rate limits"""
+    env = dict(os.environ, WORKER_ID=name, PYTHONUNBUFFERED="1")
+    for limit in ("LLM_REQUESTS_PER_MINUTE", "LLM_TOKENS_PER_MINUTE"):
+        if env.get(limit):
+            env[limit] = str(max(1, int(float(env[limit]) / workers)))
+    # Workers serve /metrics on their own ports; files would overwrite each other
+    env.pop("METRICS_PORT", None)
+    if env.get("METRICS_FILE"):
+        env["METRICS_FILE"] = f"{env['METRICS_FILE']}.{name}"
+    return env
+
+class Supervisor:
+    """Starts and restarts the workers and routes requests to them"""
+
+    def __init__(self, workers: int, base_port: int, drain_timeout: float = 30.0, start_timeout: float = 60.0):
+        self.workers = {
+            f"worker-{number}": Worker(f"worker-{number}", base_port + number) for number in range(workers)
+        }
+        self.drain_timeout = drain_timeout
+        self.start_timeout = start_timeout
+        self.ring = HashRing()
+        self.stopping = False
+        self.http: Optional[aiohttp.ClientSession] = None
+        self._routable: Optional[asyncio.Event] = None
+        self._publish_lock: Optional[asyncio.Lock] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._restarts: Set[asyncio.Task] = set()
+
+    def _spawn(self, worker: Worker) -> None:
+        worker.ready = False
+        worker.process = subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "--host", "127.0.0.1", "--port", str(worker.port)],
+            env=worker_env(worker.name, len(self.workers)),
+        )
+
+    async def _wait_ready(self, worker: Worker) -> bool:
+        """Poll the worker's /healthz until it answers; False if it exits or takes too long"""
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline and worker.process.poll() is None:
+            try:
+                async with self.http.get(f"{worker.url}/healthz") as response:
+                    if response.status == 200:
+                        worker.ready = True
+                        return True
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+        return False
+
+    async def _publish(self) -> None:
+        """Send the ring of ready workers to each of them, then start routing by it
+
+        New requests wait while the workers hand off the conversations that
+        moved, so no conversation is live on two workers at once.
+        """
+        async with self._publish_lock:
+            names = [worker.name for worker in self.workers.values() if worker.ready]
+            self._routable.clear()
+            try:
+                await asyncio.gather(*(self._send_ring(self.workers[name], names) for name in names))
+            finally:
+                self.ring = HashRing(names)
+                self._routable.set()
+        print(f"Routing to {len(names)}/{len(self.workers)} workers", flush=True)
+
+    async def _send_ring(self, worker: Worker, names: List[str]) -> None:
+        try:
+            async with self.http.put(f"{worker.url}/internal/ring", json={"workers": names}) as response:
+                await response.read()
+        except aiohttp.ClientError:
+            # Exiting; the monitor will notice
+            pass
+
+    async def _restart(self, worker: Worker) -> None:
+        """Rebalance a dead worker's conversations onto the others, then bring it back"""
+        print(f"{worker.name} exited with code {worker.process.returncode}; restarting", flush=True)
+        instrumentation.count("chatbot_worker_restarts_total", worker=worker.name)
+        worker.ready = False
+        await self._publish()
+        delay = 0.5
+        while not self.stopping:
+            worker.restarts += 1
+            self._spawn(worker)
+            if await self._wait_ready(worker):
+                break
+            worker.process.kill()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+        if not self.stopping:
+            await self._publish()
+        worker.restarting = False
+
+    async def _watch(self) -> None:
+        while not self.stopping:
+            for worker in self.workers.values():
+                if not worker.restarting and worker.process.poll() is not None:
+                    worker.restarting = True
+                    task = asyncio.create_task(self._restart(worker))
+                    self._restarts.add(task)
+                    task.add_done_callback(self._restarts.discard)
+            await asyncio.sleep(0.2)
+
+    async def _start(self, app: web.Application) -> None:
+        """on_startup: start every worker and publish the ring once they are all up"""
+        self.http = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0),
+                                          timeout=aiohttp.ClientTimeout(total=None, sock_connect=5))
+        self._routable = asyncio.Event()
+        self._publish_lock = asyncio.Lock()
+        for worker in self.workers.values():
+            self._spawn(worker)
+        started = await asyncio.gather(*(self._wait_ready(worker) for worker in self.workers.values()))
+        if not all(started):
+            await self._stop(app)
+            raise RuntimeError("Workers failed to start: " + ", ".join(
+                worker.name for worker, ready in zip(self.workers.values(), started) if not ready))
+        await self._publish()
+        self._monitor = asyncio.create_task(self._watch())
+
+    async def _stop(self, app: web.Application) -> None:
+        """on_shutdown: stop restarting workers and let each of them drain"""
+        self.stopping = True
+        if self._monitor is not None:
+            self._monitor.cancel()
+        processes = [worker.process for worker in self.workers.values() if worker.process is not None]
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+
+        def wait_all() -> None:
+            deadline = time.monotonic() + self.drain_timeout + 5
+            for process in processes:
+                try:
+                    process.wait(max(0.0, deadline - time.monotonic()))
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+        await asyncio.get_running_loop().run_in_executor(None, wait_all)
+
+    async def _close(self, app: web.Application) -> None:
+        await self.http.close()
+
+    async def _owner(self, conversation_id: str) -> Worker:
+        await self._routable.wait()
+        name = self.ring.owner(conversation_id)
+        if name is None:
+            raise web.HTTPServiceUnavailable(text="No workers available", headers={"Retry-After": "1"})
+        return self.workers[name]
+
+    async def _forward(self, request: web.Request, conversation_id: str, path: str,
+                       body: Optional[bytes] = None) -> web.Response:
+        """Send a request to the conversation's worker and relay the response"""
+        body = await request.read() if body is None else body
+        headers = {"Content-Type": request.headers.get("Content-Type", "application/json")} if body else None
+        for attempt in range(2):
+            worker = await self._owner(conversation_id)
+            try:
+                async with self.http.request(request.method, worker.url + path, data=body, headers=headers) as upstream:
+                    payload = await upstream.read()
+            except aiohttp.ClientConnectionError:
+                # The worker went away with the request in flight; the monitor moves its conversations
+                raise web.HTTPServiceUnavailable(text=f"{worker.name} is unavailable", headers={"Retry-After": "1"})
+            if upstream.status == web.HTTPMisdirectedRequest.status_code and attempt == 0:
+                # The worker already has a newer ring than the router: wait for it and retry
+                continue
+            break
+        return web.Response(status=upstream.status, body=payload, headers={
+            name: upstream.headers[name] for name in FORWARDED_HEADERS if name in upstream.headers
+        })
+
+    async def create_conversation(self, request: web.Request) -> web.Response:
+        body = {}
+        if request.can_read_body:
+            try:
+                body = await request.json()
+            except ValueError:
+                raise web.HTTPBadRequest(text="Expected a JSON body") from None
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="Expected a JSON object")
+        # Pick the id here so the conversation starts on the worker that owns it
+        conversation_id = body.get("conversation_id")
+        if not isinstance(conversation_id, str):
+            conversation_id = uuid.uuid4().hex
+        return await self._forward(request, conversation_id, "/conversations",
+                                   json.dumps(dict(body, conversation_id=conversation_id)).encode())
+
+    async def conversation(self, request: web.Request) -> web.Response:
+        return await self._forward(request, request.match_info["conversation_id"], request.path)
+
+    async def _connect(self, conversation_id: str, path: str):
+        """Open the WebSocket to the conversation's worker; an error Response if it refused"""
+        for attempt in range(2):
+            worker = await self._owner(conversation_id)
+            try:
+                return await self.http.ws_connect(worker.url + path, heartbeat=30)
+            except aiohttp.WSServerHandshakeError as error:
+                if error.status == web.HTTPMisdirectedRequest.status_code and attempt == 0:
+                    continue
+                return web.Response(status=error.status, text=error.message)
+            except aiohttp.ClientConnectionError:
+                return web.Response(status=503, text=f"{worker.name} is unavailable", headers={"Retry-After": "1"})
+
+    async def stream_turns(self, request: web.Request) -> web.StreamResponse:
+        """Relay the WebSocket, reconnecting to the new owner if the conversation is handed off"""
+        conversation_id = request.match_info["conversation_id"]
+        upstream = await self._connect(conversation_id, request.path)
+        if isinstance(upstream, web.Response):
+            return upstream
+        client = web.WebSocketResponse(heartbeat=30)
+        await client.prepare(request)
+        close_code = 1000
+        try:
+            async for frame in client:
+                if frame.type != WSMsgType.TEXT:
+                    continue
+                await upstream.send_str(frame.data)
+                while True:
+                    reply = await upstream.receive()
+                    if reply.type != WSMsgType.TEXT:
+                        # The worker closed the socket: draining, or gone
+                        close_code = upstream.close_code or 1011
+                        return client
+                    event = json.loads(reply.data)
+                    if event["type"] == "error" and event["status"] == web.HTTPMisdirectedRequest.status_code:
+                        await upstream.close()
+                        reconnected = await self._connect(conversation_id, request.path)
+                        if isinstance(reconnected, web.Response):
+                            close_code = 1011
+                            return client
+                        upstream = reconnected
+                        await upstream.send_str(frame.data)
+                        continue
+                    await client.send_str(reply.data)
+                    if event["type"] != "token":
+                        break
+        finally:
+            if not upstream.closed:
+                await upstream.close()
+            await client.close(code=close_code)
+        return client
+
+    async def health(self, request: web.Request) -> web.Response:
+        async def worker_health(worker: Worker) -> Dict:
+            summary = {"pid": worker.process.pid, "port": worker.port, "ready": worker.ready,
+                       "restarts": worker.restarts}
+            if worker.ready:
+                try:
+                    async with self.http.get(f"{worker.url}/healthz", timeout=aiohttp.ClientTimeout(total=2)) as response:
+                        summary.update(await response.json())
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    summary["status"] = "unreachable"
+            return summary
+
+        workers = await asyncio.gather(*(worker_health(worker) for worker in self.workers.values()))
+        ready = sum(worker["ready"] for worker in workers)
+        status = "draining" if self.stopping else ("ok" if ready == len(workers) else "degraded")
+        return web.json_response({"status": status, "ready_workers": ready,
+                                  "workers": dict(zip(self.workers, workers))})
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """The supervisor's own counters; each worker serves its turn metrics on its port"""
+        return web.Response(text=instrumentation.render_prometheus(), content_type="text/plain")
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/conversations", self.create_conversation),
+            web.get("/conversations/{conversation_id}", self.conversation),
+            web.post("/conversations/{conversation_id}/turns", self.conversation),
+            web.get("/conversations/{conversation_id}/stream", self.stream_turns),
+            web.get("/healthz", self.health),
+            web.get("/metrics", self.metrics),
+        ])
+        app.on_startup.append(self._start)
+        app.on_shutdown.append(self._stop)
+        app.on_cleanup.append(self._close)
+        return app
+
+def serve(workers: int, host: str = "127.0.0.1", port: int = 8080, base_port: Optional[int] = None) -> None:
+    """Start the workers and route to them until SIGINT/SIGTERM, then drain them"""
+    drain_timeout = float(os.environ.get("SERVER_DRAIN_TIMEOUT", 30))
+    supervisor = Supervisor(workers, base_port or port + 1, drain_timeout=drain_timeout,
+                            start_timeout=float(os.environ.get("SERVER_WORKER_START_TIMEOUT", 60)))
+    web.run_app(supervisor.create_app(), host=host, port=port, shutdown_timeout=drain_timeout + 10,
+                print=lambda message: print(message, flush=True))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVER_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--host", default=os.environ.get("SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVER_PORT", 8080)))
+    parser.add_argument("--base-port", type=int, default=int(os.environ.get("SERVER_WORKER_BASE_PORT") or 0) or None,
+                        help="First worker port (default: --port + 1)")
+    args = parser.parse_args()
+    serve(args.workers, args.host, args.port, args.base_port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Shared setup: every test runs against the deterministic stub model, offline."""
+import os
+
+os.environ.update(LLM_BACKEND="stub", LLM_STUB_LATENCY="0", LLM_CACHE="off", LLM_RATE_LIMIT="off")
+
+import pytest
+
+import bot_agent
+from llm_backends import StubChatModel, set_llm
+
+@pytest.fixture(autouse=True)
+def stub_llm(monkeypatch):
+    """An instant stub model, LLM replies for every turn and no speculation"""
+    model = StubChatModel()
+    set_llm(model)
+    monkeypatch.setattr(bot_agent, "reply_mode", "llm")
+    monkeypatch.setattr(bot_agent.speculator, "enabled", False)
+    yield model
+    set_llm(None)
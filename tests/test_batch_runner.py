@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from batch_runner import generate_transcripts, run_batch
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_a_small_batch_runs_end_to_end(tmp_path, use_async):
+    transcripts = list(generate_transcripts(4))
+    output = tmp_path / "results.jsonl"
+    summary = run_batch(transcripts, str(output), processes=2, backend="stub", use_async=use_async,
+                        concurrency=3, chunk_size=2)
+
+    with open(output) as f:
+        results = {result["id"]: result for result in map(json.loads, f)}
+    assert sorted(results) == sorted(transcript["id"] for transcript in transcripts)
+    for transcript in transcripts:
+        result = results[transcript["id"]]
+        agent_lines = [message["content"] for message in result["state"]["messages"] if message["role"] == "agent"]
+        assert agent_lines == transcript["turns"]
+        assert len(result["turn_ms"]) == len(transcript["turns"])
+    assert summary["conversations"] == 4
+    assert summary["turns"] == sum(len(transcript["turns"]) for transcript in transcripts)
+    assert sum(summary["final_states"].values()) == 4
+    assert "CONCLUSION" in summary["final_states"]
+
+def test_sync_and_async_batches_reach_the_same_states(tmp_path):
+    transcripts = list(generate_transcripts(2, seed=3))
+    final_states = []
+    for use_async in (False, True):
+        output = tmp_path / f"results-{use_async}.jsonl"
+        run_batch(transcripts, str(output), processes=1, backend="stub", use_async=use_async)
+        with open(output) as f:
+            final_states.append({result["id"]: result["state"]["conversation_state"] for result in map(json.loads, f)})
+    assert final_states[0] == final_states[1]
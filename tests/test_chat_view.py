@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+
+from chat_view import CHUNK_SIZE, history_chunks, message_html, window_start
+
+def messages(count: int):
+    return [SimpleNamespace(role="agent" if number % 2 == 0 else "bot", content=f"message {number}")
+            for number in range(count)]
+
+@pytest.mark.parametrize("total, window, start", [
+    (0, 50, 0),
+    (50, 50, 0),
+    (51, 50, 0),
+    (CHUNK_SIZE + 50, 50, CHUNK_SIZE),
+    (CHUNK_SIZE + 51, 50, CHUNK_SIZE),
+    (2 * CHUNK_SIZE + 49, 50, CHUNK_SIZE),
+    (2 * CHUNK_SIZE + 50, 50, 2 * CHUNK_SIZE),
+    (1000, 0, 0),
+    (1000, -1, 0),
+])
+def test_the_window_starts_on_a_block_and_covers_the_newest_messages(total, window, start):
+    assert window_start(total, window) == start
+    assert start % CHUNK_SIZE == 0
+    assert window <= 0 or total - start >= min(total, window)
+
+def test_history_is_split_into_whole_blocks_from_the_start():
+    history = messages(2 * CHUNK_SIZE + 3)
+    chunks = history_chunks(history, CHUNK_SIZE)
+    assert len(chunks) == 2
+    assert chunks[0] == "".join(message_html(m.role, m.content) for m in history[CHUNK_SIZE:2 * CHUNK_SIZE])
+    assert chunks[1] == "".join(message_html(m.role, m.content) for m in history[2 * CHUNK_SIZE:])
+    assert history_chunks(history)[1:] == chunks
+    assert history_chunks(messages(0)) == []
+    assert history_chunks(history, len(history)) == []
+
+def test_a_new_message_only_changes_the_last_block():
+    history = messages(CHUNK_SIZE + 1)
+    before = history_chunks(history)
+    history += messages(1)
+    after = history_chunks(history)
+    assert after[0] == before[0] and after[1] != before[1]
+
+def test_message_content_is_escaped():
+    markup = message_html("agent", '<script>alert("hi")</script> & more\nnext line')
+    assert "<script>" not in markup
+    assert "&lt;script&gt;alert(&quot;hi&quot;)&lt;/script&gt; &amp; more<br>next line" in markup
+    assert 'class="chat-message agent"' in markup and "Support Agent" in markup
+
+def test_unknown_roles_are_shown_as_the_bot():
+    assert 'class="chat-message bot"' in message_html("system", "Hello")
@@ -0,0 +1,68 @@
+import pytest
+
+from bot_agent import new_state
+from checkpoint_store import CheckpointStore, SQLiteCheckpointStore
+
+def conversation(count: int) -> dict:
+    state = new_state()
+    state["messages"] = [{"role": "agent" if n % 2 else "bot", "content": f"message {n}"} for n in range(count)]
+    return state
+
+def open_store(tmp_path, **kwargs) -> SQLiteCheckpointStore:
+    return SQLiteCheckpointStore(str(tmp_path / "checkpoints.sqlite"), flush_interval=None, **kwargs)
+
+def test_saved_messages_load_back_in_order(tmp_path):
+    store = open_store(tmp_path)
+    store.save("c1", conversation(3))
+    store.save("c1", conversation(5))
+    loaded = store.load("c1")
+    store.close()
+    assert loaded["messages"] == conversation(5)["messages"]
+    assert loaded["conversation_state"] == conversation(5)["conversation_state"]
+
+def test_tracked_message_counts_are_bounded(tmp_path):
+    store = open_store(tmp_path, max_tracked=3)
+    for n in range(10):
+        store.save(f"c{n}", conversation(2))
+    assert list(store._saved_counts) == ["c7", "c8", "c9"]
+    store.save("c0", conversation(4))
+    assert len(store._saved_counts) == 3
+    assert store.load("c0")["messages"] == conversation(4)["messages"]
+    store.close()
+
+def test_delete_removes_the_conversation(tmp_path):
+    store = open_store(tmp_path)
+    store.save("c1", conversation(2))
+    store.flush()
+    store.save("c2", conversation(2))
+    store.delete(["c1", "c2"])
+    assert store.load("c1") is None
+    assert store.load("c2") is None
+    assert not store._saved_counts
+    store.close()
+
+def test_batched_checkpoints_survive_a_reopen(tmp_path):
+    store = open_store(tmp_path, batch_size=7)
+    states = {f"conv-{n}": new_state() for n in range(20)}
+    for turn in range(3):
+        for conversation_id, state in states.items():
+            state["messages"].append({"role": "agent", "content": f"{conversation_id} agent ({turn})"})
+            state["messages"].append({"role": "bot", "content": f"{conversation_id} bot ({turn})"})
+            state.update(agent_name="Alex", authenticated=True, plan_status="active", llm_calls=1)
+            store.save(conversation_id, state)
+    store.close()
+
+    reopened = open_store(tmp_path)
+    for conversation_id, state in states.items():
+        loaded = reopened.load(conversation_id)
+        assert loaded["messages"] == state["messages"]
+        assert loaded["conversation_state"] == state["conversation_state"]
+        assert (loaded["agent_name"], loaded["authenticated"], loaded["plan_status"], loaded["correct_queue"]) == \
+            ("Alex", True, "active", None)
+        assert loaded["llm_calls"] == 1
+    assert reopened.load("conv-unknown") is None
+    reopened.close()
+
+def test_the_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CheckpointStore()
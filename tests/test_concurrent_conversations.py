@@ -0,0 +1,75 @@
+import asyncio
+import threading
+
+import bot_agent
+from llm_backends import StubChatModel, set_llm
+
+AGENT_TURNS = [
+    bot_agent.GREETING,
+    "My name is Alex.",
+    "Yes, you're in the right queue for coverage inquiries.",
+    "Thanks, I've verified your identity.",
+    "I've checked your plan, and it is currently active.",
+]
+
+async def run_conversation() -> dict:
+    state = None
+    for agent_input in AGENT_TURNS:
+        state = await bot_agent.ahandle_agent_input(agent_input, state)
+        assert state["llm_calls"] == 1
+    return state
+
+def test_concurrent_conversations_conclude():
+    conversations = 20
+    set_llm(StubChatModel(latency=0.05))
+
+    async def run_all():
+        return await asyncio.gather(*(run_conversation() for _ in range(conversations)))
+
+    states = asyncio.run(run_all())
+    assert [state["conversation_state"] for state in states] == ["CONCLUSION"] * conversations
+    assert all(state["agent_name"] == "Alex" for state in states)
+    assert all(len(state["messages"]) == 2 * len(AGENT_TURNS) for state in states)
+
+def test_concurrent_conversations_do_not_wait_on_each_other():
+    conversations = 20
+    in_flight = []
+
+    class OverlapStub(StubChatModel):
+        """Stub that records how many calls are waiting on the model at once"""
+
+        active: int = 0
+
+        async def _agenerate(self, *args, **kwargs):
+            self.active += 1
+            in_flight.append(self.active)
+            try:
+                return await super()._agenerate(*args, **kwargs)
+            finally:
+                self.active -= 1
+
+    set_llm(OverlapStub(latency=0.2))
+
+    async def run_all():
+        await asyncio.gather(*(bot_agent.ahandle_agent_input(bot_agent.GREETING) for _ in range(conversations)))
+
+    asyncio.run(run_all())
+    assert len(in_flight) == conversations
+    assert max(in_flight) == conversations
+
+def test_sync_turns_share_one_long_lived_loop():
+    loops = []
+
+    class LoopRecordingStub(StubChatModel):
+        async def _agenerate(self, *args, **kwargs):
+            loops.append(asyncio.get_running_loop())
+            return await super()._agenerate(*args, **kwargs)
+
+    set_llm(LoopRecordingStub())
+    state = bot_agent.handle_agent_input(bot_agent.GREETING)
+    bot_agent.handle_agent_input("My name is Alex.", state)
+    worker = threading.Thread(target=bot_agent.handle_agent_input, args=(bot_agent.GREETING,))
+    worker.start()
+    worker.join()
+    assert len(loops) == 3 and loops[0] is loops[1] is loops[2]
+    assert not loops[0].is_closed()
@@ -0,0 +1,99 @@
+import copy
+
+import pytest
+
+from conversation_flow import DETECTOR_PHRASES, FlowDefinitionError, compile_flow, match_template, validate_flow
+
+SIGNAL = sorted(DETECTOR_PHRASES)[0]
+
+FLOW = {
+    "name": "greeting",
+    "initial_state": "ASK_NAME",
+    "states": {
+        "ASK_NAME": {
+            "prompt": "Ask for the agent's name.",
+            "templates": [{"when": {"turns_in_state": {"equals": 0}}, "reply": "Hi, may I know your name?"}],
+            "detector": {"type": "name"},
+            "advance": {"to": "CONFIRM", "when": {"agent_name": {"is_set": True}}},
+        },
+        "CONFIRM": {
+            "prompt": "Thank {agent_name}.",
+            "templates": [{"reply": "Thanks, {agent_name}."}],
+            "end": {"to": "DONE", "when": {"messages": {"min_length": 4}}},
+        },
+        "DONE": None,
+    },
+}
+
+def edited(path, value):
+    """A copy of FLOW with the value at the given key path replaced"""
+    definition = copy.deepcopy(FLOW)
+    *parents, key = path
+    target = definition
+    for parent in parents:
+        target = target[parent]
+    target[key] = value
+    return definition
+
+def test_the_example_flow_is_valid():
+    validate_flow(FLOW)
+
+@pytest.mark.parametrize("path, value, problem", [
+    (("initial_state",), "MISSING", "initial_state"),
+    (("initial_state",), ["ASK_NAME"], "initial_state"),
+    (("states", "ASK_NAME", "advance", "to"), "MISSING", "advance.to"),
+    (("states", "ASK_NAME", "advance", "to"), {"state": "CONFIRM"}, "advance.to"),
+    (("states", "ASK_NAME", "detector"), {"type": "telepathy"}, "detector"),
+    (("states", "ASK_NAME", "detector"), {"type": ["name"]}, "detector"),
+    (("states", "ASK_NAME", "detector"), {"type": "name", "field": "authenticated"}, "detector.field"),
+    (("states", "ASK_NAME", "detector"), {"type": "name", "field": ["agent_name"]}, "detector.field"),
+    (("states", "ASK_NAME", "detector"), {"type": "signals", "rules": [{"signal": "shouting"}]}, "signal"),
+    (("states", "ASK_NAME", "detector"), {"type": "signals", "rules": [{"signal": {"a": 1}}]}, "signal"),
+    (("states", "ASK_NAME", "detector"),
+     {"type": "signals", "rules": [{"signal": SIGNAL, "set": {"authenticated": "yes"}}]}, "authenticated"),
+    (("states", "ASK_NAME", "advance", "when"), {"agent_name": {"resembles": "Alex"}}, "agent_name"),
+    (("states", "ASK_NAME", "advance", "when"), {"shoe_size": {"equals": 9}}, "shoe_size"),
+    (("states", "ASK_NAME", "advance", "when"), {"agent_name": {"is_set": "yes"}}, "is_set"),
+    (("states", "ASK_NAME", "advance", "when"), {"messages": {"min_length": "2"}}, "min_length"),
+    (("states", "ASK_NAME", "advance", "when"), {"messages": {"min_length": True}}, "min_length"),
+    (("states", "ASK_NAME", "advance", "when"), {"authenticated": {"min_length": 1}}, "min_length"),
+    (("states", "ASK_NAME", "advance", "when"), {"turns_in_state": {"equals": "0"}}, "turns_in_state"),
+    (("states", "ASK_NAME", "advance", "when"), {"plan_status": {"equals": "lapsed"}}, "plan_status"),
+    (("states", "ASK_NAME", "advance", "when"), {"agent_name": {"equals": 7}}, "agent_name"),
+    (("states", "ASK_NAME", "advance", "when"), {"messages": {"equals": []}}, "messages"),
+    (("states", "ASK_NAME", "advance", "when"), {"plan_status": {"equals": ["active"]}}, "plan_status"),
+    (("states", "CONFIRM", "prompt"), "Thank {agent}.", "{agent}"),
+    (("states", "EXTRA"), {"prompt": "Never reached."}, "unreachable"),
+])
+def test_malformed_flows_are_rejected(path, value, problem):
+    with pytest.raises(FlowDefinitionError) as raised:
+        compile_flow(edited(path, value))
+    assert problem in str(raised.value)
+
+def test_every_problem_is_reported_at_once():
+    definition = edited(("initial_state",), "MISSING")
+    definition["states"]["ASK_NAME"]["detector"] = {"type": "telepathy"}
+    with pytest.raises(FlowDefinitionError) as raised:
+        validate_flow(definition, "broken.yaml")
+    message = str(raised.value)
+    assert "broken.yaml" in message and "initial_state" in message and "detector" in message
+
+def test_a_compiled_flow_walks_its_transitions():
+    flow = compile_flow(FLOW)
+    state = {"messages": [], "agent_name": None, "turns_in_state": 0}
+    step = flow.step(flow.initial_state)
+    assert match_template(step, state) == "Hi, may I know your name?"
+
+    state["messages"] = [{"role": "bot"}, {"role": "agent"}]
+    step.detector(state, "Hello")
+    assert not step.advance_when(state)
+    step.detector(state, "Hi, my name is Alex")
+    assert state["agent_name"] == "Alex" and step.advance_when(state)
+
+    step = flow.step(step.advance_to)
+    assert step.name == "CONFIRM" and flow.prompts["CONFIRM"] == "Thank {agent_name}."
+    assert match_template(step, state) == "Thanks, Alex."
+    assert not step.end_when(state)
+    state["messages"] += [{"role": "bot"}, {"role": "agent"}]
+    assert step.end_when(state)
+    assert flow.step(step.end_to).prompt is None
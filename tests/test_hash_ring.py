@@ -0,0 +1,44 @@
+from hash_ring import HashRing
+
+WORKERS = ["worker-0", "worker-1", "worker-2", "worker-3"]
+CONVERSATIONS = [f"conversation-{number}" for number in range(2000)]
+
+def owners(ring: HashRing):
+    return {conversation_id: ring.owner(conversation_id) for conversation_id in CONVERSATIONS}
+
+def test_an_empty_ring_has_no_owner():
+    assert HashRing().owner("conversation-0") is None
+
+def test_a_conversation_keeps_its_owner():
+    ring = HashRing(WORKERS)
+    first = owners(ring)
+    assert owners(ring) == first
+    # Another process building the same ring, in any order, agrees
+    assert owners(HashRing(reversed(WORKERS))) == first
+    assert set(first.values()) == set(WORKERS)
+
+def test_removing_a_worker_only_moves_its_conversations():
+    ring = HashRing(WORKERS)
+    before = owners(ring)
+    ring.remove("worker-2")
+    after = owners(ring)
+    assert ring.workers == ["worker-0", "worker-1", "worker-3"]
+    for conversation_id, owner in before.items():
+        if owner == "worker-2":
+            assert after[conversation_id] != "worker-2"
+        else:
+            assert after[conversation_id] == owner
+
+def test_adding_a_worker_back_restores_the_old_owners():
+    ring = HashRing(WORKERS)
+    before = owners(ring)
+    ring.remove("worker-2")
+    ring.add("worker-2")
+    assert owners(ring) == before
+
+def test_conversations_spread_across_the_workers():
+    counts = {}
+    for owner in owners(HashRing(WORKERS)).values():
+        counts[owner] = counts.get(owner, 0) + 1
+    fair_share = len(CONVERSATIONS) / len(WORKERS)
+    assert all(0.5 * fair_share < count < 1.5 * fair_share for count in counts.values())
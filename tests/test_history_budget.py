@@ -0,0 +1,38 @@
+import bot_agent
+from benchmarks.bench_history_budget import AGENT_LINES, CheckedHistoryBuilder
+from conversation_history import SUMMARY_PREFIX, HistoryBuilder
+
+def test_long_conversations_stay_within_the_budget(monkeypatch):
+    builder = CheckedHistoryBuilder(token_budget=400, summary_tokens=100)
+    monkeypatch.setattr(bot_agent, "history_builder", builder)
+    conversations, turns = 2, 60
+    for _ in range(conversations):
+        state = None
+        for turn in range(turns):
+            state = bot_agent.handle_agent_input(AGENT_LINES[turn % len(AGENT_LINES)], state)
+            assert state["llm_calls"] == 1 and state["conversation_state"] == "INTRODUCTION"
+    assert max(builder.history_sizes) <= builder.token_budget
+    assert state["summarized_count"] > 0
+    # Every conversation is the same, and each message is folded into the summary once
+    assert builder.folded == conversations * state["summarized_count"]
+
+def test_an_oversized_latest_message_is_only_sent_truncated():
+    builder = HistoryBuilder(token_budget=100, summary_tokens=40)
+    long_message = "The member called about a claim that was reprocessed. " * 20
+    state = {"messages": [
+        {"role": "agent", "content": "Hello, who am I speaking with?"},
+        {"role": "bot", "content": "Hi, this is the clinic calling."},
+        {"role": "agent", "content": long_message},
+    ]}
+    history = builder.build(state)
+    assert state["summarized_count"] == 2
+    assert "reprocessed" not in state["history_summary"]
+    assert history[0][0] == "system" and history[0][1].startswith(SUMMARY_PREFIX)
+    assert history[-1][1].endswith("...") and long_message.startswith(history[-1][1][:-3])
+    assert builder.history_tokens(history) <= builder.token_budget
+
+    # On the next turn the message has been seen, so it is summarized once like any other
+    state["messages"].append({"role": "bot", "content": long_message})
+    builder.build(state)
+    assert state["summarized_count"] == 3
+    assert state["history_summary"].count("reprocessed") == 1
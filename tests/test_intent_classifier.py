@@ -0,0 +1,68 @@
+import pytest
+
+import intent_classifier
+from conversation_flow import build_signals_detector
+from intent_classifier import NO_SIGNAL, classify_signals, get_intent_model, set_intent_model
+
+class FixedModel:
+    """Stands in for IntentModel, predicting one label for every message"""
+
+    def __init__(self, label: str, confidence: float):
+        self.prediction = (label, confidence)
+        self.scored = []
+
+    def task_for(self, signals):
+        return "authentication" if set(signals) <= {"authenticated"} else None
+
+    def predict(self, task, texts):
+        self.scored.extend(texts)
+        return [self.prediction for _ in texts]
+
+@pytest.fixture
+def model_reloaded(monkeypatch):
+    """get_intent_model loads from the environment again, and forgets the model afterwards"""
+    monkeypatch.setattr(intent_classifier, "_model", None)
+    monkeypatch.setattr(intent_classifier, "_model_loaded", False)
+    yield
+    set_intent_model(None)
+
+def authentication_detector():
+    return build_signals_detector({"rules": [{"signal": "authenticated", "set": {"authenticated": True}}]})
+
+def test_off_by_default(monkeypatch, model_reloaded):
+    monkeypatch.delenv("INTENT_CLASSIFIER", raising=False)
+    assert get_intent_model() is None
+
+def test_an_unreadable_weights_file_falls_back_to_the_rules(monkeypatch, model_reloaded, tmp_path):
+    corrupt = tmp_path / "intent_classifier.npz"
+    corrupt.write_bytes(b"not a zip file")
+    monkeypatch.setenv("INTENT_CLASSIFIER", "on")
+    monkeypatch.setenv("INTENT_MODEL_PATH", str(corrupt))
+    with pytest.warns(UserWarning, match="phrase matcher"):
+        assert get_intent_model() is None
+    assert classify_signals("You are authenticated.", ["authenticated"]) == {"authenticated"}
+
+def test_a_confident_no_signal_never_vetoes_a_rule():
+    model = FixedModel(NO_SIGNAL, 0.99)
+    set_intent_model(model)
+    state = {"authenticated": None}
+    authentication_detector()(state, "You are authenticated.")
+    assert state["authenticated"] is True
+    # The rules decided, so the message wasn't scored
+    assert model.scored == []
+    set_intent_model(None)
+
+def test_the_model_fills_in_where_the_rules_find_nothing():
+    set_intent_model(FixedModel("authenticated", 0.9))
+    assert classify_signals("All good on my end, go ahead.", ["authenticated"]) == {"authenticated"}
+    set_intent_model(FixedModel("authenticated", 0.5))
+    assert classify_signals("All good on my end, go ahead.", ["authenticated"]) == set()
+    set_intent_model(None)
+
+def test_the_shipped_model_keeps_rule_signals(model_reloaded, monkeypatch):
+    monkeypatch.setenv("INTENT_CLASSIFIER", "on")
+    assert get_intent_model() is not None
+    for message in ["You are authenticated.", "Your identity is confirmed.", "I've verified your identity."]:
+        state = {"authenticated": None}
+        authentication_detector()(state, message)
+        assert state["authenticated"] is True, message
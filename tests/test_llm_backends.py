@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+import llm_backends
+from conversation_history import estimate_tokens
+from llm_backends import (STUB_REPLIES, HTTPChatModel, RateLimitedChatModel, RecordReplayChatModel, StubChatModel,
+                          build_replay)
+from rate_limiter import RateLimiter, retryable_status
+
+PROMPT = [SystemMessage(content="Ask Alex if you are in the right queue"), HumanMessage(content="Hello")]
+
+def test_the_stub_picks_its_reply_from_the_system_prompt():
+    model = StubChatModel()
+    reply = model.invoke(PROMPT).content
+    assert reply == STUB_REPLIES[1][1].format(agent_name="Alex")
+    assert "".join(chunk.content for chunk in model.stream(PROMPT)) == reply
+    assert model.invoke([SystemMessage(content="Something else")]).content == llm_backends.STUB_FALLBACK_REPLY
+
+def test_replay_serves_what_was_recorded(tmp_path):
+    path = str(tmp_path / "recordings.jsonl")
+    recorder = build_replay(mode="record", inner="stub", path=path)
+    recorded = recorder.invoke(PROMPT).content
+    with open(path) as f:
+        assert [json.loads(line)["reply"] for line in f] == [recorded]
+
+    llm_backends._recordings.clear()
+    player = RecordReplayChatModel(path=path)
+    assert player.invoke(PROMPT).content == recorded
+    with pytest.raises(KeyError):
+        player.invoke([HumanMessage(content="Never recorded")])
+
+@pytest.fixture
+def http_model(monkeypatch):
+    """An HTTPChatModel whose requests go to handler(request) instead of the network"""
+    model = HTTPChatModel(base_url="http://llm.test/v1", model="test-model", api_key="secret")
+    key = (model.base_url, model.api_key, model.max_connections, model.timeout)
+
+    def install(handler):
+        client = httpx.Client(base_url=model.base_url, transport=httpx.MockTransport(handler),
+                              headers={"Authorization": f"Bearer {model.api_key}"})
+        monkeypatch.setitem(llm_backends._http_clients, key, client)
+        return model
+
+    return install
+
+def test_http_sends_an_openai_style_request(http_model):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"model": "test-model", "usage": {"total_tokens": 42},
+                                         "choices": [{"message": {"role": "assistant", "content": "Hi there"}}]})
+
+    result = http_model(handler)._generate(PROMPT)
+    body = json.loads(requests[0].content)
+    assert requests[0].url.path == "/v1/chat/completions"
+    assert requests[0].headers["authorization"] == "Bearer secret"
+    assert body["model"] == "test-model"
+    assert [message["role"] for message in body["messages"]] == ["system", "user"]
+    assert result.generations[0].message.content == "Hi there"
+    assert result.llm_output["token_usage"]["total_tokens"] == 42
+
+def test_http_errors_carry_their_status(http_model):
+    model = http_model(lambda request: httpx.Response(429, headers={"retry-after": "3"}))
+    with pytest.raises(httpx.HTTPStatusError) as raised:
+        model._generate(PROMPT)
+    assert retryable_status(raised.value) == 429
+
+def charged_tokens(limiter: RateLimiter) -> float:
+    return limiter.tokens.capacity - limiter.tokens.level
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_the_limiter_is_charged_the_tokens_actually_used(streaming):
+    # One token a minute, so the bucket barely refills during the test
+    limiter = RateLimiter(tokens_per_minute=1, token_burst=100_000)
+    model = RateLimitedChatModel(inner=StubChatModel(), limiter=limiter)
+    reply = "".join(chunk.content for chunk in model.stream(PROMPT)) if streaming else model.invoke(PROMPT).content
+    used = sum(estimate_tokens(message.content) for message in PROMPT) + estimate_tokens(reply)
+    assert charged_tokens(limiter) == pytest.approx(used, abs=1)
+    assert limiter.stats()["in_flight"] == 0
+
+def test_an_async_stream_read_partly_is_charged_for_what_arrived():
+    limiter = RateLimiter(tokens_per_minute=1, token_burst=100_000)
+    model = RateLimitedChatModel(inner=StubChatModel(), limiter=limiter)
+
+    async def first_chunk():
+        stream = model.astream(PROMPT)
+        chunk = await stream.__anext__()
+        await stream.aclose()
+        return chunk.content
+
+    received = asyncio.run(first_chunk())
+    used = sum(estimate_tokens(message.content) for message in PROMPT) + estimate_tokens(received)
+    assert charged_tokens(limiter) == pytest.approx(used, abs=1)
+    assert limiter.stats()["in_flight"] == 0
@@ -0,0 +1,94 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.outputs import Generation
+
+import bot_agent
+from llm_backends import CachedChatModel, StubChatModel, set_llm
+from llm_cache import ResponseCache
+
+def generations(text):
+    return [Generation(text=text)]
+
+def texts(cache, prompt, count):
+    return [cache.lookup(prompt, "model")[0].text for _ in range(count)]
+
+def test_variants_are_collected_then_served_round_robin(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), variants=2)
+    assert cache.lookup("prompt", "model") is None
+    cache.update("prompt", "model", generations("first"))
+    assert cache.lookup("prompt", "model") is None
+    cache.update("prompt", "model", generations("second"))
+    assert texts(cache, "prompt", 4) == ["first", "second", "first", "second"]
+
+def test_update_appends_to_variants_of_a_key_evicted_from_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path, memory_entries=1, variants=2)
+    cache.update("prompt", "model", generations("first"))
+    # Evicts "prompt" from the memory tier; its variant stays on disk
+    cache.update("other", "model", generations("other"))
+    cache.update("prompt", "model", generations("second"))
+    assert sorted(texts(cache, "prompt", 2)) == ["first", "second"]
+    reopened = ResponseCache(path=path, variants=2)
+    assert sorted(texts(reopened, "prompt", 2)) == ["first", "second"]
+
+def test_whitespace_only_differences_share_an_entry(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    cache.update("Hello,\n  agent", "model", generations("reply"))
+    assert cache.lookup("Hello, agent", "model")[0].text == "reply"
+    assert cache.lookup("Hello, agent", "other model") is None
+
+def test_the_row_count_stays_within_max_rows(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), max_rows=10)
+    for n in range(25):
+        cache.update(f"prompt {n}", "model", generations(str(n)))
+        (rows,) = cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        assert rows == cache._rows <= 10
+    # The newest responses survive eviction
+    assert cache.lookup("prompt 24", "model")[0].text == "24"
+
+class CountingStub(StubChatModel):
+    calls: int = 0
+
+    def _generate(self, *args, **kwargs):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+    def _stream(self, *args, **kwargs):
+        self.calls += 1
+        yield from super()._stream(*args, **kwargs)
+
+    async def _astream(self, *args, **kwargs):
+        self.calls += 1
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+PROMPT = [SystemMessage(content="Ask for the agent's name"), HumanMessage(content="Hello")]
+
+def test_streamed_replies_are_cached_and_served(tmp_path):
+    stub = CountingStub()
+    model = CachedChatModel(inner=stub, response_cache=ResponseCache(path=str(tmp_path / "cache.sqlite")))
+    streamed = "".join(chunk.content for chunk in model.stream(PROMPT))
+    assert stub.calls == 1
+    assert "".join(chunk.content for chunk in model.stream(PROMPT)) == streamed
+    assert model.invoke(PROMPT).content == streamed
+
+    async def astreamed():
+        return "".join([chunk.content async for chunk in model.astream(PROMPT)])
+
+    assert asyncio.run(astreamed()) == streamed
+    assert stub.calls == 1
+
+def test_the_default_model_is_built_with_the_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_CACHE", "on")
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(bot_agent, "response_cache", None)
+    set_llm(None)
+    try:
+        model = bot_agent.get_llm()
+        assert isinstance(model, CachedChatModel)
+        model.invoke(PROMPT)
+        model.invoke(PROMPT)
+        assert bot_agent.response_cache.stats()["hits"] == 1
+    finally:
+        set_llm(None)
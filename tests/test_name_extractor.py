@@ -0,0 +1,25 @@
+import json
+import os
+
+import pytest
+
+from conversation_flow import NAME_CONFIDENCE_THRESHOLD
+from name_extractor import extract_name, extract_names
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "data",
+                           "agent_introductions.jsonl")
+
+with open(CORPUS_PATH) as f:
+    CORPUS = [json.loads(line) for line in f]
+
+def name_of(match):
+    return match.name if match is not None and match.confidence >= NAME_CONFIDENCE_THRESHOLD else None
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["text"][:40] for case in CORPUS])
+def test_labelled_introductions(case):
+    assert name_of(extract_name(case["text"])) == case["name"]
+
+def test_batch_matches_single_messages():
+    texts = [case["text"] for case in CORPUS]
+    assert list(extract_names(texts)) == [extract_name(text) for text in texts]
+    assert list(extract_names(texts, processes=2, chunksize=8)) == [extract_name(text) for text in texts]
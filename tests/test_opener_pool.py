@@ -0,0 +1,68 @@
+import itertools
+import time
+from types import SimpleNamespace
+
+import opener_pool
+from opener_pool import OpenerPool
+
+class Generator:
+    """Numbered openers, counting how many were made"""
+
+    def __init__(self):
+        self.numbers = itertools.count()
+
+    def __call__(self):
+        return {"opener": next(self.numbers)}
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+def full_pool(size: int = 3, **options) -> OpenerPool:
+    pool = OpenerPool(Generator(), size=size, refill_per_minute=60_000, **options).start()
+    wait_for(lambda: pool.stats()["pooled"] == size)
+    return pool
+
+def test_an_empty_pool_generates_on_the_spot():
+    pool = OpenerPool(Generator(), size=0).start()
+    assert pool.take() == {"opener": 0}
+    assert pool.take() == {"opener": 1}
+    stats = pool.stats()
+    assert stats["misses"] == 2 and stats["hits"] == 0 and stats["generated"] == 0
+    pool.close()
+
+def test_taken_openers_are_refilled_oldest_first():
+    pool = full_pool()
+    try:
+        assert pool.take() == {"opener": 0}
+        assert pool.take() == {"opener": 1}
+        wait_for(lambda: pool.stats()["pooled"] == 3)
+        stats = pool.stats()
+        assert stats["hits"] == 2 and stats["misses"] == 0 and stats["generated"] == 5
+    finally:
+        pool.close()
+
+def test_stale_openers_are_dropped(monkeypatch):
+    pool = full_pool(max_age=60)
+    pool.close()
+    later = time.monotonic() + 61
+    monkeypatch.setattr(opener_pool, "time", SimpleNamespace(monotonic=lambda: later))
+    # Every pooled opener is past max_age, so this one is generated on the spot
+    assert pool.take() == {"opener": 3}
+    stats = pool.stats()
+    assert stats["expired"] == 3 and stats["pooled"] == 0 and stats["misses"] == 1
+
+def test_failed_generation_is_counted_and_take_still_works():
+    calls = itertools.count()
+
+    def generate():
+        if next(calls) == 0:
+            raise RuntimeError("rate limited")
+        return {"opener": "fresh"}
+
+    pool = OpenerPool(generate, size=1, refill_per_minute=60_000).start()
+    wait_for(lambda: pool.stats()["failures"] == 1)
+    assert pool.take() == {"opener": "fresh"}
+    pool.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from phrase_matcher import classify_message
+
+LABELLED_CASES = [
+    ("Your plan is inactive.", {"plan_inactive"}),
+    ("Your plan is not active at the moment.", {"plan_inactive"}),
+    ("Your plan isn't currently active.", {"plan_inactive"}),
+    ("Your plan isn’t currently active.", {"plan_inactive"}),
+    ("The plan expired last month.", {"plan_inactive"}),
+    ("I've checked your plan, and yes, it is currently active.", {"plan_active"}),
+    ("Yes, you're in the right queue for coverage inquiries.", {"queue_correct"}),
+    ("You're not in the right queue, sorry.", {"queue_wrong"}),
+    ("Let me transfer you to the coverage department.", {"queue_correct", "queue_wrong"}),
+    ("That's a different department.", {"queue_wrong"}),
+    ("Perfect, I've verified your identity in our system.", {"authenticated"}),
+    ("I haven't verified you yet.", set()),
+    ("Thank you for the information.", {"authenticated"}),
+    ("Your identity is confirmed.", {"authenticated"}),
+    ("Your identity isn't confirmed yet.", set()),
+    ("There are no overage charges on this account.", set()),
+    ("My name is Alex, how can I help?", set()),
+    # A negation covers one phrase, within its own clause
+    ("Your plan hasn't expired, it's active.", {"plan_active"}),
+    ("Don't worry, it's active.", {"plan_active"}),
+    ("It's not expired and it's active.", {"plan_active"}),
+    ("Not to worry; your plan is active.", {"plan_active"}),
+    # A conditional clause is not a statement
+    ("Let me check if it's active.", set()),
+    ("I'll see whether your plan is currently active.", set()),
+    ("Let me check if it's active. Yes, it is active.", {"plan_active"}),
+    ("That's a reactive policy.", set()),
+]
+
+@pytest.mark.parametrize("message, expected", LABELLED_CASES)
+def test_classify_message(message, expected):
+    assert set(classify_message(message)) == expected
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+import pytest
+
+from rate_limiter import PRIORITY_ACTIVE, PRIORITY_BACKGROUND, RateLimiter
+
+def acquire_within(limiter: RateLimiter, timeout: float = 10.0) -> bool:
+    worker = threading.Thread(target=limiter.acquire, args=(10,), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    return not worker.is_alive()
+
+def test_a_failing_grant_does_not_stop_the_dispatcher():
+    limiter = RateLimiter(max_concurrency=1)
+    limiter.acquire(10)
+
+    def closed_loop_grant():
+        raise RuntimeError("Event loop is closed")
+
+    # Queued behind the held slot, then granted once it is released
+    limiter._enqueue(10, PRIORITY_ACTIVE, closed_loop_grant)
+    limiter.release(10)
+    assert acquire_within(limiter)
+    assert limiter.stats()["in_flight"] == 1 and limiter.stats()["granted"] == 2
+
+def test_a_waiter_whose_event_loop_closed_is_skipped():
+    limiter = RateLimiter(max_concurrency=1)
+    limiter.acquire(10)
+    loop = asyncio.new_event_loop()
+    loop.close()
+    limiter._enqueue(10, PRIORITY_BACKGROUND, lambda: loop.call_soon_threadsafe(print))
+    limiter.release(10)
+    assert acquire_within(limiter)
+    assert limiter.stats()["queued"] == 0
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_a_dead_dispatcher_is_restarted():
+    limiter = RateLimiter()
+
+    def exit_thread():
+        raise SystemExit
+
+    limiter._enqueue(10, PRIORITY_ACTIVE, exit_thread)
+    limiter._dispatcher.join(10.0)
+    assert not limiter._dispatcher.is_alive()
+    assert acquire_within(limiter)
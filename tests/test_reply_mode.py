@@ -0,0 +1,76 @@
+import pytest
+
+import bot_agent
+import instrumentation
+from llm_backends import StubChatModel, set_llm
+
+class CountingStub(StubChatModel):
+    """Stub model that counts its calls"""
+
+    calls: int = 0
+
+    async def _agenerate(self, *args, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(*args, **kwargs)
+
+OPENING = "Hi, I'm calling on behalf of a member about their insurance coverage. May I know your name, please?"
+
+@pytest.fixture
+def model():
+    model = CountingStub()
+    set_llm(model)
+    return model
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """A fresh reply counter, with the instrumentation registry on and empty"""
+    monkeypatch.setattr(instrumentation, "enabled", True)
+    monkeypatch.setattr(bot_agent, "reply_stats", bot_agent.ReplyStats())
+    instrumentation.registry.clear()
+    yield instrumentation.registry
+    instrumentation.registry.clear()
+
+def run(*agent_inputs):
+    state = None
+    for agent_input in agent_inputs:
+        state = bot_agent.handle_agent_input(agent_input, state)
+    return state
+
+def test_llm_mode_always_calls_the_model(model):
+    state = run(bot_agent.GREETING, "My name is Alex.")
+    assert model.calls == 2 and state["llm_calls"] == 1
+
+def test_template_first_uses_a_template_only_where_one_covers_the_turn(monkeypatch, model):
+    monkeypatch.setattr(bot_agent, "reply_mode", "template-first")
+    state = run(bot_agent.GREETING)
+    assert state["messages"][-1]["content"] == OPENING
+    assert model.calls == 0 and state["llm_calls"] == 0
+
+    # The opening template only covers the first turn of a state
+    state = run(bot_agent.GREETING, "Could you repeat that?")
+    assert state["conversation_state"] == "INTRODUCTION"
+    assert model.calls == 1 and state["llm_calls"] == 1
+
+    state = run(bot_agent.GREETING, "My name is Alex.")
+    assert state["messages"][-1]["content"] == "Thanks, Alex. Am I in the right queue for coverage inquiries?"
+
+def test_template_only_falls_back_instead_of_calling_the_model(monkeypatch, model):
+    monkeypatch.setattr(bot_agent, "reply_mode", "template-only")
+    state = run(bot_agent.GREETING, "Could you repeat that?")
+    assert state["messages"][-1]["content"] == bot_agent.get_flow().fallback_reply
+    assert model.calls == 0 and state["llm_calls"] == 0
+
+def test_an_unknown_reply_mode_is_an_error(monkeypatch):
+    monkeypatch.setattr(bot_agent, "reply_mode", "hybrid")
+    with pytest.raises(ValueError, match="REPLY_MODE"):
+        run(bot_agent.GREETING)
+
+def test_template_and_llm_replies_are_exported(monkeypatch, metrics):
+    monkeypatch.setattr(bot_agent, "reply_mode", "template-first")
+    run(bot_agent.GREETING, "Could you repeat that?", "My name is Alex.")
+    assert metrics.value("chatbot_reply_mode_replies_total", source="template") == 2
+    assert metrics.value("chatbot_reply_mode_replies_total", source="llm") == 1
+    assert metrics.value("chatbot_reply_seconds_total", source="llm") > 0
+    stats = bot_agent.reply_stats.stats()
+    assert stats["template_fraction"] == pytest.approx(2 / 3)
+    assert "chatbot_template_seconds_saved_total" in metrics.render()
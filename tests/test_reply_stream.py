@@ -0,0 +1,53 @@
+import asyncio
+
+import bot_agent
+from llm_backends import StubChatModel, set_llm
+
+def stream(agent_input, state=None):
+    reply = bot_agent.stream_agent_input(agent_input, state)
+    tokens = list(reply)
+    return tokens, reply.state
+
+def astream(agent_input, state=None):
+    async def run():
+        reply = bot_agent.stream_agent_input(agent_input, state)
+        tokens = [token async for token in reply]
+        return tokens, reply.state
+    return asyncio.run(run())
+
+def test_streamed_reply_matches_the_graph_turn():
+    set_llm(StubChatModel(tokens_per_second=1000))
+    expected = bot_agent.handle_agent_input(bot_agent.GREETING)
+    for run in (stream, astream):
+        tokens, state = run(bot_agent.GREETING)
+        assert len(tokens) > 1
+        assert "".join(tokens) == expected["messages"][-1]["content"]
+        assert state["messages"] == expected["messages"]
+        assert state["llm_calls"] == 1 and state["conversation_state"] == expected["conversation_state"]
+
+def test_caller_state_is_untouched_until_the_stream_completes():
+    for run in (stream, astream):
+        state = bot_agent.handle_agent_input(bot_agent.GREETING)
+        before = list(state["messages"])
+        _, updated = run("My name is Alex.", state)
+        assert state["messages"] == before
+        assert updated["messages"][:len(before)] == before
+        assert updated["agent_name"] == "Alex" and updated["conversation_state"] == "QUEUE_CONFIRMATION"
+
+def test_template_reply_is_sent_whole_without_the_llm(monkeypatch):
+    monkeypatch.setattr(bot_agent, "reply_mode", "template-first")
+    for run in (stream, astream):
+        tokens, state = run(bot_agent.GREETING)
+        assert tokens == [state["messages"][-1]["content"]]
+        assert state["llm_calls"] == 0
+
+def test_terminal_state_streams_nothing():
+    state = None
+    for agent_input in [bot_agent.GREETING, "My name is Alex.", "Yes, you're in the right queue for coverage inquiries.",
+                        "Perfect, I've verified your identity in our system.", "Your plan is currently active."]:
+        state = bot_agent.handle_agent_input(agent_input, state)
+    assert state["conversation_state"] == "CONCLUSION"
+    for run in (stream, astream):
+        tokens, updated = run("Anything else?", state)
+        assert tokens == [] and updated["llm_calls"] == 0
+        assert updated["messages"][-1] == {"role": "agent", "content": "Anything else?"}
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import threading
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import WSCloseCode, WSMsgType
+from aiohttp.test_utils import TestClient, TestServer
+
+import instrumentation
+from checkpoint_store import SQLiteCheckpointStore, set_checkpoint_store
+from llm_backends import StubChatModel, set_llm
+from server import BotServer
+
+class ProviderError(Exception):
+    """What an HTTP LLM client raises for a non-2xx response"""
+
+    def __init__(self, status_code: int, retry_after: str = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers={"retry-after": retry_after} if retry_after else {})
+
+class FailingStub(StubChatModel):
+    """Stub whose requests fail with the given error"""
+    error: Exception = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    async def _agenerate(self, *args, **kwargs):
+        raise self.error
+
+    async def _astream(self, *args, **kwargs):
+        raise self.error
+        yield
+
+class RecordingStore(SQLiteCheckpointStore):
+    """Checkpoint store that records which threads its saves ran on"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.save_threads = []
+
+    def save(self, conversation_id, state):
+        self.save_threads.append(threading.current_thread())
+        super().save(conversation_id, state)
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """The instrumentation registry, on and empty"""
+    monkeypatch.setattr(instrumentation, "enabled", True)
+    instrumentation.registry.clear()
+    yield instrumentation.registry
+    instrumentation.registry.clear()
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordingStore(str(tmp_path / "checkpoints.sqlite"), flush_interval=None)
+    set_checkpoint_store(store)
+    yield store
+    set_checkpoint_store(None)
+    store.close()
+
+class RunAppServer(TestServer):
+    """Test server that, like web.run_app, lets a handler run on after its client disconnects"""
+
+    async def _make_runner(self, **kwargs):
+        return await super()._make_runner(**dict(kwargs, handler_cancellation=False))
+
+def run_client(scenario, server_class=TestServer):
+    async def main():
+        async with TestClient(server_class(BotServer().create_app())) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+async def start(client) -> str:
+    response = await client.post("/conversations")
+    assert response.status == 201
+    return (await response.json())["conversation_id"]
+
+def test_a_turn_replies_and_checkpoints_off_the_event_loop(store):
+    async def scenario(client):
+        conversation_id = await start(client)
+        response = await client.post(f"/conversations/{conversation_id}/turns", json={"message": "Hello"})
+        assert response.status == 200
+        body = await response.json()
+        assert body["reply"] and [m["role"] for m in body["state"]["messages"]] == ["agent", "bot"]
+        return threading.current_thread()
+
+    loop_thread = run_client(scenario)
+    assert len(store.save_threads) == 2
+    assert loop_thread not in store.save_threads
+
+@pytest.mark.parametrize("error, status, retry", [
+    (ProviderError(429, "7"), 503, "7"),
+    (ProviderError(503), 503, "1"),
+    (ProviderError(500), 502, None),
+    (ProviderError(400), 502, None),
+    (RuntimeError("a bug, not the provider"), 500, None),
+])
+def test_a_failed_llm_call_leaves_the_conversation_unchanged(store, metrics, error, status, retry):
+    async def scenario(client):
+        conversation_id = await start(client)
+        set_llm(FailingStub(error=error))
+        response = await client.post(f"/conversations/{conversation_id}/turns", json={"message": "Hello"})
+        assert response.status == status
+        assert response.headers.get("Retry-After") == retry
+        failures = metrics.value("chatbot_llm_failures_total", status=str(getattr(error, "status_code", None)))
+        assert failures == (0 if status == 500 else 1)
+        state = await (await client.get(f"/conversations/{conversation_id}")).json()
+        assert state["messages"] == []
+
+        set_llm(StubChatModel())
+        response = await client.post(f"/conversations/{conversation_id}/turns", json={"message": "Hello"})
+        body = await response.json()
+        assert [m["role"] for m in body["state"]["messages"]] == ["agent", "bot"]
+
+    run_client(scenario)
+
+def test_a_failed_streamed_turn_sends_an_error_frame(store):
+    async def scenario(client):
+        conversation_id = await start(client)
+        async with client.ws_connect(f"/conversations/{conversation_id}/stream") as socket:
+            set_llm(FailingStub(error=ProviderError(429)))
+            await socket.send_json({"message": "Hello"})
+            frame = await socket.receive_json()
+            assert frame["type"] == "error" and frame["status"] == 503
+
+            set_llm(StubChatModel())
+            await socket.send_json({"message": "Hello"})
+            while (frame := await socket.receive_json())["type"] == "token":
+                pass
+            assert frame["type"] == "done"
+            assert [m["role"] for m in frame["state"]["messages"]] == ["agent", "bot"]
+
+    run_client(scenario)
+
+def test_a_streamed_turn_failing_for_another_reason_closes_the_socket(store, metrics):
+    async def scenario(client):
+        conversation_id = await start(client)
+        async with client.ws_connect(f"/conversations/{conversation_id}/stream") as socket:
+            set_llm(FailingStub(error=RuntimeError("a bug, not the provider")))
+            await socket.send_json({"message": "Hello"})
+            frame = await socket.receive()
+            assert frame.type == WSMsgType.CLOSE and frame.data == WSCloseCode.INTERNAL_ERROR
+        state = await (await client.get(f"/conversations/{conversation_id}")).json()
+        assert state["messages"] == []
+
+    run_client(scenario)
+    assert metrics.value("chatbot_llm_failures_total", status="None") == 0
+
+def test_a_client_leaving_mid_stream_is_not_an_llm_failure(store, metrics, caplog):
+    async def scenario(client):
+        conversation_id = await start(client)
+        set_llm(StubChatModel(tokens_per_second=50))
+        socket = await client.ws_connect(f"/conversations/{conversation_id}/stream")
+        await socket.send_json({"message": "Hello"})
+        assert (await socket.receive_json())["type"] == "token"
+        # Drop the connection without a closing handshake
+        socket._response.connection.transport.abort()
+        await asyncio.sleep(0.5)
+        state = await (await client.get(f"/conversations/{conversation_id}")).json()
+        assert state["messages"] == []
+
+    with caplog.at_level(logging.ERROR, logger="aiohttp.server"):
+        run_client(scenario, RunAppServer)
+    assert "chatbot_llm_failures_total" not in metrics.render()
+    assert not caplog.records
@@ -0,0 +1,39 @@
+import time
+
+from benchmarks.bench_session_memory import dict_sessions, managed_sessions, measure
+from session_manager import SessionManager
+
+def test_sessions_take_less_memory_than_the_dict_layout():
+    sessions, turns = 200, 10
+    old = measure(lambda: dict_sessions(sessions, turns))
+    new = measure(lambda: managed_sessions(sessions, turns))
+    assert new < old * 0.75
+
+def test_eviction_keeps_the_manager_within_its_memory_budget():
+    budget = managed_sessions(200, 10).stats()["bytes_held"] // 4
+    manager = managed_sessions(200, 10, SessionManager(memory_budget=budget))
+    stats = manager.stats()
+    assert stats["bytes_held"] <= budget
+    assert stats["evicted_memory"] > 0 and stats["live_sessions"] < 200
+
+def test_idle_sessions_expire():
+    manager = SessionManager(ttl=0.05)
+    session = manager.create()
+    time.sleep(0.1)
+    manager.create()
+    assert manager.get(session.conversation_id) is None
+    assert manager.stats()["evicted_idle"] == 1
+
+def test_state_round_trips_through_a_session():
+    manager = SessionManager()
+    session = manager.create("conversation")
+    state = manager.to_state(session)
+    state["messages"].append({"role": "agent", "content": "My name is Alex."})
+    state.update(agent_name="Alex", correct_queue=True, authenticated=False, plan_status="active",
+                 conversation_state="AUTHENTICATION", turns_in_state=2)
+    manager.commit(session, state)
+    restored = manager.to_state(manager.get("conversation"))
+    for field in ("agent_name", "correct_queue", "authenticated", "plan_status", "conversation_state",
+                  "turns_in_state"):
+        assert restored[field] == state[field]
+    assert [message["content"] for message in restored["messages"]] == ["My name is Alex."]
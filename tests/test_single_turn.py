@@ -0,0 +1,52 @@
+import bot_agent
+from llm_backends import StubChatModel, set_llm
+
+class CountingStub(StubChatModel):
+    """Stub model that counts its calls"""
+
+    calls: int = 0
+
+    async def _agenerate(self, *args, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(*args, **kwargs)
+
+TRANSCRIPT = [
+    bot_agent.GREETING,
+    "My name is Alex, how can I help?",
+    "Yes, you're in the right queue for coverage inquiries.",
+    "Perfect, I've verified your identity in our system.",
+    "I've checked your plan, and yes, it is currently active.",
+]
+
+def test_each_agent_message_runs_one_node_and_one_llm_call():
+    model = CountingStub()
+    set_llm(model)
+    state = None
+    for position, agent_input in enumerate(TRANSCRIPT, start=1):
+        state = bot_agent.handle_agent_input(agent_input, state)
+        assert state["llm_calls"] == 1
+        assert model.calls == position
+        assert [message["role"] for message in state["messages"][-2:]] == ["agent", "bot"]
+    assert state["conversation_state"] == "CONCLUSION"
+
+def test_unmatched_message_keeps_the_state_without_looping():
+    model = CountingStub()
+    set_llm(model)
+    state = bot_agent.handle_agent_input(bot_agent.GREETING)
+    state = bot_agent.handle_agent_input("My name is Alex, how can I help?", state)
+    assert state["conversation_state"] == "QUEUE_CONFIRMATION"
+    calls = model.calls
+    state = bot_agent.handle_agent_input("Could you spell that for me?", state)
+    assert state["conversation_state"] == "QUEUE_CONFIRMATION"
+    assert state["llm_calls"] == 1 and model.calls == calls + 1
+
+def test_terminal_state_makes_no_llm_call():
+    model = CountingStub()
+    set_llm(model)
+    state = None
+    for agent_input in TRANSCRIPT:
+        state = bot_agent.handle_agent_input(agent_input, state)
+    calls = model.calls
+    state = bot_agent.handle_agent_input("Is there anything else I can help with?", state)
+    assert state["conversation_state"] == "CONCLUSION"
+    assert state["llm_calls"] == 0 and model.calls == calls
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+import instrumentation
+from speculation import Speculator
+
+@pytest.fixture
+def metrics(monkeypatch):
+    """The instrumentation registry, on and empty"""
+    monkeypatch.setattr(instrumentation, "enabled", True)
+    instrumentation.registry.clear()
+    yield instrumentation.registry
+    instrumentation.registry.clear()
+
+@pytest.fixture
+def speculator():
+    speculator = Speculator(enabled=True, workers=1)
+    yield speculator
+    speculator.close()
+
+def job(reply: str, tokens: int):
+    return lambda: (reply, tokens)
+
+def settle(speculator: Speculator, conversation_id: str) -> None:
+    """Wait for a conversation's candidates to finish, so discarding them counts their tokens"""
+    for future in list(speculator._pending.get(conversation_id, {}).values()):
+        future.result()
+
+def test_a_hit_returns_the_candidate_and_wastes_the_others(speculator, metrics):
+    speculator.start("c1", {"stay": job("again", 10), "advance": job("next", 20)})
+    settle(speculator, "c1")
+    future = speculator.claim("c1", "advance")
+    assert future.result() == ("next", 20)
+    assert speculator.claim("c1", "advance") is None
+    stats = speculator.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 0 and stats["hit_rate"] == 1.0
+    assert stats["wasted_tokens"] == 10
+    assert metrics.value("chatbot_speculation_started_total") == 2
+    assert metrics.value("chatbot_speculation_claims_total", result="hit") == 1
+    assert metrics.value("chatbot_speculation_wasted_tokens_total") == 10
+
+def test_a_miss_wastes_every_candidate(speculator, metrics):
+    speculator.start("c1", {"stay": job("again", 10), "advance": job("next", 20)})
+    settle(speculator, "c1")
+    assert speculator.claim("c1", "elsewhere") is None
+    stats = speculator.stats()
+    assert stats["hits"] == 0 and stats["misses"] == 1 and stats["hit_rate"] == 0.0
+    assert stats["wasted_tokens"] == 30
+    assert metrics.value("chatbot_speculation_claims_total", result="miss") == 1
+    assert metrics.value("chatbot_speculation_wasted_tokens_total") == 30
+
+def test_starting_again_discards_the_stale_branches(speculator, metrics):
+    running, release = threading.Event(), threading.Event()
+
+    def slow():
+        running.set()
+        release.wait(5)
+        return "slow", 5
+
+    # One worker: slow is running when the next turn's branches replace these, queued has not started
+    speculator.start("c1", {"slow": slow, "queued": job("queued", 7)})
+    assert running.wait(5)
+    speculator.start("c1", {"fresh": job("fresh", 3)})
+    release.set()
+    # The running job finishes and is counted; the queued one never ran
+    future = speculator.claim("c1", "fresh")
+    assert future.result() == ("fresh", 3)
+    speculator.close()
+    stats = speculator.stats()
+    assert stats["cancelled"] == 1 and stats["wasted_tokens"] == 5
+    assert metrics.value("chatbot_speculation_cancelled_total") == 1
+    assert metrics.value("chatbot_speculation_wasted_tokens_total") == 5
+
+def test_claims_without_candidates_are_not_counted(speculator, metrics):
+    assert speculator.claim("unknown", "stay") is None
+    assert speculator.stats()["misses"] == 0
+    assert metrics.value("chatbot_speculation_claims_total", result="miss") == 0
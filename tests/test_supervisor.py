@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from supervisor import Supervisor
+
+CONVERSATIONS = [f"conversation-{number}" for number in range(200)]
+
+class FakeSupervisor(Supervisor):
+    """Supervisor whose workers are stand-ins: spawning succeeds at once and nothing is sent to them"""
+
+    def __init__(self, workers: int):
+        super().__init__(workers, base_port=9000)
+        self._routable = asyncio.Event()
+        self._publish_lock = asyncio.Lock()
+        self.spawned = []
+
+    def _spawn(self, worker):
+        worker.process = SimpleNamespace(returncode=None, poll=lambda: None)
+        # What the router does while the worker is starting
+        self.spawned.append((worker.name, {conversation_id: self.ring.owner(conversation_id)
+                                           for conversation_id in CONVERSATIONS}))
+
+    async def _wait_ready(self, worker):
+        worker.ready = True
+        return True
+
+    async def _send_ring(self, worker, names):
+        pass
+
+def test_a_restarted_worker_gets_its_conversations_back():
+    async def main():
+        supervisor = FakeSupervisor(3)
+        for worker in supervisor.workers.values():
+            supervisor._spawn(worker)
+            await supervisor._wait_ready(worker)
+        await supervisor._publish()
+        before = {conversation_id: (await supervisor._owner(conversation_id)).name for conversation_id in CONVERSATIONS}
+
+        worker = supervisor.workers["worker-1"]
+        worker.process = SimpleNamespace(returncode=1, poll=lambda: 1)
+        await supervisor._restart(worker)
+        after = {conversation_id: (await supervisor._owner(conversation_id)).name for conversation_id in CONVERSATIONS}
+        return supervisor, worker, before, after
+
+    supervisor, worker, before, after = asyncio.run(main())
+    assert after == before
+    assert worker.restarts == 1 and not worker.restarting
+    # While it was down its conversations went to the other workers, and only those moved
+    _, during = supervisor.spawned[-1]
+    assert "worker-1" in before.values()
+    for conversation_id, owner in before.items():
+        if owner == "worker-1":
+            assert during[conversation_id] in ("worker-0", "worker-2")
+        else:
+            assert during[conversation_id] == owner